@@ -0,0 +1,42 @@
+# bench_extraction.py
+"""
+Compares HTML-to-Markdown conversion of whole pages (the old path) with
+main-content extraction followed by conversion, on the fixed local corpus.
+
+    python -m benchmarks.bench_extraction --pages 50
+"""
+import time
+import argparse
+from markdownify import markdownify
+from benchmarks.corpus import generate_corpus
+from utils.content_extraction import html_to_markdown
+
+def run(label, convert, pages):
+    start = time.perf_counter()
+    output_bytes = sum(len(convert(page).encode("utf-8")) for page in pages)
+    elapsed = time.perf_counter() - start
+    return {
+        "path": label,
+        "pages_per_second": round(len(pages) / elapsed, 2),
+        "output_kb_per_page": round(output_bytes / len(pages) / 1024, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    pages = generate_corpus(args.pages, args.seed)
+    input_kb = sum(len(page.encode("utf-8")) for page in pages) / len(pages) / 1024
+    print(f"corpus: {len(pages)} pages, {input_kb:.1f} KB HTML per page")
+
+    full_page = run("full page", markdownify, pages)
+    extracted = run("main content", html_to_markdown, pages)
+    for result in (full_page, extracted):
+        print(result)
+    print(f"speed-up: {extracted['pages_per_second'] / full_page['pages_per_second']:.1f}x, "
+          f"output {full_page['output_kb_per_page'] / extracted['output_kb_per_page']:.1f}x smaller")
+
+if __name__ == "__main__":
+    main()
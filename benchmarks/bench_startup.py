@@ -0,0 +1,122 @@
+# bench_startup.py
+"""
+Measures the startup cost of a run: importing main.py and loading the topics
+and domains spreadsheets, each in a fresh interpreter. Compares a cold start
+(no input cache, so pandas/openpyxl parse the .xlsx files) with a cache-hit
+start (parsed lists read from the compiled input cache).
+
+    python -m benchmarks.bench_startup --topics 200 --domains 100 --runs 5
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def child(config_path):
+    """
+    Runs in the fresh interpreter: times the imports and the input loading.
+    """
+    start = time.perf_counter()
+    import yaml
+    import main  # noqa: F401
+    from utils.input_cache import load_search_inputs
+    imported = time.perf_counter()
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    topics, domains = load_search_inputs(config)
+    loaded = time.perf_counter()
+
+    print(json.dumps({
+        "import_seconds": imported - start,
+        "inputs_seconds": loaded - imported,
+        "pandas_imported": "pandas" in sys.modules,
+        "selenium_imported": "selenium" in sys.modules,
+        "markdownify_imported": "markdownify" in sys.modules,
+        "jobs": len(topics) * len(domains)
+    }))
+
+def write_inputs(work_dir, topics, domains):
+    import yaml
+    import pandas as pd
+
+    with open(os.path.join(REPO_ROOT, "config-example.yaml"), "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    data_dir = os.path.join(work_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    config["topics"]["location"] = config["domains"]["location"] = data_dir
+    config["db_storage"]["path"] = os.path.join(work_dir, "database")
+    config["input_cache"]["path"] = os.path.join(work_dir, "database", "input_cache.json")
+
+    pd.DataFrame({config["topics"]["column_name"]: [f"topic {t}" for t in range(topics)]}).to_excel(
+        os.path.join(data_dir, config["topics"]["excel_file_name"]), index=False)
+    columns = config["domains"]["columns"]
+    pd.DataFrame({
+        columns["name"]: [f"Site {d}" for d in range(domains)],
+        columns["domain"]: [f"site{d}.example" for d in range(domains)],
+        columns["max_articles"]: [10] * domains
+    }).to_excel(os.path.join(data_dir, config["domains"]["excel_file_name"]), index=False)
+
+    config_path = os.path.join(work_dir, "config.yaml")
+    with open(config_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+    return config, config_path
+
+def run(config_path, runs, cache_path=None):
+    """
+    Starts `runs` fresh interpreters; with cache_path, deletes the input cache
+    before each one so every run parses the spreadsheets.
+    """
+    samples = []
+    for _ in range(runs):
+        if cache_path and os.path.exists(cache_path):
+            os.remove(cache_path)
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--child", config_path],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result["process_seconds"] = time.perf_counter() - start
+        samples.append(result)
+
+    summary = {name: round(statistics.median(sample[name] for sample in samples), 3)
+               for name in ("process_seconds", "import_seconds", "inputs_seconds")}
+    summary.update({name: samples[-1][name] for name in ("pandas_imported", "selenium_imported", "markdownify_imported", "jobs")})
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--domains", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="scrapescout-bench-startup-")
+    try:
+        config, config_path = write_inputs(work_dir, args.topics, args.domains)
+        cold = run(config_path, args.runs, cache_path=config["input_cache"]["path"])
+        # The last cold run left a fresh cache behind
+        warm = run(config_path, args.runs)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"cold (Excel parsed): {cold}")
+    print(f"warm (cache hit):    {warm}")
+    print(f"startup: {cold['process_seconds']:.3f}s -> {warm['process_seconds']:.3f}s "
+          f"({cold['process_seconds'] / warm['process_seconds']:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# corpus.py
+"""
+Deterministic corpus of realistic news-style HTML pages for offline benchmarks.
+
+Pages carry the usual weight around the article: navigation menus, inline
+scripts and JSON blobs, inline SVG icons, a cookie banner, a sidebar of related
+links and a link-heavy footer. The same seed always yields the same pages.
+"""
+import random
+
+WORDS = (
+    "market policy energy climate research data report growth risk supply chain "
+    "analysis investment regulation technology security health education region "
+    "government industry consumer survey forecast quarter revenue strategy impact"
+).split()
+
+def _sentence(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+    if len(words) > 10:
+        words[rng.randint(3, len(words) - 4)] += ","
+    return " ".join(words).capitalize() + "."
+
+def _paragraph(rng):
+    return " ".join(_sentence(rng) for _ in range(rng.randint(3, 7)))
+
+def _svg_icon(rng):
+    path = " ".join(f"L{rng.randint(0, 24)}.{rng.randint(0, 99)} {rng.randint(0, 24)}.{rng.randint(0, 99)}" for _ in range(60))
+    return f'<svg viewBox="0 0 24 24" width="24" height="24"><path d="M0 0 {path} Z"/></svg>'
+
+def _link_list(rng, count, css_class):
+    items = "".join(
+        f'<li><a href="/section/{rng.randint(1, 999)}">{_svg_icon(rng) if rng.random() < 0.3 else ""}'
+        f'{rng.choice(WORDS).title()} {rng.choice(WORDS)}</a></li>'
+        for _ in range(count)
+    )
+    return f'<ul class="{css_class}">{items}</ul>'
+
+def generate_page(index, seed=1234):
+    """
+    Returns the HTML of page `index` of the corpus.
+    """
+    rng = random.Random(seed * 100003 + index)
+    title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 10))).title()
+    script_blob = ",".join(f'"{rng.choice(WORDS)}{i}":{rng.random():.6f}' for i in range(rng.randint(300, 900)))
+
+    paragraphs = "".join(f"<p>{_paragraph(rng)}</p>" for _ in range(rng.randint(6, 18)))
+    figure = (
+        f'<figure><img src="/img/{index}.jpg" alt="{title}">'
+        f"<figcaption>{_sentence(rng)}</figcaption></figure>"
+    )
+    related = "".join(
+        f'<div class="related-item"><a href="/story/{rng.randint(1, 99999)}">{_sentence(rng)}</a></div>'
+        for _ in range(rng.randint(8, 15))
+    )
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>{"".join(f".c{i}{{margin:{i}px;padding:{i % 7}px}}" for i in range(400))}</style>
+<script>window.__STATE__ = {{{script_blob}}};</script>
+<script src="/static/app.{index}.js"></script>
+</head>
+<body>
+<div id="cookie-consent" class="cookie-banner">We use cookies to improve your experience. <button>Accept</button></div>
+<header class="site-header">{_svg_icon(rng)}<nav class="main-nav">{_link_list(rng, 40, "menu")}</nav></header>
+<div class="page">
+  <aside class="sidebar">{_link_list(rng, 25, "trending")}<div class="newsletter-signup"><form><input type="email"><button>Subscribe</button></form></div></aside>
+  <div class="content-wrapper">
+    <div class="share-bar">{"".join(_svg_icon(rng) for _ in range(6))}</div>
+    <article class="story">
+      <h1>{title}</h1>
+      <div class="byline">By Staff Writer</div>
+      {figure}
+      {paragraphs}
+    </article>
+    <div class="related-stories">{related}</div>
+    <div id="comments" class="comments">{"".join(f"<div class='comment'><p>{_sentence(rng)}</p></div>" for _ in range(rng.randint(3, 10)))}</div>
+  </div>
+</div>
+<footer class="site-footer">{_link_list(rng, 60, "footer-links")}<p>&copy; Example News</p></footer>
+<script>{"".join(f"track('{rng.choice(WORDS)}',{i});" for i in range(200))}</script>
+</body>
+</html>"""
+
+def generate_corpus(count=50, seed=1234):
+    return [generate_page(i, seed) for i in range(count)]
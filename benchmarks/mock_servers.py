@@ -0,0 +1,264 @@
+# mock_servers.py
+"""
+Local stand-ins for the external services ScrapeScout talks to, so throughput
+can be measured offline. Each server runs in a background thread on 127.0.0.1
+and exposes its base URL as `.url`.
+"""
+import json
+import time
+import zlib
+import random
+import threading
+from base64 import b64encode
+from urllib.parse import urlsplit, parse_qs, quote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from benchmarks.corpus import generate_page
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+class MockServer:
+    """
+    Base class: starts a ThreadingHTTPServer for a handler class in a daemon thread.
+    Use as a context manager or call start()/stop().
+    """
+
+    def __init__(self, port=0):
+        self.port = port
+        self.lock = threading.Lock()
+        self.requests_served = 0
+        self._server = None
+        self._thread = None
+
+    def handler_class(self):
+        raise NotImplementedError
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self._server = _QuietServer(("127.0.0.1", self.port), self.handler_class())
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+def _send(handler, status, body=b"", content_type="application/json", headers=None):
+    handler.send_response(status)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(body)))
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    handler.end_headers()
+    if body:
+        handler.wfile.write(body)
+
+class MockZyteServer(MockServer):
+    """
+    Fake Zyte `/v1/extract` endpoint.
+
+    :param latency: Seconds each extraction takes.
+    :param concurrency_limit: Requests in flight beyond this get a 429, like a real account limit.
+    :param error_rate: Fraction of requests answered with a 520 (temporary download error).
+    :param body_size: Approximate size in bytes of the fake page returned as httpResponseBody.
+    """
+
+    def __init__(self, latency=0.2, concurrency_limit=20, error_rate=0.0, body_size=50000, port=0, seed=0):
+        super().__init__(port)
+        self.latency = latency
+        self.concurrency_limit = concurrency_limit
+        self.error_rate = error_rate
+        self.body_size = body_size
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+
+    def handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                with mock.lock:
+                    mock.requests_served += 1
+                    if mock.in_flight >= mock.concurrency_limit:
+                        mock.throttled += 1
+                        _send(self, 429, b'{"title": "Too Many Requests"}', headers={"Retry-After": "1"})
+                        return
+                    mock.in_flight += 1
+                    mock.peak_in_flight = max(mock.peak_in_flight, mock.in_flight)
+                    fail = mock._random.random() < mock.error_rate
+
+                try:
+                    time.sleep(mock.latency)
+                    if fail:
+                        _send(self, 520, b'{"title": "Website Ban"}')
+                        return
+
+                    url = payload.get("url", "")
+                    paragraph = f"This is a paragraph of the article served for {url}. " * 4
+                    body_text = "\n\n".join(paragraph for _ in range(max(1, mock.body_size // (len(paragraph) + 2))))
+                    response = {"url": url, "statusCode": 200}
+                    if payload.get("article"):
+                        response["article"] = {
+                            "headline": f"Mock article for {url}",
+                            "authors": [{"name": "Jane Doe"}],
+                            "datePublished": "2024-01-01T00:00:00Z",
+                            "url": url,
+                            "articleBody": body_text
+                        }
+                    if payload.get("httpResponseBody"):
+                        html = f"<html><body><article>{body_text}</article></body></html>"
+                        response["httpResponseBody"] = b64encode(html.encode("utf-8")).decode("ascii")
+                    _send(self, 200, json.dumps(response).encode("utf-8"))
+                finally:
+                    with mock.lock:
+                        mock.in_flight -= 1
+
+        return Handler
+
+class MockSearchServer(MockServer):
+    """
+    Fake Google Custom Search endpoint (any GET path).
+
+    Honours q, siteSearch, start and num, returns at most total_results results
+    per query (and never past result 100), and sets queries.nextPage like the
+    real API. Result links point at `site_url` (a MockArticleSite), one path per
+    domain/query/result; every pdf_every-th result is a PDF.
+
+    :param latency: Seconds each query takes.
+    :param rate_limit_rate: Fraction of queries answered with a 429.
+    """
+
+    def __init__(self, site_url, latency=0.05, total_results=50, rate_limit_rate=0.0, pdf_every=10, port=0, seed=0):
+        super().__init__(port)
+        self.site_url = site_url.rstrip("/")
+        self.latency = latency
+        self.total_results = total_results
+        self.rate_limit_rate = rate_limit_rate
+        self.pdf_every = pdf_every
+        self.throttled = 0
+        self._random = random.Random(seed)
+
+    def handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                query = {name: values[0] for name, values in parse_qs(urlsplit(self.path).query).items()}
+                with mock.lock:
+                    mock.requests_served += 1
+                    throttle = mock._random.random() < mock.rate_limit_rate
+                    if throttle:
+                        mock.throttled += 1
+                time.sleep(mock.latency)
+                if throttle:
+                    _send(self, 429, b'{"error": {"code": 429, "message": "Rate Limit Exceeded"}}', headers={"Retry-After": "0"})
+                    return
+
+                start = int(query.get("start", 1))
+                num = int(query.get("num", 10))
+                total = min(mock.total_results, 100)
+                count = max(0, min(num, total - start + 1))
+                domain = query.get("siteSearch", "example.com")
+                topic = quote(query.get("q", "news").replace(" ", "-"))
+
+                items = []
+                for position in range(start, start + count):
+                    suffix = ".pdf" if mock.pdf_every and position % mock.pdf_every == 0 else ""
+                    items.append({
+                        "link": f"{mock.site_url}/{domain}/{topic}/{position}{suffix}",
+                        "title": f"{query.get('q', 'News')} story {position} on {domain}"
+                    })
+                response = {
+                    "items": items,
+                    "queries": {"nextPage": [{"startIndex": start + count}]} if start + count <= total else {},
+                    "searchInformation": {"totalResults": str(total)}
+                }
+                _send(self, 200, json.dumps(response).encode("utf-8"))
+
+        return Handler
+
+class MockArticleSite(MockServer):
+    """
+    Fake news site: any path returns a page from the benchmark corpus (picked
+    deterministically from the path), and paths ending in .pdf return a PDF of
+    pdf_size bytes. Pages carry an ETag and answer If-None-Match with a 304.
+
+    :param latency: Seconds each response takes.
+    """
+
+    def __init__(self, latency=0.02, pdf_size=200000, corpus_size=50, port=0, seed=1234):
+        super().__init__(port)
+        self.latency = latency
+        self.corpus_size = corpus_size
+        self.seed = seed
+        self.pages_served = 0
+        self.pdfs_served = 0
+        self._pages = {}
+        self._pdf = b"%PDF-1.4\n" + bytes(random.Random(seed).getrandbits(8) for _ in range(pdf_size)) + b"\n%%EOF\n"
+
+    def _page(self, index):
+        with self.lock:
+            page = self._pages.get(index)
+        if page is None:
+            page = generate_page(index, self.seed).encode("utf-8")
+            with self.lock:
+                self._pages[index] = page
+        return page
+
+    def handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                with mock.lock:
+                    mock.requests_served += 1
+                time.sleep(mock.latency)
+
+                if path.endswith(".pdf"):
+                    with mock.lock:
+                        mock.pdfs_served += 1
+                    _send(self, 200, mock._pdf, content_type="application/pdf")
+                    return
+
+                index = zlib.crc32(path.encode("utf-8")) % mock.corpus_size
+                etag = f'"page-{index}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                with mock.lock:
+                    mock.pages_served += 1
+                _send(self, 200, mock._page(index), content_type="text/html; charset=utf-8", headers={"ETag": etag})
+
+        return Handler
@@ -0,0 +1,455 @@
+# run_benchmarks.py
+"""
+Offline benchmark suite: drives the real search, scrape, Zyte and storage code
+against local stand-in servers (benchmarks/mock_servers.py) and reports
+throughput, request latency percentiles, peak RSS and DB/Excel write times.
+
+    python -m benchmarks.run_benchmarks                         # every scenario
+    python -m benchmarks.run_benchmarks --scenarios search scrape --output results.json
+    python -m benchmarks.run_benchmarks --compare baseline.json --output results.json
+
+Scenarios:
+    search   search_articles over a topic x domain grid against the fake CSE
+    scrape   fetch + extract + store of articles and PDFs from the fake site
+    zyte     ZyteClient.extract_many against the fake Zyte API
+    storage  ArticleStore writes, scrape-queue reads and the Excel export
+    e2e      main.main() end to end: search -> dedup -> persist -> scrape -> export
+
+All fake domains are served by one local host, so scrape scenarios set
+max_per_domain to the worker count and domain_delay_seconds to 0: they measure
+the pipeline, not the politeness settings.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import yaml
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+from datetime import datetime
+from contextlib import contextmanager
+
+import pandas as pd
+from utils.logger import logger
+from utils import http_client
+from benchmarks.mock_servers import MockSearchServer, MockArticleSite, MockZyteServer
+
+SCENARIOS = ("search", "scrape", "zyte", "storage", "e2e")
+
+# Higher is better for these metrics; for every other numeric metric lower is better
+HIGHER_IS_BETTER = ("per_second",)
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is the lifetime peak: kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class PeakRss:
+    """
+    Samples the process's resident set size in a background thread and keeps the peak.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+@contextmanager
+def record_latencies():
+    """
+    Records the latency of every response received through sessions built by
+    http_client (the shared session and Zyte's) while the block runs.
+    Yields a list of (url, seconds) tuples.
+    """
+    samples = []
+
+    def hook(response, *args, **kwargs):
+        samples.append((response.url, response.elapsed.total_seconds()))
+
+    original_build_session = http_client.build_session
+
+    def build_session(*args, **kwargs):
+        session = original_build_session(*args, **kwargs)
+        session.hooks["response"].append(hook)
+        return session
+
+    http_client.build_session = build_session
+    existing = http_client._session
+    if existing is not None:
+        existing.hooks["response"].append(hook)
+    try:
+        yield samples
+    finally:
+        http_client.build_session = original_build_session
+        if existing is not None and hook in existing.hooks["response"]:
+            existing.hooks["response"].remove(hook)
+
+def latency_stats(samples, prefix=""):
+    """
+    p50/p95/p99 in milliseconds of the samples whose URL starts with prefix.
+    """
+    values = sorted(seconds for url, seconds in samples if url.startswith(prefix))
+    if not values:
+        return {}
+    if len(values) == 1:
+        p50 = p95 = p99 = values[0]
+    else:
+        cuts = statistics.quantiles(values, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    return {
+        "requests": len(values),
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2)
+    }
+
+def bench_config(work_dir, search_url="", zyte_url="", workers=8):
+    """
+    config-example.yaml with every path moved into work_dir and pointed at the mock servers.
+    """
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(repo_root, "config-example.yaml"), "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    config["search_engines"]["google"].update({"api_url": search_url, "dateRestrict": ""})
+    config["search_settings"].update({
+        "max_queries_per_minute": 0, "max_queries_per_day": None, "max_concurrent_requests": workers
+    })
+    config["search_cache"]["enabled"] = "no"
+    config["scrape_engine_selection"] = "custom"
+    config["scrape_engines"]["zyte"].update({
+        "api_url": zyte_url, "api_key": "bench", "backoff_factor": 0.05, "max_concurrent_requests": workers
+    })
+    config["http_client"].update({"backoff_factor": 0.05, "backoff_jitter": 0, "pool_size_per_host": workers * 2})
+    config["scrape_settings"].update({"max_workers": workers, "max_per_domain": workers, "domain_delay_seconds": 0})
+    config["topics"]["location"] = os.path.join(work_dir, "data")
+    config["domains"]["location"] = os.path.join(work_dir, "data")
+    config["input_cache"]["path"] = os.path.join(work_dir, "database", "input_cache.json")
+    config["search_cache"]["path"] = os.path.join(work_dir, "database", "search_cache.db")
+    config["db_storage"]["path"] = os.path.join(work_dir, "database")
+    config["content_storage"]["path"] = os.path.join(work_dir, "database", "content_store.db")
+    config["output_excel"]["path"] = os.path.join(work_dir, "output")
+    config["output_markdown"]["path"] = os.path.join(work_dir, "articles")
+    # Per-request logging would dominate the measurements
+    config["logging"] = {"level": "WARNING", "file_path": "", "enqueue": "yes"}
+    config["metrics"].update({"report_path": os.path.join(work_dir, "run_report.json"), "prometheus_port": 0})
+    return config
+
+def fake_articles(count, site_url="https://example.com", domains=10):
+    for i in range(count):
+        domain = f"site{i % domains}.example"
+        yield {
+            "source_guid": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{site_url}/{domain}/{i}")),
+            "source_name": domain,
+            "source_domain": domain,
+            "search_engine_name": "google",
+            "source_url": f"{site_url}/{domain}/benchmark/{i}{'.pdf' if i % 10 == 9 else ''}",
+            "source_article_title": f"Benchmark article {i}",
+            "search_query": "benchmark"
+        }
+
+def run_search(args, work_dir):
+    from main import search_articles
+    from utils.rate_limiter import RateLimiter
+    from utils.concurrency import run_concurrently
+
+    with MockArticleSite(latency=0) as site, MockSearchServer(
+        site.url, latency=args.search_latency, total_results=args.results_per_query,
+        rate_limit_rate=args.rate_limit_rate
+    ) as cse:
+        config = bench_config(work_dir, search_url=f"{cse.url}/customsearch/v1", workers=args.workers)
+        http_client.configure_http_client(config)
+        grid = [(f"topic {t}", f"site{d}.example", args.results_per_query)
+                for t in range(args.topics) for d in range(args.domains)]
+        rate_limiter = RateLimiter(0)
+
+        def job(entry):
+            topic, domain, max_articles = entry
+            return search_articles(config["search_engines"]["google"], topic, domain, max_articles, rate_limiter)
+
+        with record_latencies() as samples, PeakRss() as rss:
+            start = time.perf_counter()
+            found = sum(len(articles or []) for _, articles in run_concurrently(job, grid, args.workers))
+            elapsed = time.perf_counter() - start
+        http_client.close_http_client()
+
+        return {
+            "searches": len(grid),
+            "queries": cse.requests_served,
+            "throttled_429": cse.throttled,
+            "results": found,
+            "seconds": round(elapsed, 3),
+            "queries_per_second": round(cse.requests_served / elapsed, 2),
+            "latency": latency_stats(samples),
+            "peak_rss_mb": round(rss.peak / 2**20, 1)
+        }
+
+def run_scrape(args, work_dir):
+    from main import make_scrape_job, record_scrape_outcome, article_domain
+    from utils.storage import ArticleStore
+    from utils.concurrency import run_per_domain
+    from utils.pdf_downloader import configure_pdf_downloads
+    from utils.scraper_custom_selenium import fetch_article, close_browser_pool
+
+    with MockArticleSite(latency=args.site_latency, pdf_size=args.pdf_kb * 1024) as site:
+        config = bench_config(work_dir, workers=args.workers)
+        http_client.configure_http_client(config)
+        configure_pdf_downloads(config)
+        store = ArticleStore(config["db_storage"]["path"], config["db_storage"]["name"])
+        store.add_articles(list(fake_articles(args.articles, site.url)))
+        store.flush()
+
+        scrape_job = make_scrape_job(config, fetch_article)
+        outcomes = {"ok": 0, "not_modified": 0, "failed": 0}
+        with record_latencies() as samples, PeakRss() as rss:
+            start = time.perf_counter()
+            for article, result in run_per_domain(
+                scrape_job, store.iter_articles_to_scrape(), key=article_domain,
+                max_workers=args.workers, max_per_domain=args.workers
+            ):
+                outcomes[record_scrape_outcome(store, article, result)] += 1
+            elapsed = time.perf_counter() - start
+        store.close()
+        close_browser_pool()
+        http_client.close_http_client()
+
+        return {
+            "articles": args.articles,
+            "pages": site.pages_served,
+            "pdfs": site.pdfs_served,
+            "outcomes": outcomes,
+            "seconds": round(elapsed, 3),
+            "pages_per_second": round(args.articles / elapsed, 2),
+            "latency": latency_stats(samples, site.url),
+            "peak_rss_mb": round(rss.peak / 2**20, 1)
+        }
+
+def run_zyte(args, work_dir):
+    from utils.scraper_zyte import ZyteClient, article_to_markdown
+
+    with MockZyteServer(latency=args.zyte_latency, concurrency_limit=args.workers, error_rate=0.01) as server:
+        config = bench_config(work_dir, zyte_url=f"{server.url}/v1/extract", workers=args.workers)
+        urls = [article["source_url"] for article in fake_articles(args.articles)]
+        with record_latencies() as samples, PeakRss() as rss:
+            client = ZyteClient.from_config(config)
+            start = time.perf_counter()
+            ok = 0
+            for _, resp_json in client.extract_many(urls):
+                if resp_json is not None:
+                    article_to_markdown(resp_json.get("article", {}))
+                    ok += 1
+            elapsed = time.perf_counter() - start
+        client.close()
+
+        return {
+            "articles": len(urls),
+            "ok": ok,
+            "throttled_429": server.throttled,
+            "seconds": round(elapsed, 3),
+            "pages_per_second": round(len(urls) / elapsed, 2),
+            "latency": latency_stats(samples),
+            "peak_rss_mb": round(rss.peak / 2**20, 1)
+        }
+
+def run_storage(args, work_dir):
+    from utils.storage import ArticleStore, export_articles
+
+    config = bench_config(work_dir)
+    db_path, db_name = config["db_storage"]["path"], config["db_storage"]["name"]
+    articles = list(fake_articles(args.storage_articles))
+
+    with PeakRss() as rss:
+        start = time.perf_counter()
+        store = ArticleStore(db_path, db_name, flush_size=config["db_storage"]["flush_size"])
+        for i in range(0, len(articles), 100):
+            store.add_articles(articles[i:i + 100])
+        store.flush()
+        db_write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        queued = sum(1 for _ in store.iter_articles_to_scrape())
+        db_read = time.perf_counter() - start
+        store.close()
+
+        start = time.perf_counter()
+        export_articles(db_path, db_name, config["output_excel"])
+        excel_write = time.perf_counter() - start
+
+    return {
+        "articles": len(articles),
+        "queued_for_scrape": queued,
+        "db_write_seconds": round(db_write, 3),
+        "db_writes_per_second": round(len(articles) / db_write, 2),
+        "db_read_seconds": round(db_read, 3),
+        "excel_write_seconds": round(excel_write, 3),
+        "peak_rss_mb": round(rss.peak / 2**20, 1)
+    }
+
+def run_e2e(args, work_dir):
+    import main
+
+    with MockArticleSite(latency=args.site_latency, pdf_size=args.pdf_kb * 1024) as site, MockSearchServer(
+        site.url, latency=args.search_latency, total_results=args.results_per_query,
+        rate_limit_rate=args.rate_limit_rate
+    ) as cse:
+        config = bench_config(work_dir, search_url=f"{cse.url}/customsearch/v1", workers=args.workers)
+        config["pipeline_mode"] = args.pipeline_mode
+
+        data_dir = config["topics"]["location"]
+        os.makedirs(data_dir, exist_ok=True)
+        pd.DataFrame({config["topics"]["column_name"]: [f"topic {t}" for t in range(args.topics)]}).to_excel(
+            os.path.join(data_dir, config["topics"]["excel_file_name"]), index=False)
+        columns = config["domains"]["columns"]
+        pd.DataFrame({
+            columns["name"]: [f"Site {d}" for d in range(args.domains)],
+            columns["domain"]: [f"site{d}.example" for d in range(args.domains)],
+            columns["max_articles"]: [args.results_per_query] * args.domains
+        }).to_excel(os.path.join(data_dir, config["domains"]["excel_file_name"]), index=False)
+        config_path = os.path.join(work_dir, "config.yaml")
+        with open(config_path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(config, f)
+
+        with record_latencies() as samples, PeakRss() as rss:
+            start = time.perf_counter()
+            main.main(config_path)
+            elapsed = time.perf_counter() - start
+
+        scraped = site.pages_served + site.pdfs_served
+        return {
+            "pipeline_mode": args.pipeline_mode,
+            "queries": cse.requests_served,
+            "throttled_429": cse.throttled,
+            "pages": site.pages_served,
+            "pdfs": site.pdfs_served,
+            "seconds": round(elapsed, 3),
+            "queries_per_second": round(cse.requests_served / elapsed, 2),
+            "pages_per_second": round(scraped / elapsed, 2),
+            "search_latency": latency_stats(samples, cse.url),
+            "page_latency": latency_stats(samples, site.url),
+            "peak_rss_mb": round(rss.peak / 2**20, 1)
+        }
+
+RUNNERS = {"search": run_search, "scrape": run_scrape, "zyte": run_zyte, "storage": run_storage, "e2e": run_e2e}
+
+def _flatten(results, prefix=""):
+    flat = {}
+    for name, value in results.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, key + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[key] = value
+    return flat
+
+def compare(current, baseline, threshold):
+    """
+    Prints each metric next to its baseline value and returns the names of the
+    metrics that got worse by more than threshold percent.
+    """
+    now, before = _flatten(current["scenarios"]), _flatten(baseline["scenarios"])
+    regressions = []
+    print(f"\n{'metric':<45} {'baseline':>12} {'current':>12} {'change':>9}")
+    for key in sorted(now.keys() & before.keys()):
+        old, new = before[key], now[key]
+        if not old:
+            continue
+        change = (new - old) / old * 100
+        worse = -change if any(marker in key for marker in HIGHER_IS_BETTER) else change
+        timing = key.endswith(("seconds", "_ms", "_mb")) or any(marker in key for marker in HIGHER_IS_BETTER)
+        flag = ""
+        if timing and worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:<45} {old:>12} {new:>12} {change:>+8.1f}%{flag}")
+    return regressions
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--topics", type=int, default=5)
+    parser.add_argument("--domains", type=int, default=8)
+    parser.add_argument("--results-per-query", type=int, default=20)
+    parser.add_argument("--articles", type=int, default=300, help="Articles for the scrape and zyte scenarios")
+    parser.add_argument("--storage-articles", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--site-latency", type=float, default=0.05)
+    parser.add_argument("--zyte-latency", type=float, default=0.2)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02, help="Fraction of search queries answered 429")
+    parser.add_argument("--pdf-kb", type=int, default=200)
+    parser.add_argument("--pipeline-mode", choices=("staged", "streaming"), default="staged")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change flagged as a regression")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directories")
+    args = parser.parse_args()
+
+    # Per-request logging would dominate the measurements
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {name: value for name, value in vars(args).items() if name not in ("output", "compare", "keep")},
+        "scenarios": {}
+    }
+
+    for name in args.scenarios:
+        work_dir = tempfile.mkdtemp(prefix=f"scrapescout-bench-{name}-")
+        try:
+            results["scenarios"][name] = RUNNERS[name](args, work_dir)
+        finally:
+            if not args.keep:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        print(f"{name}: {json.dumps(results['scenarios'][name])}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed by more than {args.threshold}%.")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,200 +1,876 @@
 # main.py
 import os
+import time
 import yaml
 import uuid
-import pandas as pd
-import requests
-import time
-from datetime import datetime
-from utils.logger import logger
+import socket
+import argparse
+import itertools
+import threading
+from urllib.parse import urlsplit
+from utils import http_client, metrics
+from utils.logger import logger, configure_logging
+from utils.config import config_flag
+from utils.rate_limiter import SharedRateLimiter, QuotaExhausted
+from utils.job_queue import JobQueue
+from utils.concurrency import run_concurrently, run_per_domain
+from utils.domain_health import domain_controller_from_config
+from utils.fetch_router import fetch_router_from_config
+from utils.search_cache import SearchCache
+from utils.dedup import UrlIndex, deduplicate_articles
+from utils.pdf_downloader import configure_pdf_downloads, is_pdf_url
 from utils.storage import (
-        store_articles_in_db,
+        ArticleStore,
         store_articles_in_excel,
+        export_articles,
         store_article_markdown,
         store_article_pdf,
-        load_articles_from_db
+        pack_article_markdown,
+        pack_article_pdf
 )
-from markdownify import markdownify
+from utils.content_store import content_store_from_config
+from utils.fulltext_index import fulltext_index_from_config
+from utils.input_cache import load_search_inputs
+from utils.query_planner import QueryPlanner, domain_for_url
+
+# Google CSE returns at most 10 items per request and nothing past result 100
+RESULTS_PER_PAGE = 10
+MAX_SEARCH_RESULTS = 100
+# Throttled or temporarily failing search requests worth another (rate-limited) attempt
+SEARCH_RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-def search_articles(api_config, query, domain, max_articles, max_qpm):
+def fetch_search_page(api_config, params, rate_limiter, cache=None, failures=None):
     """
-    Makes a single query to the Google Custom Search API,
-    respecting max_queries_per_minute (QPM).
+    Fetches one page of search results, serving it from the response cache when
+    possible. Only cache misses wait on the rate limiter and count against the
+    daily query budget. Returns the parsed JSON response, or None on failure;
+    the reason ("quota" or "error") is appended to failures when it is given.
     """
-    logger.debug(f"Searching articles for '{query}' on domain '{domain}' (max: {max_articles})")
+    engine = api_config.get("api_name")
 
-    # Throttle (queries per minute)
-    if max_qpm > 0:
-        time.sleep(60.0 / max_qpm)
+    if cache is not None:
+        cached = cache.get(engine, params)
+        metrics.increment("search_cache_lookups", engine=engine, result="miss" if cached is None else "hit")
+        if cached is not None:
+            logger.debug(f"Search cache hit for '{params.get('q')}' on '{params.get('siteSearch')}'")
+            return cached
 
-    articles = []
+    for attempt in range(http_client.max_retries() + 1):
+        # Throttle (queries per minute / per day); every attempt is a billed query
+        with metrics.timer("search_rate_limit_wait_seconds", engine=engine):
+            acquired = rate_limiter.acquire()
+        if not acquired:
+            metrics.increment("search_quota_skips", engine=engine)
+            logger.info(f"Max daily queries reached. Skipping '{params.get('q')}' on '{params.get('siteSearch')}'.")
+            if failures is not None:
+                failures.append("quota")
+            return None
+
+        response = None
+        try:
+            with metrics.timer("search_request_seconds", engine=engine) as labels:
+                labels["status"] = "error"
+                # No transparent status/read retries: each retry below takes its own limiter token
+                response = http_client.get_metered(api_config.get("api_url"), params=params)
+                labels["status"] = response.status_code
+            metrics.increment("search_requests", engine=engine, status=response.status_code)
+            metrics.increment("search_bytes_downloaded", len(response.content), engine=engine)
+            logger.debug(f"Full Request URL: {response.url}")
+
+            if response.ok:
+                data = response.json()
+                if cache is not None:
+                    cache.put(engine, params, data)
+                return data
+            logger.warning(f"Search API call failed with status {response.status_code}")
+            logger.opt(lazy=True).debug("Response text: {}", lambda: response.text)
+            if response.status_code not in SEARCH_RETRY_STATUSES:
+                break
+        except Exception as e:
+            metrics.increment("search_requests", engine=engine, status="error")
+            logger.exception(f"Error searching articles for {params.get('q')} on {params.get('siteSearch')}: {e}")
+
+        if attempt < http_client.max_retries():
+            delay = http_client.retry_delay(response, attempt)
+            logger.debug(f"Retrying search for '{params.get('q')}' in {delay:.1f}s.")
+            time.sleep(delay)
+
+    if failures is not None:
+        failures.append("error")
+    return None
+
+def _has_next_page(page, start):
+    """
+    A page ends the result set if it came back short or the API reports no nextPage.
+    """
+    if len(page.get("items", [])) < RESULTS_PER_PAGE:
+        return False
+    return bool(page.get("queries", {}).get("nextPage")) and start + RESULTS_PER_PAGE <= MAX_SEARCH_RESULTS
+
+def _base_search_params(api_config, query):
     params = {
         "key": api_config.get("api_key"),
         "cx": api_config.get("cx"),
         "q": query,
         "lr": "lang_en",
-        "safe": "off",
-        "siteSearch": domain,
-        "siteSearchFilter": "i"
+        "safe": "off"
     }
 
     # Optional dateRestrict
     date_restrict_value = api_config.get("dateRestrict", "").strip()
     if date_restrict_value:
         params["dateRestrict"] = date_restrict_value
+    return params
 
-    try:
-        response = requests.get(api_config.get("api_url"), params=params, timeout=10)
-        logger.debug(f"Full Request URL: {response.url}")
-
-        if response.ok:
-            data = response.json()
-            items = data.get("items", [])[:max_articles]
-            for item in items:
-                articles.append({
-                    "source_guid": str(uuid.uuid4()),
-                    "source_name": domain,
-                    "source_domain": domain,
-                    "search_engine_name": api_config.get("api_name"),
-                    "source_url": item.get("link"),
-                    "source_article_title": item.get("title"),
-                    "search_query": query
-                })
-        else:
-            logger.warning(f"Search API call failed with status {response.status_code}")
-            logger.debug(f"Response text: {response.text}")
-    except Exception as e:
-        logger.exception(f"Error searching articles for {query} on {domain}: {e}")
+def _make_article(api_config, query, domain, item):
+    return {
+        "source_guid": str(uuid.uuid4()),
+        "source_name": domain,
+        "source_domain": domain,
+        "search_engine_name": api_config.get("api_name"),
+        "source_url": item.get("link"),
+        "source_article_title": item.get("title"),
+        "search_query": query
+    }
 
+def search_articles(api_config, query, domain, max_articles, rate_limiter, cache=None, max_page_workers=4,
+                    failures=None):
+    """
+    Queries the Google Custom Search API for up to max_articles results.
+    Results beyond the first 10 are fetched by paging with the `start` parameter;
+    the pages needed are computed up front and fetched concurrently once the first
+    page confirms there is more to get.
+    Every request waits on the shared rate_limiter, which enforces
+    max_queries_per_minute and max_queries_per_day across all concurrent searches.
+    Responses are read from / written to the optional search cache.
+    Pages that could not be fetched are reported through failures (see fetch_search_page).
+    """
+    logger.debug(f"Searching articles for '{query}' on domain '{domain}' (max: {max_articles})")
+
+    articles = []
+    params = dict(_base_search_params(api_config, query), siteSearch=domain, siteSearchFilter="i")
+
+    # Work out up front how many pages are needed to honour max_articles
+    max_articles = min(int(max_articles), MAX_SEARCH_RESULTS)
+    if max_articles <= 0:
+        return articles
+    page_starts = list(range(1, max_articles + 1, RESULTS_PER_PAGE))
+
+    def fetch_page(start):
+        page_params = dict(params, num=min(RESULTS_PER_PAGE, max_articles - start + 1))
+        if start > 1:
+            page_params["start"] = start
+        return fetch_search_page(api_config, page_params, rate_limiter, cache, failures)
+
+    # The first page tells us whether there is anything beyond it
+    first_page = fetch_page(page_starts[0])
+    if first_page is None:
+        return articles
+    pages = {page_starts[0]: first_page}
+
+    if len(page_starts) > 1 and _has_next_page(first_page, page_starts[0]):
+        total_results = int(first_page.get("searchInformation", {}).get("totalResults", 0) or 0)
+        remaining = [start for start in page_starts[1:] if not total_results or start <= total_results]
+        for start, page in run_concurrently(fetch_page, remaining, max_page_workers):
+            if page is not None:
+                pages[start] = page
+
+    items = []
+    for start in page_starts:
+        page = pages.get(start)
+        if page is None:
+            break
+        items.extend(page.get("items", []))
+        if not _has_next_page(page, start):
+            break
+
+    for item in items[:max_articles]:
+        articles.append(_make_article(api_config, query, domain, item))
+
+    metrics.increment("search_results", len(articles), engine=api_config.get("api_name"))
     return articles
 
-def main():
-    with open("config.yaml", "r", encoding="utf-8") as f:
+def search_articles_batched(api_config, query, domains, rate_limiter, planner, cache=None, max_page_workers=4,
+                            failures=None):
+    """
+    Searches several sparse domains with one combined query,
+    `query (site:a.com OR site:b.com ...)`, and splits the returned items back
+    to their domains, keeping at most each domain's max_articles.
+
+    A full result page means some domain may have been cut short. Domains that
+    already have all the results they want keep them and the rest are queried
+    again without them. If none was satisfied, the domain(s) crowding the page
+    are marked dense in the planner and searched on their own (with
+    pagination); a full page with nobody to single out is split in two. Nothing is lost against one query per
+    domain, and sparse domains cost a fraction of the queries.
+
+    :param domains: [(domain, max_articles), ...]
+    """
+    logger.debug(f"Searching articles for '{query}' on {len(domains)} domains in one query")
+    articles = []
+    combined = 0
+    pending = [[(domain, min(int(max_articles), MAX_SEARCH_RESULTS)) for domain, max_articles in domains
+                if int(max_articles) > 0]]
+
+    while pending:
+        batch = pending.pop()
+        if len(batch) == 1:
+            domain, max_articles = batch[0]
+            articles.extend(search_articles(
+                api_config, query, domain, max_articles, rate_limiter, cache, max_page_workers, failures
+            ) or [])
+            continue
+
+        params = dict(_base_search_params(api_config, planner.build_query(query, batch)), num=RESULTS_PER_PAGE)
+        page = fetch_search_page(api_config, params, rate_limiter, cache, failures)
+        if page is None:
+            continue
+
+        limits = dict(batch)
+        found = {domain: [] for domain in limits}
+        for item in page.get("items", []):
+            domain = domain_for_url(item.get("link"), limits)
+            if domain is not None:
+                found[domain].append(item)
+
+        if not _has_next_page(page, 1):
+            for domain, items in found.items():
+                combined += len(items[:limits[domain]])
+                articles.extend(_make_article(api_config, query, domain, item) for item in items[:limits[domain]])
+            continue
+
+        # The page was full: keep the domains that are already satisfied...
+        remaining = []
+        for domain, max_articles in batch:
+            if len(found[domain]) >= max_articles:
+                combined += max_articles
+                articles.extend(_make_article(api_config, query, domain, item) for item in found[domain][:max_articles])
+            else:
+                remaining.append((domain, max_articles))
+
+        # ...and re-query the rest without them. If nobody was satisfied, search
+        # the domain(s) crowding the page on their own, or failing that split the batch
+        if remaining and len(remaining) == len(batch):
+            most = max(len(found[domain]) for domain, _ in remaining)
+            dense = [(domain, max_articles) for domain, max_articles in remaining
+                     if most >= 2 and len(found[domain]) == most]
+            for domain, max_articles in dense:
+                planner.mark_dense(domain)
+                metrics.increment("search_domains_split_out")
+                pending.append([(domain, max_articles)])
+            remaining = [entry for entry in remaining if entry not in dense]
+            if len(remaining) == len(batch):
+                half = len(remaining) // 2
+                pending.extend([remaining[:half], remaining[half:]])
+                remaining = []
+        if remaining:
+            pending.append(remaining)
+
+    metrics.increment("search_results", combined, engine=api_config.get("api_name"))
+    return articles
+
+def run_search_batch(api_config, topic, batch, rate_limiter, cache=None, max_page_workers=4, planner=None,
+                     failures=None):
+    """
+    Runs one (topic, [(domain, max_articles), ...]) search job: a plain
+    per-domain search for a single domain, a combined query otherwise.
+    """
+    if len(batch) == 1 or planner is None:
+        articles = []
+        for domain, max_articles in batch:
+            articles.extend(search_articles(
+                api_config, topic, domain, max_articles, rate_limiter, cache, max_page_workers, failures
+            ) or [])
+        return articles
+    return search_articles_batched(api_config, topic, batch, rate_limiter, planner, cache, max_page_workers, failures)
+
+def build_query_planner(config):
+    """
+    Returns a QueryPlanner when search_settings.domain_batching.enabled is set, else None.
+    """
+    batching_config = config.get("search_settings", {}).get("domain_batching", {})
+    if not config_flag(batching_config, "enabled"):
+        return None
+    return QueryPlanner(
+        max_domains_per_query=batching_config.get("max_domains_per_query", 10),
+        max_query_chars=batching_config.get("max_query_chars", 1024)
+    )
+
+def iter_search_jobs(config, planner=None):
+    """
+    Yields (topic, [(domain, max_articles), ...]) search jobs from the topics and
+    domains spreadsheets (parsed once, then served from the input cache while
+    the files are unchanged): one per topic x domain pair, or, with a planner,
+    one per group of domains searched together. Jobs are planned lazily, so domains found dense by earlier searches are
+    searched on their own for later topics.
+    """
+    topics_list, domains = load_search_inputs(config)
+
+    for topic in topics_list:
+        if planner is None:
+            for domain, max_articles in domains:
+                yield topic, [(domain, max_articles)]
+        else:
+            yield from planner.plan(topic, domains)
+
+def build_search_cache(config):
+    """
+    Optional on-disk response cache; hits don't spend quota or rate-limit slots.
+    Returns None unless search_cache.enabled is set.
+    """
+    cache_config = config.get("search_cache", {})
+    if not config_flag(cache_config, "enabled"):
+        return None
+    return SearchCache(
+        cache_config.get("path", os.path.join(config["db_storage"]["path"], "search_cache.db")),
+        ttl_hours=cache_config.get("ttl_hours", 24),
+        max_entries=cache_config.get("max_entries", 50000)
+    )
+
+def build_rate_limiter(config):
+    """
+    The search quota limiter. Every search thread (and every queue worker on the
+    same database) must share its budget, so its daily count lives in the article DB.
+    """
+    search_settings = config.get("search_settings", {})
+    return SharedRateLimiter(
+        os.path.join(config["db_storage"]["path"], config["db_storage"]["name"]),
+        "search",
+        search_settings.get("max_queries_per_minute", 100),
+        search_settings.get("max_queries_per_day", 10000),
+        burst=search_settings.get("burst", 1)
+    )
+
+def build_url_index(config, article_store):
+    """
+    Global dedup index over every stored article URL.
+    Returns None unless de_duplicate_articles is on.
+    """
+    if not config_flag(config, "de_duplicate_articles", "off"):
+        return None
+    dedup_settings = config.get("dedup_settings", {})
+    return UrlIndex(
+        article_store,
+        bloom_threshold=dedup_settings.get("bloom_threshold", 1000000),
+        error_rate=dedup_settings.get("bloom_error_rate", 0.001)
+    )
+
+def load_scrape_engine(config):
+    """
+    Returns (fetch_article, close) for the configured scrape engine, or for the
+    per-domain fetch router when fetch_routing is enabled.
+    """
+    router = fetch_router_from_config(config)
+    if router is not None:
+        logger.info(f"Routing each domain to the cheapest working fetch strategy ({', '.join(router.strategies)}).")
+        return router.fetch_article, router.close
+
+    if config.get("scrape_engine_selection", "custom").lower() == "custom":
+        from utils.scraper_custom_selenium import fetch_article, close_browser_pool
+        logger.info("Using CUSTOM scrape engine.")
+        return fetch_article, close_browser_pool
+
+    from utils.scraper_zyte import fetch_article, close_zyte_client
+    logger.info("Using ZYTE scrape engine.")
+    return fetch_article, close_zyte_client
+
+def article_domain(article):
+    return urlsplit(article.get("source_url") or "").hostname or article.get("source_domain")
+
+def make_scrape_job(config, fetch_article, content_store=None, fulltext_index=None):
+    """
+    Returns the function that fetches one article (or PDF) and stores its content,
+    adding scraped text to the full-text index when one is given.
+    It is safe to call from several worker threads at once.
+    """
+    engine = config.get("scrape_engine_selection", "custom").lower()
+    markdown_out_path = config["output_markdown"]["path"]
+    short_title_limit = config.get("markdown_settings", {}).get("short_title_limit", 15)
+    pdf_staging_path = os.path.join(markdown_out_path, ".pdf_staging")
+
+    def store_pdf(article, topic_for_article):
+        if content_store is not None:
+            return pack_article_pdf(content_store, pdf_staging_path, article, topic_for_article)
+        return store_article_pdf(markdown_out_path, article, topic_for_article, short_title_limit)
+
+    def timed_store_pdf(article, topic_for_article):
+        with metrics.timer("scrape_seconds", engine="pdf", domain=article_domain(article)) as labels:
+            result = store_pdf(article, topic_for_article)
+            labels["status"] = result["status"]
+        return result
+
+    def scrape_job(article):
+        topic_for_article = article.get("search_query") or "general"
+
+        if is_pdf_url(article.get("source_url")):
+            return timed_store_pdf(article, topic_for_article)
+
+        with metrics.timer("scrape_seconds", engine=engine, domain=article_domain(article)) as labels:
+            result = fetch_article(article, config)
+            labels["status"] = result["status"]
+            labels["engine"] = result.get("strategy", engine)
+        if result["status"] == "pdf":
+            return timed_store_pdf(article, topic_for_article)
+        if result["status"] == "ok":
+            article["article_content"] = result.pop("content")
+            if content_store is not None:
+                result.update(pack_article_markdown(content_store, article, topic_for_article))
+            elif not store_article_markdown(markdown_out_path, article, topic_for_article, short_title_limit):
+                result = {"status": "failed", "error": "Could not write Markdown file"}
+            if fulltext_index is not None and result["status"] == "ok":
+                fulltext_index.add(article["source_guid"], article.get("source_article_title"), article["article_content"])
+            article.pop("article_content", None)
+        return result
+
+    return scrape_job
+
+def record_scrape_outcome(article_store, article, result):
+    """
+    Persists the result of one scrape job and returns its status.
+    """
+    if result is None:
+        result = {"status": "failed", "error": "Unhandled scrape error"}
+
+    # The same PDF behind a different URL: keep one copy on disk
+    content_path = result.get("content_path")
+    if content_path and result.get("content_sha256"):
+        existing_path = article_store.find_content_by_sha256(result["content_sha256"], article["source_guid"])
+        if existing_path and existing_path != content_path and os.path.exists(existing_path):
+            logger.info(f"PDF identical to {existing_path}; discarding duplicate download {content_path}")
+            os.remove(content_path)
+            content_path = existing_path
+
+    # Record the outcome right away so a restarted run resumes from here
+    metrics.increment("scrape_outcomes", status=result["status"])
+    article_store.record_scrape_result(
+        article["source_guid"],
+        result["status"],
+        etag=result.get("etag"),
+        last_modified=result.get("last_modified"),
+        error=result.get("error"),
+        content_bytes=result.get("content_bytes"),
+        content_sha256=result.get("content_sha256"),
+        content_path=content_path,
+        suspected_duplicate=result.get("suspected_duplicate")
+    )
+    return result["status"]
+
+def main(config_path="config.yaml"):
+    with open(config_path, "r", encoding="utf-8") as f:
         config = yaml.safe_load(f)
 
+    configure_logging(config)
+    metrics.reset()
+    metrics.configure_metrics(config)
+
+    # Shared keep-alive session (pooling, compression, retry/backoff) for every outbound request
+    http_client.configure_http_client(config)
+
     # Config variables
     search_engine_selection = config.get("search_engine_selection", "google")
     engines_config = config.get("search_engines", {})
     selected_engine_config = engines_config.get(search_engine_selection, {})
 
     search_settings = config.get("search_settings", {})
-    max_qpm = search_settings.get("max_queries_per_minute", 100)   # queries per minute
     max_qpd = search_settings.get("max_queries_per_day", 10000)    # queries per day
 
     run_search = config.get("run_search", "yes").lower()  # "yes" or "no"
     scrape_engine_selection = config.get("scrape_engine_selection", "custom")
     scrape_flag = config.get("scrape_articles", "yes")
-    deduplicate_flag = config.get("de_duplicate_articles", "off")
-
-    markdown_settings = config.get("markdown_settings", {})
-    short_title_limit = markdown_settings.get("short_title_limit", 15)
 
     db_path = config["db_storage"]["path"]
     db_name = config["db_storage"]["name"]
     excel_out_path = config["output_excel"]["path"]
     excel_out_file = config["output_excel"]["file_name"]
-    markdown_out_path = config["output_markdown"]["path"]
-    
-    all_articles = []
-    
+    # "per_batch" rewrites the workbook after every query (legacy behaviour);
+    # "end" exports it once from the DB; "every_n" also exports every N search batches
+    excel_write_mode = str(config["output_excel"].get("write_mode", "end")).lower()
+    excel_flush_every = int(config["output_excel"].get("flush_every_batches", 50) or 0)
+
+    # "staged" finishes every search before scraping starts; "streaming" runs the
+    # search stage in the background and scrapes new articles as they are persisted
+    pipeline_mode = str(config.get("pipeline_mode", "staged")).lower()
+    search_thread = None
+
+    # One connection for the whole run; writes are batched into transactions
+    article_store = ArticleStore(db_path, db_name, flush_size=config["db_storage"].get("flush_size", 500))
+
     if run_search == "yes":
         logger.info("Running search logic...")
 
-        # Load Topics
-        topic_config = config.get("topics", {})
-        topics_excel = os.path.join(topic_config["location"], topic_config["excel_file_name"])
-        topics_df = pd.read_excel(topics_excel, sheet_name=topic_config["sheet_name"])
-        topics_list = topics_df[topic_config["column_name"]].dropna().tolist()
-
-        # Load Domains
-        domain_config = config.get("domains", {})
-        domains_excel = os.path.join(domain_config["location"], domain_config["excel_file_name"])
-        domains_df = pd.read_excel(domains_excel, sheet_name=domain_config["sheet_name"])
-        domains_records = domains_df.to_dict("records")
-
-        # Perform your daily_count logic if needed
-        daily_count = 0
-        for topic in topics_list:
-            if daily_count >= max_qpd:
-                logger.info("Max daily queries reached. Stopping early.")
-                break
+        # One limiter is shared by every search thread so the QPM/QPD budget holds globally;
+        # its daily count lives in the DB, so repeated runs on the same day share one quota
+        rate_limiter = build_rate_limiter(config)
+        max_concurrent = search_settings.get("max_concurrent_requests", 4)
+        max_page_workers = search_settings.get("max_concurrent_pages", 4)
 
-            for domain_row in domains_records:
-                if daily_count >= max_qpd:
-                    logger.info("Max daily queries reached in domain loop.")
-                    break
+        search_cache = build_search_cache(config)
+        # Optionally several sparse domains per query instead of one query per domain
+        planner = build_query_planner(config)
 
-                domain_value = domain_row[domain_config["columns"]["domain"]]
-                max_articles = domain_row[domain_config["columns"]["max_articles"]]
-
-                found_articles = search_articles(
-                    # your engine config, e.g. config["search_engines"]["google"]
-                    config["search_engines"][config["search_engine_selection"]],
-                    topic,
-                    domain_value,
-                    max_articles,
-                    max_qpm
-                )
-                daily_count += 1
-
-                # Deduplicate if needed (local or global)
-                if deduplicate_flag == "on":
-                    # deduplicate logic
-                    unique_urls = set()
-                    deduped_batch = []
-                    for article in found_articles:
-                        if article["source_url"] not in unique_urls:
-                            article["suspected_duplicate"] = "no"
-                            unique_urls.add(article["source_url"])
-                            deduped_batch.append(article)
-                        else:
-                            article["suspected_duplicate"] = "yes"
-                            deduped_batch.append(article)
-                    found_articles = deduped_batch
-
-                # Immediately store to DB & Excel
-                store_articles_in_db(db_path, db_name, found_articles)
-                store_articles_in_excel(excel_out_path, excel_out_file, found_articles)
-
-                # Keep them in memory for potential scraping
-                all_articles.extend(found_articles)
+        def search_jobs():
+            for job in iter_search_jobs(config, planner):
+                if rate_limiter.exhausted:
+                    logger.info("Max daily queries reached. Stopping early.")
+                    return
+                yield job
+
+        def run_search_job(job):
+            topic, batch = job
+            return run_search_batch(
+                selected_engine_config,
+                topic,
+                batch,
+                rate_limiter,
+                search_cache,
+                max_page_workers,
+                planner
+            )
+
+        # Global dedup index, loaded once from the DB
+        url_index = build_url_index(config, article_store)
+
+        def search_stage():
+            """
+            Runs every search, deduplicating and persisting each batch as it arrives.
+            """
+            batch_count = 0
+            for job, found_articles in run_concurrently(run_search_job, search_jobs(), max_concurrent):
+                if found_articles is None:
+                    continue
+                batch_count += 1
+
+                # Deduplicate against every URL stored in this or any earlier run
+                if url_index is not None:
+                    found_articles = deduplicate_articles(found_articles, url_index)
+
+                # Immediately store to DB (and Excel, depending on write mode)
+                article_store.add_articles(found_articles)
+                if excel_write_mode == "per_batch":
+                    store_articles_in_excel(excel_out_path, excel_out_file, found_articles)
+                elif excel_write_mode == "every_n" and excel_flush_every > 0 and batch_count % excel_flush_every == 0:
+                    article_store.flush()
+                    export_articles(db_path, db_name, config["output_excel"])
+
+            if url_index is not None:
+                logger.info(f"Deduplication dropped {url_index.dropped} previously seen articles.")
+            if search_cache is not None:
+                search_cache.log_stats()
+                search_cache.close()
+            logger.info(f"{rate_limiter.used_today} search queries used today (limit {max_qpd}).")
+            rate_limiter.close()
+
+        def search_stage_in_background():
+            try:
+                search_stage()
+            except Exception as e:
+                logger.exception(f"Search stage failed: {e}")
+
+        if pipeline_mode == "streaming" and scrape_flag.lower() == "yes":
+            # Scraping starts on the first persisted results while searches continue
+            search_thread = threading.Thread(target=search_stage_in_background, name="search-stage", daemon=True)
+            search_thread.start()
+        else:
+            search_stage()
 
     else:
-        logger.info("Skipping search logic. Loading existing articles from DB.")
-        all_articles = load_articles_from_db(db_path, db_name)  
-        # or load_articles_from_excel(excel_out_path, excel_out_file)
-        # if you prefer Excel as your source
+        logger.info("Skipping search logic. Scraping articles already stored in the DB.")
 
     # If scraping is enabled, scrape web pages / download PDFs
     if scrape_flag.lower() == "yes":
         
-        scrape_engine_choice = config.get("scrape_engine_selection", "custom").lower()
-        
-        if scrape_engine_choice == "custom":
-            from utils.scraper_custom_selenium import scrape_article
-            logger.info("Using CUSTOM scrape engine.")
-        else:
-            from utils.scraper_zyte import scrape_article 
-            logger.info("Using ZYTE scrape engine.")
-            
-        for article in all_articles:
-            topic_for_article = article.get("search_query", "general")
-            url = article["source_url"].lower()
-
-            if url.endswith(".pdf"):
-                article["date_retrieved"] = datetime.now().isoformat()
-                store_article_pdf(markdown_out_path, article, topic_for_article, short_title_limit)
-            else:
-                content_md = scrape_article(article["source_url"], config)
-                article["article_content"] = content_md
-                article["date_retrieved"] = datetime.now().isoformat()
-                store_article_markdown(markdown_out_path, article, topic_for_article, short_title_limit)
-
-        # Update DB & Excel with final date_retrieved
-        store_articles_in_db(db_path, db_name, all_articles)
-        store_articles_in_excel(excel_out_path, excel_out_file, all_articles)
+        fetch_article, close_scrape_engine = load_scrape_engine(config)
+        configure_pdf_downloads(config)
+
+        # Only articles never scraped, failed (under max_attempts) or due for a refresh
+        scrape_settings = config.get("scrape_settings", {})
+        articles_to_scrape = article_store.iter_articles_to_scrape(
+            refresh_after_days=scrape_settings.get("refresh_after_days", 0),
+            max_attempts=scrape_settings.get("max_attempts", 3),
+            follow=search_thread.is_alive if search_thread is not None else None
+        )
+        outcome_counts = {"ok": 0, "not_modified": 0, "failed": 0, "deferred": 0}
+
+        # "packed" keeps content compressed and hash-keyed in one SQLite file instead of one file per article
+        content_store = content_store_from_config(config)
+        # Optional FTS5 index of scraped text, filled as each article is scraped
+        fulltext_index = fulltext_index_from_config(config)
+        scrape_job = make_scrape_job(config, fetch_article, content_store, fulltext_index)
+
+        # Global worker cap plus per-domain concurrency/delay so no single site is hammered;
+        # slow or failing domains get less concurrency, and are deferred once their circuit opens
+        domain_controller = domain_controller_from_config(config)
+        scraped_results = run_per_domain(
+            scrape_job,
+            articles_to_scrape,
+            key=article_domain,
+            max_workers=scrape_settings.get("max_workers", 8),
+            max_per_domain=scrape_settings.get("max_per_domain", 2),
+            domain_delay=scrape_settings.get("domain_delay_seconds", 1.0),
+            controller=domain_controller
+        )
+
+        for article, result in scraped_results:
+            status = record_scrape_outcome(article_store, article, result)
+            outcome_counts[status] += 1
+
+        close_scrape_engine()
+
+        if search_thread is not None:
+            search_thread.join()
+
+        if content_store is not None:
+            stats = content_store.stats()
+            logger.info(
+                f"Content store: {stats['articles']} articles, {stats['unique_contents']} unique contents, "
+                f"{stats['raw_bytes']} bytes stored as {stats['stored_bytes']}."
+            )
+            content_store.close()
+        if fulltext_index is not None:
+            fulltext_index.close()
+
+        if domain_controller is not None:
+            for domain, stats in domain_controller.stats().items():
+                logger.info(f"Domain {domain}: {stats}")
+
+        logger.info(
+            f"Scraping finished: {outcome_counts['ok']} scraped, "
+            f"{outcome_counts['not_modified']} unchanged, {outcome_counts['failed']} failed, "
+            f"{outcome_counts['deferred']} deferred to the next run."
+        )
     else:
         logger.info("Scraping is disabled. No article content or PDF downloads will be performed.")
 
+    article_store.close()
+    http_client.close_http_client()
+
+    # Write Excel (and any extra export formats) once, straight from the DB
+    export_articles(db_path, db_name, config["output_excel"])
+
+    metrics.finish_run(config, mode="run", pipeline_mode=pipeline_mode)
+
+def open_job_queue(config):
+    queue_config = config.get("job_queue", {})
+    return JobQueue(
+        config["db_storage"]["path"],
+        config["db_storage"]["name"],
+        lease_seconds=queue_config.get("lease_seconds", 300),
+        max_attempts=queue_config.get("max_attempts", 3),
+        retry_backoff=queue_config.get("retry_backoff_seconds", 30)
+    )
+
+def scrape_job_entry(article):
+    return ({"source_guid": article["source_guid"]}, f"scrape:{article['source_guid']}", article_domain(article))
+
+def run_coordinator(config, wait=False, poll_seconds=10):
+    """
+    Enqueues one search job per topic x domain pair (or per group of domains
+    with domain batching) and one scrape job per
+    article still to be scraped. With wait, blocks until workers have drained
+    the queue and then writes the Excel export.
+    """
+    db_path = config["db_storage"]["path"]
+    db_name = config["db_storage"]["name"]
+    job_queue = open_job_queue(config)
+
+    if config.get("run_search", "yes").lower() == "yes":
+        added = job_queue.enqueue_many("search", (
+            (
+                {"topic": topic, "domains": [[domain, int(max_articles)] for domain, max_articles in batch]},
+                f"search:{topic}|{'|'.join(domain for domain, _ in batch)}",
+                None
+            )
+            for topic, batch in iter_search_jobs(config, build_query_planner(config))
+        ))
+        logger.info(f"Enqueued {added} search jobs.")
+
+    if config.get("scrape_articles", "yes").lower() == "yes":
+        scrape_settings = config.get("scrape_settings", {})
+        with ArticleStore(db_path, db_name) as article_store:
+            articles = article_store.iter_articles_to_scrape(
+                refresh_after_days=scrape_settings.get("refresh_after_days", 0),
+                max_attempts=scrape_settings.get("max_attempts", 3)
+            )
+            added = 0
+            while True:
+                batch = [scrape_job_entry(article) for article in itertools.islice(articles, 1000)]
+                if not batch:
+                    break
+                added += job_queue.enqueue_many("scrape", batch)
+        logger.info(f"Enqueued {added} scrape jobs.")
+
+    if wait:
+        while job_queue.unfinished():
+            logger.info(f"Waiting for workers: {job_queue.counts()}")
+            time.sleep(poll_seconds)
+        logger.info(f"Job queue drained: {job_queue.counts()}")
+        export_articles(db_path, db_name, config["output_excel"])
+    job_queue.close()
+
+def run_worker(config, worker_id=None, kinds=("search", "scrape"), threads=None, exit_when_idle=False, poll_seconds=2):
+    """
+    Leases and runs jobs from the queue until stopped (or, with exit_when_idle,
+    until no work is left). Any number of workers, on this machine or others
+    sharing the database file, can run at once; each job is leased by one
+    worker at a time, and search quota is drawn from one shared limiter.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    db_path = config["db_storage"]["path"]
+    db_name = config["db_storage"]["name"]
+    scrape_enabled = config.get("scrape_articles", "yes").lower() == "yes"
+    scrape_settings = config.get("scrape_settings", {})
+    queue_config = config.get("job_queue", {})
+    threads = max(1, int(threads or queue_config.get("worker_threads", 4)))
+
+    http_client.configure_http_client(config)
+    job_queue = open_job_queue(config)
+    article_store = ArticleStore(db_path, db_name, flush_size=config["db_storage"].get("flush_size", 500))
+    handlers = {}
+    rate_limiter = None
+    search_cache = None
+    close_scrape_engine = None
+    content_store = None
+    fulltext_index = None
+
+    if "search" in kinds:
+        search_settings = config.get("search_settings", {})
+        engine_config = config.get("search_engines", {}).get(config.get("search_engine_selection", "google"), {})
+        rate_limiter = build_rate_limiter(config)
+        search_cache = build_search_cache(config)
+        url_index = build_url_index(config, article_store)
+        url_index_lock = threading.Lock()
+
+        planner = build_query_planner(config)
+
+        def handle_search(payload):
+            # Jobs enqueued before domain batching carry a single domain
+            batch = payload.get("domains") or [[payload["domain"], payload["max_articles"]]]
+            failures = []
+            found_articles = run_search_batch(
+                engine_config,
+                payload["topic"],
+                [tuple(entry) for entry in batch],
+                rate_limiter,
+                search_cache,
+                search_settings.get("max_concurrent_pages", 4),
+                planner,
+                failures
+            )
+            # Re-run the whole job later rather than keep partial results;
+            # pages that did come back are served from the search cache then
+            if "quota" in failures:
+                raise QuotaExhausted("Daily search quota used up")
+            if failures:
+                raise RuntimeError(f"{len(failures)} search requests failed")
+            if url_index is not None:
+                with url_index_lock:
+                    found_articles = deduplicate_articles(found_articles, url_index)
+            article_store.add_articles(found_articles)
+            article_store.flush()
+            if scrape_enabled and found_articles:
+                job_queue.enqueue_many("scrape", [scrape_job_entry(article) for article in found_articles])
+
+        handlers["search"] = handle_search
+
+    if "scrape" in kinds and scrape_enabled:
+        fetch_article, close_scrape_engine = load_scrape_engine(config)
+        configure_pdf_downloads(config)
+        content_store = content_store_from_config(config)
+        fulltext_index = fulltext_index_from_config(config)
+        scrape_job = make_scrape_job(config, fetch_article, content_store, fulltext_index)
+
+        def handle_scrape(payload):
+            article = article_store.get_article(payload["source_guid"])
+            if article is None:
+                logger.warning(f"Scrape job for unknown article {payload['source_guid']}; skipping.")
+                return
+            result = scrape_job(article)
+            if record_scrape_outcome(article_store, article, result) == "failed":
+                # Let the queue retry it with backoff
+                raise RuntimeError((result or {}).get("error") or "Scrape failed")
+
+        handlers["scrape"] = handle_scrape
+
+    kinds = [kind for kind in kinds if kind in handlers]
+    stop_heartbeat = job_queue.start_heartbeat(worker_id)
+    logger.info(f"Worker {worker_id} started with {threads} threads for {', '.join(kinds)} jobs.")
+
+    def work():
+        while True:
+            # Out of search quota: keep scraping, leave search jobs for tomorrow
+            active_kinds = [kind for kind in kinds if not (kind == "search" and rate_limiter.exhausted)]
+            job = job_queue.lease(worker_id, active_kinds, scrape_settings.get("max_per_domain", 2)) if active_kinds else None
+            if job is None:
+                # Leased jobs elsewhere (searches especially) may still add work;
+                # with nothing this worker may run until tomorrow, it is idle too
+                if exit_when_idle and (not active_kinds or (
+                        not job_queue.unfinished(active_kinds) and not job_queue.unfinished(statuses=("leased",)))):
+                    return
+                time.sleep(poll_seconds)
+                continue
+            try:
+                handlers[job["kind"]](job["payload"])
+                job_queue.complete(job, worker_id)
+            except QuotaExhausted as e:
+                logger.info(f"Job {job['id']} ({job['kind']}) put back until quota is available: {e}")
+                job_queue.release(job, worker_id)
+            except Exception as e:
+                logger.exception(f"Job {job['id']} ({job['kind']}) failed on attempt {job['attempts']}: {e}")
+                job_queue.fail(job, worker_id, str(e))
+
+    workers = [threading.Thread(target=work, name=f"{worker_id}-{i}") for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    finally:
+        stop_heartbeat.set()
+        if close_scrape_engine is not None:
+            close_scrape_engine()
+        if content_store is not None:
+            content_store.close()
+        if fulltext_index is not None:
+            fulltext_index.close()
+        if search_cache is not None:
+            search_cache.log_stats()
+            search_cache.close()
+        if rate_limiter is not None:
+            rate_limiter.close()
+        article_store.close()
+        job_queue.close()
+        http_client.close_http_client()
+    logger.info(f"Worker {worker_id} finished.")
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Search for and scrape articles.")
+    parser.add_argument("--mode", choices=("run", "coordinator", "worker"), default="run",
+                        help="run: the whole pipeline in this process (default); coordinator: enqueue jobs; "
+                             "worker: process queued jobs")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--jobs", choices=("all", "search", "scrape"), default="all", help="Job kinds a worker takes")
+    parser.add_argument("--threads", type=int, help="Jobs a worker runs at once (default job_queue.worker_threads)")
+    parser.add_argument("--worker-id", help="Defaults to <hostname>-<pid>")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Worker exits once the queue is empty")
+    parser.add_argument("--wait", action="store_true", help="Coordinator waits for the queue to drain, then exports Excel")
+    args = parser.parse_args(argv)
+
+    if args.mode == "run":
+        main(args.config)
+        return
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    configure_logging(config)
+    metrics.configure_metrics(config)
+    if args.mode == "coordinator":
+        run_coordinator(config, wait=args.wait)
+        metrics.finish_run(config, mode=args.mode)
+    else:
+        kinds = ("search", "scrape") if args.jobs == "all" else (args.jobs,)
+        worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        run_worker(config, worker_id, kinds, args.threads, args.exit_when_idle)
+        metrics.finish_run(config, mode=args.mode, worker_id=worker_id)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
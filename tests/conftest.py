@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# Tests import the pipeline modules the way main.py does (`from utils import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,102 @@
+# test_domain_health.py
+from utils.domain_health import DomainController
+
+OK = {"status": "ok"}
+FAILED = {"status": "failed", "error": "timeout"}
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def make_controller(**kwargs):
+    clock = FakeClock()
+    options = {"max_per_domain": 4, "failure_threshold": 3, "cooldown": 60, "max_cooldown": 200, "clock": clock}
+    options.update(kwargs)
+    return DomainController(**options), clock
+
+def open_circuit(controller, domain="a.com"):
+    opened = [controller.record(domain, 1.0, FAILED) for _ in range(controller.failure_threshold)]
+    assert opened[-1] and not any(opened[:-1])
+
+def test_failures_halve_the_limit_and_fast_successes_grow_it():
+    controller, _ = make_controller(failure_threshold=10)
+    assert controller.can_start("a.com", 3)
+    assert not controller.can_start("a.com", 4)
+
+    controller.record("a.com", 1.0, FAILED)
+    assert not controller.can_start("a.com", 2)
+    # About +1 per round of requests at the current limit
+    for _ in range(6):
+        controller.record("a.com", 1.0, OK)
+    assert controller.can_start("a.com", 3)
+
+def test_slow_responses_halve_the_limit():
+    controller, _ = make_controller(slow_seconds=5)
+    controller.record("a.com", 30.0, OK)
+    assert controller.can_start("a.com", 1)
+    assert not controller.can_start("a.com", 2)
+
+def test_consecutive_failures_open_the_circuit():
+    controller, clock = make_controller()
+    for _ in range(2):
+        controller.record("a.com", 1.0, FAILED)
+        controller.record("a.com", 1.0, FAILED)
+        controller.record("a.com", 1.0, OK)
+    assert not controller.is_open("a.com")
+
+    open_circuit(controller)
+    assert controller.is_open("a.com")
+    assert controller.probe_at("a.com") == clock.now + 60
+    assert not controller.can_start("a.com", 0)
+    # Other domains are unaffected
+    assert controller.can_start("b.com", 0)
+
+def test_a_successful_probe_closes_the_circuit():
+    controller, clock = make_controller()
+    open_circuit(controller)
+
+    clock.now += 60
+    assert controller.can_start("a.com", 0)
+    # Only the one probe while half open
+    assert not controller.can_start("a.com", 1)
+    assert controller.record("a.com", 1.0, OK) is False
+    assert controller.stats()["a.com"]["state"] == "closed"
+    assert controller.can_start("a.com", 0)
+
+def test_a_failed_probe_reopens_with_twice_the_cooldown():
+    controller, clock = make_controller()
+    open_circuit(controller)
+
+    for cooldown in (120, 200, 200):
+        clock.now = controller.probe_at("a.com")
+        assert controller.can_start("a.com", 0)
+        assert controller.record("a.com", 1.0, FAILED) is True
+        assert controller.probe_at("a.com") == clock.now + cooldown
+
+    clock.now = controller.probe_at("a.com")
+    controller.can_start("a.com", 0)
+    controller.record("a.com", 1.0, OK)
+    # Back to the configured cooldown once recovered
+    open_circuit(controller)
+    assert controller.probe_at("a.com") == clock.now + 60
+
+def test_gone_pages_do_not_count_as_failures():
+    controller, _ = make_controller()
+    for status in (404, 410) * 3:
+        assert controller.record("a.com", 1.0, {"status": "failed", "http_status": status}) is False
+    assert not controller.is_open("a.com")
+    assert "a.com" not in controller.stats()
+
+    open_circuit(controller)
+    assert controller.record("a.com", 1.0, {"status": "failed", "http_status": 503}) is False
+    assert controller.is_open("a.com")
+
+def test_deferred_jobs_are_counted():
+    controller, _ = make_controller()
+    open_circuit(controller)
+    result = controller.deferred_result("a.com")
+    assert result["status"] == "deferred"
+    assert controller.stats()["a.com"]["deferred"] == 1
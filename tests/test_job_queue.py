@@ -0,0 +1,95 @@
+# test_job_queue.py
+import time
+import pytest
+from utils.job_queue import JobQueue
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(**kwargs):
+        queue = JobQueue(str(tmp_path), "articles.db", **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+def status_of(queue, job):
+    return queue.conn.execute("SELECT status FROM jobs WHERE id = ?", (job["id"],)).fetchone()[0]
+
+def test_a_job_is_leased_by_one_worker_at_a_time(make_queue):
+    queue = make_queue()
+    queue.enqueue("scrape", {"guid": "a"}, dedupe_key="a")
+    assert queue.enqueue("scrape", {"guid": "a"}, dedupe_key="a") is False
+
+    job = queue.lease("w1", ["scrape"])
+    assert job["payload"] == {"guid": "a"} and job["attempts"] == 1
+    assert queue.lease("w2", ["scrape"]) is None
+    assert queue.complete(job, "w1")
+    assert queue.counts() == {"scrape": {"done": 1}}
+
+def test_an_expired_lease_is_taken_over(make_queue):
+    # A lease of 0 seconds has expired by the next lease() call
+    queue = make_queue(lease_seconds=0, max_attempts=3)
+    queue.enqueue("scrape", {"guid": "a"})
+
+    first = queue.lease("dead-worker", ["scrape"])
+    second = queue.lease("w2", ["scrape"])
+    assert second["id"] == first["id"]
+    assert second["attempts"] == 2
+    # The worker that lost its lease can't overwrite the new owner's outcome
+    assert queue.complete(first, "dead-worker") is False
+    assert status_of(queue, second) == "leased"
+
+def test_a_job_whose_workers_keep_dying_is_failed(make_queue):
+    queue = make_queue(lease_seconds=0, max_attempts=2)
+    queue.enqueue("scrape", {"guid": "a"})
+
+    job = queue.lease("w1", ["scrape"])
+    assert queue.lease("w2", ["scrape"])["attempts"] == 2
+    assert queue.lease("w3", ["scrape"]) is None
+    assert status_of(queue, job) == "failed"
+    assert queue.unfinished() == 0
+
+def test_fail_retries_with_backoff_then_gives_up(make_queue):
+    queue = make_queue(max_attempts=2, retry_backoff=0)
+    queue.enqueue("scrape", {"guid": "a"})
+
+    job = queue.lease("w1", ["scrape"])
+    queue.fail(job, "w1", "timeout")
+    assert status_of(queue, job) == "queued"
+    job = queue.lease("w1", ["scrape"])
+    assert job["attempts"] == 2
+    queue.fail(job, "w1", "timeout")
+    assert status_of(queue, job) == "failed"
+
+def test_fail_backoff_delays_the_retry(make_queue):
+    queue = make_queue(retry_backoff=60)
+    queue.enqueue("scrape", {"guid": "a"})
+    job = queue.lease("w1", ["scrape"])
+    queue.fail(job, "w1", "timeout")
+
+    available_at = queue.conn.execute("SELECT available_at FROM jobs WHERE id = ?", (job["id"],)).fetchone()[0]
+    assert available_at > time.time() + 50
+    assert queue.lease("w1", ["scrape"]) is None
+
+def test_release_does_not_count_the_attempt(make_queue):
+    queue = make_queue(max_attempts=1)
+    queue.enqueue("search", {"topic": "t"})
+
+    job = queue.lease("w1", ["search"])
+    queue.release(job, "w1")
+    job = queue.lease("w1", ["search"])
+    assert job["attempts"] == 1
+    queue.fail(job, "w1", "boom")
+    assert status_of(queue, job) == "failed"
+
+def test_max_per_group_caps_running_jobs_per_domain(make_queue):
+    queue = make_queue()
+    queue.enqueue_many("scrape", [({"n": i}, None, "example.com") for i in range(3)])
+
+    assert queue.lease("w1", ["scrape"], max_per_group=2) is not None
+    assert queue.lease("w2", ["scrape"], max_per_group=2) is not None
+    assert queue.lease("w3", ["scrape"], max_per_group=2) is None
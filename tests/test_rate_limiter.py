@@ -0,0 +1,93 @@
+# test_rate_limiter.py
+from utils.rate_limiter import RateLimiter, SharedRateLimiter
+
+class FakeClock:
+    """
+    Clock whose sleep() advances time instead of blocking.
+    """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_requests_are_spaced_by_the_per_minute_rate():
+    clock = FakeClock()
+    limiter = RateLimiter(60, clock=clock, sleep=clock.sleep)
+    for _ in range(4):
+        assert limiter.acquire()
+    assert clock.sleeps == [1.0, 1.0, 1.0]
+    assert limiter.used_today == 4
+
+def test_burst_allows_back_to_back_requests_then_throttles():
+    clock = FakeClock()
+    limiter = RateLimiter(60, burst=3, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        assert limiter.acquire()
+    assert clock.sleeps == [1.0, 1.0]
+
+def test_idle_time_refills_the_bucket_up_to_burst():
+    clock = FakeClock()
+    limiter = RateLimiter(60, burst=2, clock=clock, sleep=clock.sleep)
+    limiter.acquire()
+    limiter.acquire()
+    clock.now += 60
+    limiter.acquire()
+    limiter.acquire()
+    assert clock.sleeps == []
+    limiter.acquire()
+    assert clock.sleeps == [1.0]
+
+def test_daily_cap_refuses_without_blocking():
+    clock = FakeClock()
+    limiter = RateLimiter(0, max_per_day=2, clock=clock, sleep=clock.sleep)
+    assert limiter.acquire()
+    assert not limiter.exhausted
+    assert limiter.acquire()
+    assert limiter.exhausted
+    assert limiter.acquire() is False
+    assert limiter.used_today == 2
+    assert clock.sleeps == []
+
+def test_shared_limiters_draw_from_one_budget(tmp_path):
+    clock = FakeClock()
+    db_full_path = str(tmp_path / "articles.db")
+    first = SharedRateLimiter(db_full_path, "search", 60, max_per_day=3, clock=clock, sleep=clock.sleep)
+    second = SharedRateLimiter(db_full_path, "search", 60, max_per_day=3, clock=clock, sleep=clock.sleep)
+    try:
+        assert first.acquire()
+        # The second process sees the slot the first one took
+        assert second.acquire()
+        assert clock.sleeps == [1.0]
+        assert first.acquire()
+        assert second.acquire() is False
+        assert first.used_today == second.used_today == 3
+        assert first.exhausted and second.exhausted
+    finally:
+        first.close()
+        second.close()
+
+def test_shared_daily_count_survives_a_restart(tmp_path):
+    db_full_path = str(tmp_path / "articles.db")
+    limiter = SharedRateLimiter(db_full_path, "search", 0, max_per_day=2)
+    limiter.acquire()
+    limiter.close()
+
+    limiter = SharedRateLimiter(db_full_path, "search", 0, max_per_day=2)
+    other = SharedRateLimiter(db_full_path, "other", 0, max_per_day=2)
+    try:
+        assert limiter.used_today == 1
+        assert limiter.acquire()
+        assert limiter.acquire() is False
+        # Limiters with different names are independent
+        assert other.used_today == 0
+        assert other.acquire()
+    finally:
+        limiter.close()
+        other.close()
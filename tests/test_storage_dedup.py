@@ -0,0 +1,76 @@
+# test_storage_dedup.py
+import uuid
+import pytest
+from utils.storage import ArticleStore
+from utils.dedup import UrlIndex, canonicalize_url, deduplicate_articles, guid_from_url
+
+def make_article(url, query="topic a", title="Title"):
+    return {
+        "source_guid": guid_from_url(canonicalize_url(url)),
+        "source_name": "Example",
+        "source_domain": "example.com",
+        "search_engine_name": "google",
+        "source_url": url,
+        "source_article_title": title,
+        "date_retrieved": "2024-01-01T00:00:00",
+        "search_query": query,
+        "suspected_duplicate": "no"
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    with ArticleStore(str(tmp_path), "articles.db", flush_size=100) as article_store:
+        yield article_store
+
+def test_flush_writes_new_articles_as_pending(store):
+    article = make_article("https://example.com/a")
+    store.add_articles([article])
+    stored = store.get_article(article["source_guid"])
+    assert stored["search_query"] == "topic a"
+    assert stored["scrape_status"] == "pending"
+
+def test_found_again_leaves_the_stored_row_unchanged(store):
+    article = make_article("https://example.com/a")
+    store.add_articles([article])
+    store.record_scrape_result(article["source_guid"], "ok", etag='"v1"', content_bytes=10)
+    scraped = store.get_article(article["source_guid"])
+
+    # Another topic (or a later run) finds the same URL
+    store.add_articles([make_article("https://example.com/a", query="topic b", title="Other title")])
+    store.flush()
+
+    assert store.get_article(article["source_guid"]) == scraped
+    assert scraped["search_query"] == "topic a"
+    assert scraped["scrape_status"] == "ok"
+    assert store.count_articles() == 1
+
+def test_deduplicate_drops_repeats_within_and_across_batches(store):
+    store.add_articles([make_article("https://example.com/stored")])
+    url_index = UrlIndex(store)
+
+    batch = [
+        make_article("https://example.com/new?utm_source=feed"),
+        make_article("http://EXAMPLE.com/new/"),
+        make_article("https://example.com/stored#comments"),
+        make_article("https://example.com/other")
+    ]
+    unique = deduplicate_articles(batch, url_index)
+
+    assert [article["source_url"] for article in unique] == [
+        "https://example.com/new?utm_source=feed", "https://example.com/other"
+    ]
+    assert unique[0]["source_guid"] == guid_from_url(canonicalize_url("https://example.com/new"))
+    assert url_index.dropped == 2
+    assert deduplicate_articles([make_article("https://example.com/other")], url_index) == []
+
+def test_bloom_mode_confirms_against_rows_with_legacy_guids(store):
+    # Rows from before URL-derived GUIDs carry random ones
+    legacy = make_article("https://example.com/legacy")
+    legacy["source_guid"] = str(uuid.uuid4())
+    store.add_articles([legacy, make_article("https://example.com/b")])
+    url_index = UrlIndex(store, bloom_threshold=0)
+
+    assert url_index.bloom is not None
+    assert url_index.check_and_add("https://example.com/legacy/") == (True, "https://example.com/legacy")
+    assert url_index.check_and_add("https://example.com/c")[0] is False
+    assert url_index.check_and_add("https://example.com/c")[0] is True
@@ -0,0 +1,123 @@
+# browser_pool.py
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from utils.logger import logger
+
+# URL patterns the browser never needs to fetch to get at the article text
+DEFAULT_BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3"
+]
+
+def build_chrome_options(block_resources=True):
+    """
+    Headless Chrome options tuned for text extraction: images are disabled and
+    the page counts as loaded once the DOM is ready rather than after every asset.
+    """
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.page_load_strategy = "eager"
+    if block_resources:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.media_stream": 2
+        })
+    return chrome_options
+
+class WebDriverPool:
+    """
+    Pool of long-lived headless Chrome drivers.
+
+    Drivers are created lazily up to `size`, checked out for one page at a time,
+    and recycled after max_pages_per_driver pages or as soon as a page crashes
+    them, so a run pays the browser start-up cost a handful of times instead of
+    once per URL.
+    """
+
+    def __init__(self, size=2, max_pages_per_driver=50, block_resources=True,
+                 page_load_timeout=30, blocked_url_patterns=None):
+        self.size = max(1, int(size))
+        self.max_pages_per_driver = max(1, int(max_pages_per_driver))
+        self.block_resources = block_resources
+        self.page_load_timeout = page_load_timeout
+        self.blocked_url_patterns = blocked_url_patterns or DEFAULT_BLOCKED_URL_PATTERNS
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._all_drivers = set()
+        self._pages_served = {}
+        self._closed = False
+
+    def _create_driver(self):
+        logger.debug("Starting a new headless Chrome for the WebDriver pool.")
+        driver = webdriver.Chrome(options=build_chrome_options(self.block_resources))
+        driver.set_page_load_timeout(self.page_load_timeout)
+        if self.block_resources:
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_url_patterns})
+            except Exception as e:
+                logger.debug(f"Could not enable resource blocking via CDP: {e}")
+        with self._lock:
+            self._all_drivers.add(driver)
+            self._pages_served[driver] = 0
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._all_drivers.discard(driver)
+            self._pages_served.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"Error quitting WebDriver: {e}")
+
+    @contextmanager
+    def driver(self):
+        """
+        Checks out a driver for one page. A driver that raises is discarded and a
+        fresh one is started for the next checkout.
+        """
+        if self._closed:
+            raise RuntimeError("WebDriver pool is closed.")
+
+        self._slots.acquire()
+        driver = None
+        healthy = True
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self._create_driver()
+            yield driver
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            if driver is not None:
+                with self._lock:
+                    served = self._pages_served.get(driver, 0) + 1
+                    self._pages_served[driver] = served
+                if not healthy or self._closed or served >= self.max_pages_per_driver:
+                    self._discard(driver)
+                else:
+                    self._idle.put(driver)
+            self._slots.release()
+
+    def close(self):
+        """
+        Quits every driver the pool started.
+        """
+        self._closed = True
+        with self._lock:
+            drivers = list(self._all_drivers)
+        for driver in drivers:
+            self._discard(driver)
+        logger.debug("WebDriver pool closed.")
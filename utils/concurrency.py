@@ -0,0 +1,161 @@
+# concurrency.py
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.logger import logger
+
+def run_concurrently(func, jobs, max_workers):
+    """
+    Runs func(job) for every job on a thread pool, keeping at most max_workers
+    calls in flight, and yields (job, result) pairs as they complete.
+
+    Jobs are pulled from the iterable lazily, so a large (or generated) job list
+    is never materialised up front. If func raises, the error is logged and the
+    pair is yielded with a result of None.
+    """
+    max_workers = max(1, int(max_workers))
+    jobs = iter(jobs)
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next():
+            for job in jobs:
+                in_flight[executor.submit(func, job)] = job
+                return True
+            return False
+
+        for _ in range(max_workers):
+            if not submit_next():
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.exception(f"Unhandled error in concurrent job {job!r}: {e}")
+                    result = None
+                yield job, result
+                submit_next()
+
+def run_per_domain(func, jobs, key, max_workers, max_per_domain=2, domain_delay=0.0, max_buffered=None,
+                   controller=None):
+    """
+    Like run_concurrently, but also limits how hard any single domain is hit:
+    at most max_per_domain calls per domain run at once, and consecutive calls
+    to the same domain start at least domain_delay seconds apart.
+
+    Jobs are buffered per domain (up to max_buffered in total) and dispatched
+    round-robin across domains, so a slow or rate-limited site only holds back
+    its own jobs while the remaining workers keep serving other domains.
+    The jobs iterable may yield None to signal "nothing available yet".
+
+    With a controller (utils.domain_health.DomainController), each domain's
+    concurrency follows the controller's adaptive limit instead, and while a
+    domain's circuit is open its jobs are yielded straight back with the
+    controller's deferred result (one is held back as the next probe).
+    """
+    max_workers = max(1, int(max_workers))
+    max_per_domain = max(1, int(max_per_domain))
+    max_buffered = max_buffered or max_workers * 50
+    jobs = iter(jobs)
+    jobs_exhausted = False
+
+    pending = {}        # domain -> deque of buffered jobs (insertion order = round-robin order)
+    active = {}         # domain -> calls in flight
+    next_start = {}     # domain -> earliest monotonic time the next call may start
+    buffered = 0
+    in_flight = {}
+
+    def defer_all_but_probe(domain):
+        queue = pending.get(domain)
+        while queue and len(queue) > 1:
+            yield queue.pop(), controller.deferred_result(domain)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            # Top up the per-domain buffers
+            waiting_for_jobs = False
+            while not jobs_exhausted and buffered < max_buffered:
+                try:
+                    job = next(jobs)
+                except StopIteration:
+                    jobs_exhausted = True
+                    break
+                if job is None:
+                    waiting_for_jobs = True
+                    break
+                domain = key(job)
+                if controller is not None and pending.get(domain) and controller.is_open(domain):
+                    yield job, controller.deferred_result(domain)
+                    continue
+                pending.setdefault(domain, deque()).append(job)
+                buffered += 1
+
+            # Dispatch to every domain that has capacity and whose delay has elapsed
+            now = time.monotonic()
+            earliest_ready = None
+            for domain in list(pending):
+                if len(in_flight) >= max_workers:
+                    break
+                queue = pending[domain]
+                while queue and len(in_flight) < max_workers:
+                    if controller is None:
+                        if active.get(domain, 0) >= max_per_domain:
+                            break
+                    elif not controller.can_start(domain, active.get(domain, 0), now):
+                        probe_at = controller.probe_at(domain)
+                        if probe_at is not None:
+                            earliest_ready = probe_at if earliest_ready is None else min(earliest_ready, probe_at)
+                        break
+                    ready_at = next_start.get(domain, 0.0)
+                    if ready_at > now:
+                        earliest_ready = ready_at if earliest_ready is None else min(earliest_ready, ready_at)
+                        break
+                    job = queue.popleft()
+                    buffered -= 1
+                    in_flight[executor.submit(func, job)] = (domain, job, time.monotonic())
+                    active[domain] = active.get(domain, 0) + 1
+                    next_start[domain] = now + domain_delay
+                if not queue:
+                    del pending[domain]
+                else:
+                    # Move the domain to the back so others get the next free worker
+                    pending[domain] = pending.pop(domain)
+
+            if not in_flight and not pending and jobs_exhausted:
+                break
+
+            # Only open circuits left: defer their held-back probes rather than wait out the cooldown
+            if controller is not None and not in_flight and jobs_exhausted and all(controller.is_open(d) for d in pending):
+                for domain in list(pending):
+                    for job in pending.pop(domain):
+                        yield job, controller.deferred_result(domain)
+                break
+
+            timeout = None
+            if earliest_ready is not None:
+                timeout = max(0.0, earliest_ready - time.monotonic())
+            if waiting_for_jobs:
+                timeout = 0.1 if timeout is None else min(timeout, 0.1)
+
+            if not in_flight:
+                time.sleep(timeout if timeout is not None else 0.1)
+                continue
+
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                domain, job, started = in_flight.pop(future)
+                active[domain] -= 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.exception(f"Unhandled error in concurrent job {job!r}: {e}")
+                    result = None
+                if controller is not None and controller.record(domain, time.monotonic() - started, result):
+                    deferred = list(defer_all_but_probe(domain))
+                    buffered -= len(deferred)
+                    yield from deferred
+                yield job, result
@@ -0,0 +1,10 @@
+# config.py
+
+TRUE_VALUES = ("yes", "on", "true")
+
+def config_flag(settings, key, default="no"):
+    """
+    Reads a "yes"/"no" style option from a config section. "yes", "on" and
+    "true" (any case, or YAML's True) count as set; anything else does not.
+    """
+    return str((settings or {}).get(key, default)).lower() in TRUE_VALUES
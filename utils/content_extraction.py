@@ -0,0 +1,166 @@
+# content_extraction.py
+import re
+from utils.logger import logger
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # extraction is skipped and whole pages are converted
+    lxml = None
+
+# Elements that never hold article text. <form> is kept: ASP.NET-style pages wrap
+# the whole body in one. <header> is only dropped outside articles, after extraction
+BOILERPLATE_TAGS = (
+    "script", "style", "noscript", "svg", "iframe", "nav", "footer",
+    "aside", "button", "input", "select", "textarea", "template", "canvas", "object",
+    "embed", "link", "meta", "dialog"
+)
+
+# Readability-style hints from class/id attributes
+UNLIKELY_CANDIDATES = re.compile(
+    r"banner|breadcrumb|combx|comment|community|consent|cookie|cover-wrap|disqus|extra|"
+    r"footer|gdpr|header|legends|menu|modal|nav|newsletter|pager|pagination|popup|promo|"
+    r"related|remark|replies|rss|share|shoutbox|sidebar|skyscraper|social|sponsor|"
+    r"subscribe|tool|widget|advert|ad-break|agegate",
+    re.IGNORECASE
+)
+MAYBE_CANDIDATE = re.compile(r"and|article|body|column|content|main|shadow|story|entry|post", re.IGNORECASE)
+POSITIVE_HINTS = re.compile(r"article|body|content|entry|hentry|main|page|post|text|blog|story", re.IGNORECASE)
+NEGATIVE_HINTS = re.compile(
+    r"hidden|banner|combx|comment|com-|contact|foot|footer|footnote|masthead|media|meta|"
+    r"outbrain|promo|related|scroll|share|shoutbox|sidebar|skyscraper|sponsor|shopping|tags|tool|widget",
+    re.IGNORECASE
+)
+
+SCORED_TAGS = ("p", "pre", "td", "blockquote")
+TAG_WEIGHTS = {
+    "article": 10, "main": 10, "div": 5, "section": 3, "pre": 3, "td": 3, "blockquote": 3,
+    "address": -3, "ol": -3, "ul": -3, "dl": -3, "dd": -3, "dt": -3, "li": -3,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5, "th": -5
+}
+
+def _class_weight(element):
+    weight = 0
+    for attribute in (element.get("class"), element.get("id")):
+        if attribute:
+            if NEGATIVE_HINTS.search(attribute):
+                weight -= 25
+            if POSITIVE_HINTS.search(attribute):
+                weight += 25
+    return weight
+
+def _text_length(element):
+    return len(" ".join(element.itertext()).strip())
+
+def _link_density(element):
+    text_length = _text_length(element)
+    if not text_length:
+        return 0.0
+    link_length = sum(_text_length(link) for link in element.iter("a"))
+    return link_length / text_length
+
+def _strip_boilerplate(doc):
+    etree.strip_elements(doc, *BOILERPLATE_TAGS, with_tail=False)
+    etree.strip_elements(doc, etree.Comment, with_tail=False)
+
+    # Drop nodes whose class/id marks them as chrome (cookie banners, share bars...)
+    for element in list(doc.iter(etree.Element)):
+        if element.tag in ("html", "body", "article", "main") or element.getparent() is None:
+            continue
+        hints = f"{element.get('class', '')} {element.get('id', '')}"
+        if hints.strip() and UNLIKELY_CANDIDATES.search(hints) and not MAYBE_CANDIDATE.search(hints):
+            element.drop_tree()
+
+def _drop_page_headers(part):
+    # A <header> inside an <article> holds its headline; anywhere else it is site chrome
+    for header in list(part.iter("header")):
+        if not any(ancestor.tag == "article" for ancestor in header.iterancestors()):
+            header.drop_tree()
+
+def _score_candidates(doc):
+    scores = {}
+
+    def initialise(element):
+        if element not in scores:
+            scores[element] = TAG_WEIGHTS.get(element.tag, 0) + _class_weight(element)
+
+    for paragraph in doc.iter(*SCORED_TAGS):
+        parent = paragraph.getparent()
+        if parent is None:
+            continue
+        text = " ".join(paragraph.itertext()).strip()
+        if len(text) < 25:
+            continue
+
+        content_score = 1 + text.count(",") + min(len(text) // 100, 3)
+        initialise(parent)
+        scores[parent] += content_score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            initialise(grandparent)
+            scores[grandparent] += content_score / 2
+
+    # Penalise candidates that are mostly links (menus, link lists)
+    return {element: score * (1 - _link_density(element)) for element, score in scores.items()}
+
+def extract_main_content(html, min_text_length=200):
+    """
+    Isolates the main article node of a page: strips boilerplate (scripts, nav,
+    footers, cookie banners, inline SVG...), scores the remaining blocks
+    readability-style, and returns the best candidate plus any related siblings
+    as an HTML string. Returns None when nothing convincing is found.
+    """
+    if lxml is None or not html or not html.strip():
+        return None
+
+    try:
+        doc = lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError) as e:
+        logger.debug(f"Could not parse HTML for extraction: {e}")
+        return None
+
+    _strip_boilerplate(doc)
+    scores = _score_candidates(doc)
+    if not scores:
+        return None
+
+    top_candidate = max(scores, key=scores.get)
+    top_score = scores[top_candidate]
+
+    # Pull in siblings that look like part of the same article (split bodies, figures)
+    parent = top_candidate.getparent()
+    threshold = max(10, top_score * 0.2)
+    if parent is None:
+        parts = [top_candidate]
+    else:
+        parts = []
+        for sibling in parent:
+            if sibling is top_candidate or scores.get(sibling, float("-inf")) >= threshold:
+                parts.append(sibling)
+            elif sibling.tag == "p" and _text_length(sibling) > 80 and _link_density(sibling) < 0.25:
+                parts.append(sibling)
+            elif sibling.tag == "header" and parent.tag == "article":
+                parts.append(sibling)
+
+    for part in parts:
+        _drop_page_headers(part)
+
+    if sum(_text_length(part) for part in parts) < min_text_length:
+        return None
+
+    return "".join(lxml.html.tostring(part, encoding="unicode", with_tail=False) for part in parts)
+
+def html_to_markdown(html, extract_main=True, min_text_length=200):
+    """
+    Converts a page to Markdown, converting only its main content when it can be
+    isolated and falling back to the whole page otherwise.
+    """
+    # Imported here so runs that never convert a page don't pay for it at startup
+    from markdownify import markdownify
+
+    if extract_main:
+        main_html = extract_main_content(html, min_text_length)
+        if main_html is not None:
+            return markdownify(main_html)
+        logger.debug("Main content extraction found no article node; converting the full page.")
+    return markdownify(html)
@@ -0,0 +1,295 @@
+# content_store.py
+import os
+import re
+import gzip
+import hashlib
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from utils.logger import logger
+
+try:
+    import zstandard
+except ImportError:  # gzip is always available
+    zstandard = None
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4  # 4 x 16-bit bands: any two hashes within 3 bits share at least one band exactly
+
+def _to_signed(value):
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+def simhash(text, shingle_size=3):
+    """
+    64-bit SimHash of a text over word shingles. Near-identical texts (the same
+    story syndicated with a different header or footer) differ in only a few bits.
+    """
+    words = re.findall(r"\w+", (text or "").lower())
+    if not words:
+        return 0
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = (" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+def _bands(fingerprint):
+    band_bits = SIMHASH_BITS // SIMHASH_BANDS
+    mask = (1 << band_bits) - 1
+    return [(band, (fingerprint >> (band * band_bits)) & mask) for band in range(SIMHASH_BANDS)]
+
+def _clean_name(value, fallback):
+    return re.sub(r"[^\w\s-]", "", value or "").strip().replace(" ", "_") or fallback
+
+class ContentStore:
+    """
+    Content-addressed, compressed store for scraped Markdown and PDFs, kept as
+    blobs in its own SQLite database.
+
+    Each distinct content is stored once, keyed by its SHA-256 and compressed
+    with zstd (or gzip if zstandard isn't installed); articles map to it through
+    a topic/guid -> hash table. Markdown also gets a SimHash so syndicated copies
+    of the same story are flagged as suspected duplicates even when their bytes
+    differ slightly. Safe to share between threads.
+    """
+
+    def __init__(self, store_path, codec="zstd", compression_level=None, simhash_max_distance=3):
+        self.codec = codec if codec != "zstd" or zstandard is not None else "gzip"
+        if codec == "zstd" and zstandard is None:
+            logger.info("zstandard is not installed; content store falls back to gzip.")
+        self.compression_level = compression_level
+        self.simhash_max_distance = simhash_max_distance
+        self._lock = threading.Lock()
+
+        store_dir = os.path.dirname(store_path)
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+        self.conn = sqlite3.connect(store_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS content_blobs (
+            sha256 TEXT PRIMARY KEY,
+            kind TEXT,
+            codec TEXT,
+            raw_bytes INTEGER,
+            stored_bytes INTEGER,
+            data BLOB
+        )
+        """)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS article_content (
+            source_guid TEXT PRIMARY KEY,
+            topic TEXT,
+            title TEXT,
+            kind TEXT,
+            sha256 TEXT,
+            simhash INTEGER,
+            duplicate_of TEXT,
+            stored_at TEXT
+        )
+        """)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS simhash_bands (
+            band INTEGER,
+            value INTEGER,
+            source_guid TEXT
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_article_content_sha256 ON article_content (sha256)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_simhash_bands ON simhash_bands (band, value)")
+
+    def _compress(self, data, kind):
+        # PDFs are already compressed internally; storing them as-is saves CPU for ~no space
+        if kind == "pdf":
+            return "none", data
+        if self.codec == "zstd":
+            level = self.compression_level or 10
+            return "zstd", zstandard.ZstdCompressor(level=level).compress(data)
+        return "gzip", gzip.compress(data, compresslevel=self.compression_level or 6)
+
+    @staticmethod
+    def _decompress(codec, data):
+        if codec == "zstd":
+            return zstandard.ZstdDecompressor().decompress(data)
+        if codec == "gzip":
+            return gzip.decompress(data)
+        return data
+
+    def _find_near_duplicate(self, source_guid, fingerprint):
+        candidates = set()
+        for band, value in _bands(fingerprint):
+            for (guid,) in self.conn.execute(
+                "SELECT source_guid FROM simhash_bands WHERE band = ? AND value = ? AND source_guid != ?",
+                (band, value, source_guid)
+            ):
+                candidates.add(guid)
+        for guid in candidates:
+            row = self.conn.execute("SELECT simhash FROM article_content WHERE source_guid = ?", (guid,)).fetchone()
+            if row and row[0] is not None and hamming_distance(_to_unsigned(row[0]), fingerprint) <= self.simhash_max_distance:
+                return guid
+        return None
+
+    def put(self, article, topic_name, content, kind="md"):
+        """
+        Stores one article's content (str for Markdown, bytes for PDF).
+
+        :return: dict with "sha256", "raw_bytes" and "duplicate_of" (the GUID of an
+                 earlier article with identical or near-identical content, or None).
+        """
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        sha256 = hashlib.sha256(data).hexdigest()
+        source_guid = article["source_guid"]
+        fingerprint = simhash(content) if kind == "md" else None
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                exists = self.conn.execute("SELECT 1 FROM content_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+                if not exists:
+                    codec, stored = self._compress(data, kind)
+                    self.conn.execute(
+                        "INSERT INTO content_blobs (sha256, kind, codec, raw_bytes, stored_bytes, data) VALUES (?, ?, ?, ?, ?, ?)",
+                        (sha256, kind, codec, len(data), len(stored), stored)
+                    )
+
+                duplicate_of = None
+                row = self.conn.execute(
+                    "SELECT source_guid FROM article_content WHERE sha256 = ? AND source_guid != ? LIMIT 1",
+                    (sha256, source_guid)
+                ).fetchone()
+                if row:
+                    duplicate_of = row[0]
+                elif fingerprint:
+                    duplicate_of = self._find_near_duplicate(source_guid, fingerprint)
+
+                self.conn.execute("""
+                INSERT OR REPLACE INTO article_content
+                    (source_guid, topic, title, kind, sha256, simhash, duplicate_of, stored_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    source_guid, topic_name, article.get("source_article_title"), kind, sha256,
+                    _to_signed(fingerprint) if fingerprint is not None else None,
+                    duplicate_of, datetime.now().isoformat()
+                ))
+                self.conn.execute("DELETE FROM simhash_bands WHERE source_guid = ?", (source_guid,))
+                if fingerprint:
+                    self.conn.executemany(
+                        "INSERT INTO simhash_bands (band, value, source_guid) VALUES (?, ?, ?)",
+                        [(band, value, source_guid) for band, value in _bands(fingerprint)]
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        if duplicate_of:
+            logger.debug(f"Content of {source_guid} duplicates {duplicate_of}.")
+        return {"sha256": sha256, "raw_bytes": len(data), "duplicate_of": duplicate_of}
+
+    def get(self, source_guid):
+        """
+        Returns the stored content of an article as bytes, or None.
+        """
+        with self._lock:
+            row = self.conn.execute("""
+            SELECT b.codec, b.data FROM article_content a
+            JOIN content_blobs b ON b.sha256 = a.sha256
+            WHERE a.source_guid = ?
+            """, (source_guid,)).fetchone()
+        return self._decompress(*row) if row else None
+
+    def iter_markdown(self):
+        """
+        Yields (source_guid, title, text) for every stored Markdown article.
+        """
+        with self._lock:
+            entries = self.conn.execute("SELECT source_guid, title FROM article_content WHERE kind = 'md'").fetchall()
+        for source_guid, title in entries:
+            content = self.get(source_guid)
+            if content is not None:
+                yield source_guid, title, content.decode("utf-8", errors="replace")
+
+    def export_files(self, base_path, short_title_limit=50):
+        """
+        Writes every stored article out in the classic file layout:
+          base_path/<cleaned_topic_name>/<guid>-<short_title>.<md|pdf>
+        """
+        with self._lock:
+            rows = self.conn.execute("""
+            SELECT a.source_guid, a.topic, a.title, a.kind, b.codec, b.data
+            FROM article_content a JOIN content_blobs b ON b.sha256 = a.sha256
+            """).fetchall()
+
+        for source_guid, topic, title, kind, codec, data in rows:
+            topic_folder = os.path.join(base_path, _clean_name(topic, "untitled_topic"))
+            os.makedirs(topic_folder, exist_ok=True)
+            short_title = _clean_name((title or "")[:short_title_limit], "untitled")
+            full_path = os.path.join(topic_folder, f"{source_guid}-{short_title}.{kind}")
+            with open(full_path, "wb") as f:
+                f.write(self._decompress(codec, data))
+        logger.info(f"Exported {len(rows)} stored articles to {base_path}")
+
+    def stats(self):
+        with self._lock:
+            articles = self.conn.execute("SELECT COUNT(*) FROM article_content").fetchone()[0]
+            blobs, raw, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(stored_bytes), 0) FROM content_blobs"
+            ).fetchone()
+        return {"articles": articles, "unique_contents": blobs, "raw_bytes": raw, "stored_bytes": stored}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+def content_store_from_config(config):
+    """
+    Returns a ContentStore if config["content_storage"]["backend"] is "packed", else None.
+    """
+    storage_config = config.get("content_storage", {})
+    if str(storage_config.get("backend", "files")).lower() != "packed":
+        return None
+    return ContentStore(
+        storage_config.get("path", os.path.join(config["db_storage"]["path"], "content_store.db")),
+        codec=storage_config.get("codec", "zstd"),
+        compression_level=storage_config.get("compression_level"),
+        simhash_max_distance=storage_config.get("simhash_max_distance", 3)
+    )
+
+if __name__ == "__main__":
+    import yaml
+
+    parser = argparse.ArgumentParser(description="Export the packed content store to the Markdown/PDF file layout.")
+    parser.add_argument("output_path", nargs="?", help="Defaults to output_markdown.path from the config.")
+    parser.add_argument("--config", default="config.yaml")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    store = content_store_from_config(config)
+    if store is None:
+        parser.error("content_storage.backend is not 'packed' in the config.")
+    store.export_files(
+        args.output_path or config["output_markdown"]["path"],
+        config.get("markdown_settings", {}).get("short_title_limit", 15)
+    )
+    store.close()
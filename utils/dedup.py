@@ -0,0 +1,142 @@
+# dedup.py
+import re
+import math
+import uuid
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from utils.logger import logger
+from utils import metrics
+
+# Query parameters that only track the click and never change the page content
+TRACKING_PARAMS = {
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref", "ref_src", "cmpid", "ncid", "sr_share"
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "vero_", "oly_")
+
+def canonicalize_url(url):
+    """
+    Normalises a URL so trivially different links to the same article compare equal:
+    http/https are treated alike, the host is lowercased (and a leading "www." and
+    default port dropped), tracking parameters, fragments and trailing slashes are
+    stripped, and the remaining query parameters are sorted.
+    """
+    if not url:
+        return ""
+
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme in ("http", "https", ""):
+        scheme = "https"
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "").rstrip("/")
+
+    query_pairs = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query = urlencode(sorted(query_pairs))
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+def guid_from_url(canonical_url):
+    """
+    Derives a stable article GUID from a canonical URL, so the same article always
+    maps to the same `source_guid` across topics and runs.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, canonical_url))
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter for very large URL histories.
+    May report false positives (never false negatives) at roughly error_rate.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, int(capacity))
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+class UrlIndex:
+    """
+    In-memory index of every canonical URL already stored, for O(1) duplicate checks.
+
+    Uses a plain set unless the history exceeds bloom_threshold URLs, in which case
+    the stored history goes into a Bloom filter to keep memory bounded; its
+    positives are confirmed against the stored canonical URLs so no article is ever
+    dropped because of a false positive. URLs first seen in this run are always
+    kept in the exact set.
+    """
+
+    def __init__(self, article_store=None, bloom_threshold=1000000, error_rate=0.001):
+        self.article_store = article_store
+        self.bloom = None
+        self.seen = set()
+        self.dropped = 0
+
+        urls = article_store.count_articles() if article_store is not None else 0
+        if urls > bloom_threshold:
+            self.bloom = BloomFilter(urls * 2, error_rate)
+            logger.info(f"URL index: using a Bloom filter for {urls} stored articles.")
+
+        if article_store is not None:
+            add_stored = self.bloom.add if self.bloom is not None else self.seen.add
+            for url in article_store.iter_source_urls():
+                add_stored(canonicalize_url(url))
+            logger.info(f"URL index loaded with {urls} stored articles.")
+
+    def _contains(self, canonical_url):
+        if canonical_url in self.seen:
+            return True
+        if self.bloom is None or canonical_url not in self.bloom:
+            return False
+        return self.article_store.has_canonical_url(canonical_url)
+
+    def check_and_add(self, url):
+        """
+        Returns (is_duplicate, canonical_url). New URLs are added to the index.
+        """
+        canonical_url = canonicalize_url(url)
+        if self._contains(canonical_url):
+            self.dropped += 1
+            return True, canonical_url
+        self.seen.add(canonical_url)
+        return False, canonical_url
+
+def deduplicate_articles(articles, url_index):
+    """
+    Drops articles whose canonical URL has been seen before (in this run or any
+    earlier one) and assigns each surviving article a GUID derived from its URL.
+    """
+    unique_articles = []
+    for article in articles:
+        is_duplicate, canonical_url = url_index.check_and_add(article.get("source_url"))
+        if is_duplicate:
+            logger.debug(f"Skipping duplicate article: {article.get('source_url')}")
+            continue
+        article["source_guid"] = guid_from_url(canonical_url)
+        article["suspected_duplicate"] = "no"
+        unique_articles.append(article)
+    if len(unique_articles) < len(articles):
+        metrics.increment("dedup_dropped", len(articles) - len(unique_articles))
+    return unique_articles
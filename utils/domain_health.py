@@ -0,0 +1,164 @@
+# domain_health.py
+import time
+from utils.logger import logger
+from utils.config import config_flag
+
+# The page isn't there, but the site answered: not a sign of an unhealthy domain
+GONE_STATUSES = {404, 410}
+
+class _Domain:
+    __slots__ = ("limit", "latency", "requests", "failures", "consecutive_failures",
+                 "state", "open_until", "cooldown", "deferred")
+
+    def __init__(self, limit, cooldown):
+        self.limit = float(limit)
+        self.latency = None
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.open_until = 0.0
+        self.cooldown = cooldown
+        self.deferred = 0
+
+class DomainController:
+    """
+    Adaptive per-domain concurrency and circuit breaking for run_per_domain.
+
+    Each domain's concurrency limit starts at max_per_domain and is adjusted
+    AIMD-style: every fast success adds 1/limit (about +1 per round of
+    requests), every failure or slow response halves it (down to 1). After
+    failure_threshold consecutive failures the domain's circuit opens: its
+    queued work is deferred instead of waiting out timeouts, and after
+    cooldown seconds one probe request is let through. A successful probe
+    closes the circuit; a failed one reopens it with twice the cooldown (up to
+    max_cooldown). A 404/410 counts as a success: the domain responded.
+    Only the dispatching thread calls into it.
+    """
+
+    def __init__(self, max_per_domain=2, slow_seconds=15.0, failure_threshold=5, cooldown=120.0,
+                 max_cooldown=1800.0, clock=time.monotonic):
+        self.max_per_domain = max(1, int(max_per_domain))
+        self.slow_seconds = slow_seconds
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self._domains = {}
+
+    def _get(self, domain):
+        state = self._domains.get(domain)
+        if state is None:
+            state = self._domains[domain] = _Domain(self.max_per_domain, self.cooldown)
+        return state
+
+    def is_open(self, domain, now=None):
+        """
+        True while the domain's circuit is open and its cooldown hasn't elapsed.
+        """
+        state = self._domains.get(domain)
+        if state is None or state.state != "open":
+            return False
+        return (self.clock() if now is None else now) < state.open_until
+
+    def probe_at(self, domain):
+        state = self._domains.get(domain)
+        return state.open_until if state is not None and state.state == "open" else None
+
+    def can_start(self, domain, active, now=None):
+        """
+        Whether another call to the domain may start with `active` already in flight.
+        """
+        state = self._get(domain)
+        if state.state == "open":
+            if self.is_open(domain, now):
+                return False
+            state.state = "half_open"
+            logger.info(f"Probing {domain} again after its circuit was open.")
+        if state.state == "half_open":
+            return active == 0
+        return active < int(state.limit)
+
+    @staticmethod
+    def is_success(result):
+        if result is None:
+            return False
+        return result.get("status") != "failed" or result.get("http_status") in GONE_STATUSES
+
+    def record(self, domain, seconds, result):
+        """
+        Feeds one finished call back into the domain's limit and circuit.
+        Returns True if this call opened the circuit.
+        """
+        state = self._get(domain)
+        success = self.is_success(result)
+        state.requests += 1
+        state.latency = seconds if state.latency is None else 0.8 * state.latency + 0.2 * seconds
+
+        if success:
+            state.consecutive_failures = 0
+            if state.state == "half_open":
+                logger.info(f"{domain} recovered; closing its circuit.")
+                state.state = "closed"
+                state.cooldown = self.cooldown
+                state.limit = 1.0
+            elif seconds > self.slow_seconds:
+                state.limit = max(1.0, state.limit / 2)
+            else:
+                state.limit = min(float(self.max_per_domain), state.limit + 1.0 / state.limit)
+            return False
+
+        state.failures += 1
+        state.consecutive_failures += 1
+        state.limit = max(1.0, state.limit / 2)
+        if state.state == "half_open":
+            state.cooldown = min(self.max_cooldown, state.cooldown * 2)
+        elif state.consecutive_failures < self.failure_threshold or state.state == "open":
+            return False
+        state.state = "open"
+        state.open_until = self.clock() + state.cooldown
+        logger.warning(
+            f"Opening the circuit for {domain} after {state.consecutive_failures} consecutive failures; "
+            f"deferring its articles for {state.cooldown:.0f}s."
+        )
+        return True
+
+    def deferred_result(self, domain):
+        """
+        The result reported for a job skipped because the domain's circuit is open.
+        """
+        self._get(domain).deferred += 1
+        return {"status": "deferred", "error": f"Deferred: circuit open for {domain}"}
+
+    def stats(self):
+        """
+        Per-domain snapshot for domains that had trouble: state, current limit,
+        average latency, failures and deferred jobs.
+        """
+        return {
+            domain: {
+                "state": state.state,
+                "limit": int(state.limit),
+                "latency_seconds": round(state.latency or 0.0, 3),
+                "requests": state.requests,
+                "failures": state.failures,
+                "deferred": state.deferred
+            }
+            for domain, state in self._domains.items()
+            if state.failures or state.deferred or state.state != "closed"
+        }
+
+def domain_controller_from_config(config):
+    """
+    Returns a DomainController unless scrape_settings.adaptive_concurrency is off.
+    """
+    scrape_settings = config.get("scrape_settings", {})
+    if not config_flag(scrape_settings, "adaptive_concurrency", "yes"):
+        return None
+    return DomainController(
+        max_per_domain=scrape_settings.get("max_per_domain", 2),
+        slow_seconds=scrape_settings.get("slow_response_seconds", 15),
+        failure_threshold=scrape_settings.get("circuit_failure_threshold", 5),
+        cooldown=scrape_settings.get("circuit_cooldown_seconds", 120),
+        max_cooldown=scrape_settings.get("circuit_max_cooldown_seconds", 1800)
+    )
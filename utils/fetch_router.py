@@ -0,0 +1,325 @@
+# fetch_router.py
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import urlsplit
+from utils import metrics
+from utils.logger import logger
+from utils.config import config_flag
+from utils.domain_health import GONE_STATUSES
+
+# Cheapest first: a plain GET, a page load in a pooled browser, a paid Zyte extraction
+STRATEGY_ORDER = ("http", "browser", "zyte")
+
+def route_key(article):
+    """
+    Fetch behaviour is a property of the host, so routes are kept per hostname.
+    """
+    host = (urlsplit(article.get("source_url") or "").hostname or article.get("source_domain") or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def _timestamp(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+def _isoformat(value):
+    return datetime.fromtimestamp(value).isoformat() if value else None
+
+class _Route:
+    __slots__ = ("successes", "failures", "consecutive_failures", "content_length", "last_status",
+                 "last_error", "last_success_at", "last_failure_at", "new_successes", "new_failures", "dirty")
+
+    def __init__(self, successes=0, failures=0, consecutive_failures=0, content_length=None, last_status=None,
+                 last_error=None, last_success_at=None, last_failure_at=None):
+        self.successes = successes
+        self.failures = failures
+        self.consecutive_failures = consecutive_failures
+        self.content_length = content_length
+        self.last_status = last_status
+        self.last_error = last_error
+        self.last_success_at = last_success_at
+        self.last_failure_at = last_failure_at
+        self.new_successes = 0
+        self.new_failures = 0
+        self.dirty = False
+
+class FetchRouter:
+    """
+    Sends each article straight to the cheapest fetch strategy known to work for
+    its domain, instead of always starting with a plain GET or always paying for Zyte.
+
+    Every attempt's outcome (status, Markdown length, whether extraction produced
+    enough text) is kept per domain and strategy in the `domain_fetch_routes`
+    table of the article database, so routes survive between runs. A strategy
+    that failed failures_to_skip times in a row is skipped for the domain; once
+    recheck_after_hours have passed since its last failure one article probes it
+    again, and a success puts it back in front. When the chosen strategy fails,
+    the next one up is tried for the same article. Safe to share between threads.
+
+    :param fetchers: {strategy: fetch(article, config)} in cost order, cheapest first.
+    :param min_content_length: Markdown shorter than this counts as a failed extraction
+                               (e.g. the empty shell of a JavaScript-rendered page).
+    :param on_close: Callables run by close(), e.g. to shut down the browser pool.
+    """
+
+    def __init__(self, db_path, db_name, fetchers, min_content_length=300, failures_to_skip=2,
+                 recheck_after_hours=24, flush_size=20, on_close=(), clock=time.time):
+        self.fetchers = dict(fetchers)
+        self.strategies = list(self.fetchers)
+        self.min_content_length = int(min_content_length)
+        self.failures_to_skip = max(1, int(failures_to_skip))
+        self.recheck_seconds = float(recheck_after_hours) * 3600
+        self.flush_size = max(1, int(flush_size))
+        self.on_close = list(on_close)
+        self.clock = clock
+        self._routes = {}
+        self._probing = set()
+        self._pending = 0
+        self._lock = threading.RLock()
+
+        os.makedirs(db_path, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(db_path, db_name), timeout=60, check_same_thread=False,
+                                    isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS domain_fetch_routes (
+            domain TEXT,
+            strategy TEXT,
+            successes INTEGER DEFAULT 0,
+            failures INTEGER DEFAULT 0,
+            consecutive_failures INTEGER DEFAULT 0,
+            avg_content_length INTEGER,
+            last_status TEXT,
+            last_error TEXT,
+            last_success_at TEXT,
+            last_failure_at TEXT,
+            PRIMARY KEY (domain, strategy)
+        )
+        """)
+        for row in self.conn.execute("SELECT * FROM domain_fetch_routes"):
+            domain, strategy, successes, failures, consecutive, length, status, error, success_at, failure_at = row
+            self._routes[(domain, strategy)] = _Route(
+                successes, failures, consecutive, length, status, error, _timestamp(success_at), _timestamp(failure_at)
+            )
+        logger.debug(f"Loaded {len(self._routes)} domain fetch routes.")
+
+    def _route(self, domain, strategy):
+        route = self._routes.get((domain, strategy))
+        if route is None:
+            route = self._routes[(domain, strategy)] = _Route()
+        return route
+
+    def plan(self, domain):
+        """
+        Returns the strategies to try for the domain's next article, cheapest first.
+        Strategies known to fail there are left out, except for one probe at a time
+        once their recheck interval has passed.
+        """
+        now = self.clock()
+        plan = []
+        with self._lock:
+            for strategy in self.strategies:
+                route = self._routes.get((domain, strategy))
+                if route is None or route.consecutive_failures < self.failures_to_skip:
+                    plan.append(strategy)
+                elif now - (route.last_failure_at or 0) >= self.recheck_seconds and (domain, strategy) not in self._probing:
+                    self._probing.add((domain, strategy))
+                    logger.debug(f"Rechecking {strategy} for {domain}.")
+                    plan.append(strategy)
+        # Everything has been failing: the most capable strategy is the best bet
+        return plan or self.strategies[-1:]
+
+    def preferred(self, domain):
+        """
+        The strategy the domain's articles currently start with.
+        """
+        with self._lock:
+            for strategy in self.strategies:
+                route = self._routes.get((domain, strategy))
+                if route is None or route.consecutive_failures < self.failures_to_skip:
+                    return strategy
+        return self.strategies[-1]
+
+    def record(self, domain, strategy, outcome, content_length=None, error=None):
+        """
+        Records one attempt; outcome is "ok", "thin" (too little text extracted) or "failed".
+        """
+        now = self.clock()
+        metrics.increment("fetch_attempts", strategy=strategy, outcome=outcome)
+        with self._lock:
+            self._probing.discard((domain, strategy))
+            route = self._route(domain, strategy)
+            route.last_status = outcome
+            route.dirty = True
+            if content_length is not None:
+                route.content_length = content_length if route.content_length is None else int(
+                    0.8 * route.content_length + 0.2 * content_length)
+            if outcome == "ok":
+                if route.consecutive_failures >= self.failures_to_skip:
+                    logger.info(f"{strategy} works again for {domain}.")
+                route.successes += 1
+                route.new_successes += 1
+                route.consecutive_failures = 0
+                route.last_error = None
+                route.last_success_at = now
+            else:
+                route.failures += 1
+                route.new_failures += 1
+                route.consecutive_failures += 1
+                route.last_error = error
+                route.last_failure_at = now
+                if route.consecutive_failures == self.failures_to_skip and strategy != self.strategies[-1]:
+                    logger.info(f"Routing {domain} past {strategy} after {route.consecutive_failures} failures "
+                                f"({error or outcome}).")
+            self._pending += 1
+            if self._pending >= self.flush_size:
+                self.flush()
+
+    def fetch_article(self, article, config=None):
+        """
+        Fetches one article along the domain's plan, escalating to the next strategy
+        when one fails. Returns the first usable result, with the "strategy" that
+        produced it; if every strategy only produced thin content, the longest one.
+        """
+        domain = route_key(article)
+        plan = self.plan(domain)
+        try:
+            return self._fetch(domain, plan, article, config)
+        finally:
+            # A cheaper strategy may have succeeded before a planned probe was reached
+            with self._lock:
+                self._probing.difference_update((domain, strategy) for strategy in plan)
+
+    def _fetch(self, domain, plan, article, config):
+        best_thin = None
+        result = None
+        for strategy in plan:
+            try:
+                result = self.fetchers[strategy](article, config)
+            except Exception as e:
+                logger.exception(f"{strategy} fetch raised for {article.get('source_url')}: {e}")
+                result = {"status": "failed", "error": str(e)}
+            result["strategy"] = strategy
+
+            # The page isn't there, whatever fetches it; not held against the strategy and not escalated
+            if result["status"] == "failed" and result.get("http_status") in GONE_STATUSES:
+                return result
+            if result["status"] == "failed":
+                self.record(domain, strategy, "failed", error=result.get("error"))
+                continue
+            if result["status"] != "ok":
+                # "pdf" and "not_modified" both mean the strategy reached the page
+                self.record(domain, strategy, "ok")
+                return result
+
+            length = len((result.get("content") or "").strip())
+            if length >= self.min_content_length:
+                self.record(domain, strategy, "ok", content_length=length)
+                return result
+            self.record(domain, strategy, "thin", content_length=length, error=f"Only {length} characters extracted")
+            if best_thin is None or length > len(best_thin["content"].strip()):
+                best_thin = result
+        return best_thin or result
+
+    def flush(self):
+        """
+        Writes changed routes to the database in one transaction. Counters are
+        added to what is stored, so workers sharing the database don't overwrite
+        each other's totals.
+        """
+        with self._lock:
+            changed = [(key, route) for key, route in self._routes.items() if route.dirty]
+            self._pending = 0
+            if not changed:
+                return
+            try:
+                self.conn.execute("BEGIN")
+                self.conn.executemany("""
+                INSERT INTO domain_fetch_routes (domain, strategy, successes, failures, consecutive_failures,
+                    avg_content_length, last_status, last_error, last_success_at, last_failure_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (domain, strategy) DO UPDATE SET
+                    successes = successes + excluded.successes,
+                    failures = failures + excluded.failures,
+                    consecutive_failures = excluded.consecutive_failures,
+                    avg_content_length = COALESCE(excluded.avg_content_length, avg_content_length),
+                    last_status = excluded.last_status,
+                    last_error = excluded.last_error,
+                    last_success_at = COALESCE(excluded.last_success_at, last_success_at),
+                    last_failure_at = COALESCE(excluded.last_failure_at, last_failure_at)
+                """, [
+                    (domain, strategy, route.new_successes, route.new_failures, route.consecutive_failures,
+                     route.content_length, route.last_status, route.last_error,
+                     _isoformat(route.last_success_at), _isoformat(route.last_failure_at))
+                    for (domain, strategy), route in changed
+                ])
+                self.conn.execute("COMMIT")
+            except Exception as e:
+                self.conn.execute("ROLLBACK")
+                logger.exception(f"Error saving domain fetch routes: {e}")
+                return
+            for _, route in changed:
+                route.new_successes = route.new_failures = 0
+                route.dirty = False
+
+    def stats(self):
+        """
+        Number of domains currently routed to each strategy.
+        """
+        with self._lock:
+            domains = {domain for domain, _ in self._routes}
+        counts = {strategy: 0 for strategy in self.strategies}
+        for domain in domains:
+            counts[self.preferred(domain)] += 1
+        return counts
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            logger.info(f"Domains per fetch strategy: {self.stats()}")
+            self.conn.close()
+        for close in self.on_close:
+            close()
+
+def fetch_router_from_config(config):
+    """
+    Returns a FetchRouter if fetch_routing.enabled is set, else None. Without an
+    explicit strategies list the route mirrors scrape_engine_selection: plain HTTP
+    then the browser for "custom", plain HTTP then Zyte for "zyte", so a browser
+    is never started where the configured engine wouldn't use one.
+    """
+    routing_config = config.get("fetch_routing", {})
+    if not config_flag(routing_config, "enabled"):
+        return None
+
+    strategies = routing_config.get("strategies")
+    if not strategies:
+        engine = config.get("scrape_engine_selection", "custom").lower()
+        strategies = ["http", "zyte"] if engine == "zyte" else ["http", "browser"]
+    unknown = [strategy for strategy in strategies if strategy not in STRATEGY_ORDER]
+    if unknown:
+        raise ValueError(f"Unknown fetch_routing strategies: {unknown} (expected {', '.join(STRATEGY_ORDER)})")
+
+    fetchers = {}
+    on_close = []
+    if "http" in strategies or "browser" in strategies:
+        from utils.scraper_custom_selenium import fetch_plain, fetch_rendered, close_browser_pool
+        fetchers.update({"http": fetch_plain, "browser": fetch_rendered})
+        on_close.append(close_browser_pool)
+    if "zyte" in strategies:
+        from utils.scraper_zyte import fetch_article as fetch_zyte, close_zyte_client
+        fetchers["zyte"] = fetch_zyte
+        on_close.append(close_zyte_client)
+
+    return FetchRouter(
+        config["db_storage"]["path"],
+        config["db_storage"]["name"],
+        {strategy: fetchers[strategy] for strategy in STRATEGY_ORDER if strategy in strategies},
+        min_content_length=routing_config.get("min_content_length", 300),
+        failures_to_skip=routing_config.get("failures_to_skip", 2),
+        recheck_after_hours=routing_config.get("recheck_after_hours", 24),
+        flush_size=routing_config.get("flush_size", 20),
+        on_close=on_close
+    )
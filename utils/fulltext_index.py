@@ -0,0 +1,281 @@
+# fulltext_index.py
+import os
+import re
+import sqlite3
+import argparse
+import threading
+from utils.logger import logger
+from utils.config import config_flag
+
+# Markdown files are written as <guid>-<short_title>.md
+GUID_PREFIX = re.compile(r"^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})-", re.IGNORECASE)
+
+def fts5_available():
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        conn.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+class FullTextIndex:
+    """
+    SQLite FTS5 index over scraped article text, kept in the article database.
+
+    Each indexed article gets a row in `article_fts_docs` mapping its
+    source_guid to the FTS rowid, so re-scrapes replace the old text and search
+    results join straight back to the `articles` table for topic, domain and
+    date filters. Writes are buffered and committed in batches of flush_size.
+    Safe to share between threads.
+    """
+
+    def __init__(self, db_path, db_name, flush_size=50, tokenizer="porter unicode61"):
+        self.db_full_path = os.path.join(db_path, db_name)
+        self.flush_size = max(1, int(flush_size))
+        self._buffer = []
+        self._lock = threading.RLock()
+
+        os.makedirs(db_path, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_full_path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS article_fts USING fts5(title, content, tokenize = '{tokenizer}')
+        """)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS article_fts_docs (
+            doc_id INTEGER PRIMARY KEY,
+            source_guid TEXT UNIQUE
+        )
+        """)
+
+    def add(self, source_guid, title, content):
+        """
+        Queues one article's text for indexing, replacing any earlier version.
+        """
+        with self._lock:
+            self._buffer.append((source_guid, title or "", content or ""))
+            if len(self._buffer) >= self.flush_size:
+                self.flush()
+
+    def flush(self):
+        """
+        Writes all queued articles in a single transaction.
+        """
+        with self._lock:
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+            try:
+                self.conn.execute("BEGIN")
+                for source_guid, title, content in rows:
+                    self.conn.execute("INSERT OR IGNORE INTO article_fts_docs (source_guid) VALUES (?)", (source_guid,))
+                    doc_id = self.conn.execute(
+                        "SELECT doc_id FROM article_fts_docs WHERE source_guid = ?", (source_guid,)
+                    ).fetchone()[0]
+                    self.conn.execute("DELETE FROM article_fts WHERE rowid = ?", (doc_id,))
+                    self.conn.execute("INSERT INTO article_fts (rowid, title, content) VALUES (?, ?, ?)",
+                                      (doc_id, title, content))
+                self.conn.execute("COMMIT")
+                logger.debug(f"{len(rows)} articles added to the full-text index.")
+            except Exception as e:
+                self.conn.execute("ROLLBACK")
+                logger.exception(f"Error updating the full-text index: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._buffer = []
+            self.conn.execute("BEGIN")
+            self.conn.execute("DELETE FROM article_fts")
+            self.conn.execute("DELETE FROM article_fts_docs")
+            self.conn.execute("COMMIT")
+
+    def optimize(self):
+        """
+        Merges the index's b-trees; worth running after a large rebuild.
+        """
+        with self._lock:
+            self.flush()
+            self.conn.execute("INSERT INTO article_fts (article_fts) VALUES ('optimize')")
+
+    def count(self):
+        with self._lock:
+            self.flush()
+            return self.conn.execute("SELECT COUNT(*) FROM article_fts_docs").fetchone()[0]
+
+    def search(self, query, topic=None, domain=None, since=None, until=None, limit=20, snippet_tokens=16):
+        """
+        Runs an FTS5 MATCH query (words, "phrases", AND/OR/NOT, prefix*) and returns
+        up to limit matches, best first (BM25, with title hits weighted higher).
+
+        :param topic: Only articles found for this search query / topic.
+        :param domain: Only articles from this source domain.
+        :param since: Only articles retrieved on or after this ISO date.
+        :param until: Only articles retrieved before this ISO date.
+        :return: list of dicts with source_guid, title, url, domain, topic,
+                 date_retrieved, rank and a snippet with matches in [brackets].
+        """
+        conditions = ["article_fts MATCH ?"]
+        params = [query]
+        if topic:
+            conditions.append("a.search_query = ?")
+            params.append(topic)
+        if domain:
+            conditions.append("a.source_domain = ?")
+            params.append(domain)
+        if since:
+            conditions.append("a.date_retrieved >= ?")
+            params.append(since)
+        if until:
+            conditions.append("a.date_retrieved < ?")
+            params.append(until)
+        params.append(int(limit))
+
+        with self._lock:
+            self.flush()
+            rows = self.conn.execute(f"""
+            SELECT d.source_guid, a.source_article_title, a.source_url, a.source_domain, a.search_query,
+                   a.date_retrieved, bm25(article_fts, 5.0, 1.0) AS rank,
+                   snippet(article_fts, 1, '[', ']', '...', {int(snippet_tokens)})
+            FROM article_fts
+            JOIN article_fts_docs d ON d.doc_id = article_fts.rowid
+            LEFT JOIN articles a ON a.source_guid = d.source_guid
+            WHERE {" AND ".join(conditions)}
+            ORDER BY rank
+            LIMIT ?
+            """, params).fetchall()
+
+        columns = ("source_guid", "title", "url", "domain", "topic", "date_retrieved", "rank", "snippet")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def _title_of(self, source_guid):
+        row = self.conn.execute(
+            "SELECT source_article_title FROM articles WHERE source_guid = ?", (source_guid,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def rebuild_from_markdown(self, base_path):
+        """
+        Bulk-indexes every <guid>-<short_title>.md file under base_path, committing
+        every flush_size files. Returns the number of files indexed.
+        """
+        indexed = 0
+        for folder, _, files in os.walk(base_path):
+            for file_name in files:
+                match = GUID_PREFIX.match(file_name)
+                if not file_name.endswith(".md") or not match:
+                    continue
+                try:
+                    with open(os.path.join(folder, file_name), "r", encoding="utf-8") as f:
+                        content = f.read()
+                except OSError as e:
+                    logger.warning(f"Could not read {file_name} for indexing: {e}")
+                    continue
+                source_guid = match.group(1)
+                with self._lock:
+                    title = self._title_of(source_guid)
+                self.add(source_guid, title or file_name[len(source_guid) + 1:-3].replace("_", " "), content)
+                indexed += 1
+                if indexed % 1000 == 0:
+                    logger.info(f"Indexed {indexed} Markdown files...")
+        self.flush()
+        return indexed
+
+    def rebuild_from_content_store(self, content_store):
+        """
+        Bulk-indexes every Markdown article held in a packed ContentStore.
+        Returns the number of articles indexed.
+        """
+        indexed = 0
+        for source_guid, title, text in content_store.iter_markdown():
+            self.add(source_guid, title, text)
+            indexed += 1
+        self.flush()
+        return indexed
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def fulltext_index_from_config(config):
+    """
+    Returns a FullTextIndex if config["fulltext_index"]["enabled"] is set, else None.
+    """
+    index_config = config.get("fulltext_index", {})
+    if not config_flag(index_config, "enabled"):
+        return None
+    if not fts5_available():
+        logger.warning("This SQLite build has no FTS5 support; full-text indexing is disabled.")
+        return None
+    return FullTextIndex(
+        config["db_storage"]["path"],
+        config["db_storage"]["name"],
+        flush_size=index_config.get("flush_size", 50),
+        tokenizer=index_config.get("tokenizer", "porter unicode61")
+    )
+
+if __name__ == "__main__":
+    import yaml
+    from utils.storage import ArticleStore
+    from utils.content_store import content_store_from_config
+
+    parser = argparse.ArgumentParser(description="Search or rebuild the full-text index of scraped articles.")
+    parser.add_argument("--config", default="config.yaml")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search_parser = commands.add_parser("search", help="Print ranked matches with snippets")
+    search_parser.add_argument("query", help='FTS5 query, e.g. climate AND "supply chain" or regulat*')
+    search_parser.add_argument("--topic")
+    search_parser.add_argument("--domain")
+    search_parser.add_argument("--since", help="ISO date, e.g. 2024-01-01")
+    search_parser.add_argument("--until", help="ISO date (exclusive)")
+    search_parser.add_argument("--limit", type=int, default=20)
+
+    rebuild_parser = commands.add_parser("rebuild", help="Re-index all stored Markdown from scratch")
+    rebuild_parser.add_argument("markdown_path", nargs="?", help="Defaults to output_markdown.path from the config.")
+    rebuild_parser.add_argument("--batch-size", type=int, default=500, help="Articles per transaction")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    if not fts5_available():
+        parser.error("This SQLite build has no FTS5 support.")
+    # Results join back to the articles table, so make sure it exists
+    ArticleStore(config["db_storage"]["path"], config["db_storage"]["name"]).close()
+    index = FullTextIndex(
+        config["db_storage"]["path"],
+        config["db_storage"]["name"],
+        tokenizer=config.get("fulltext_index", {}).get("tokenizer", "porter unicode61")
+    )
+
+    if args.command == "search":
+        try:
+            matches = index.search(args.query, args.topic, args.domain, args.since, args.until, args.limit)
+        except sqlite3.OperationalError as e:
+            # Unbalanced quotes, a bare operator, an unknown column filter...
+            index.close()
+            search_parser.exit(2, f"{search_parser.prog}: error: invalid full-text query {args.query!r}: {e}\n")
+        for match in matches:
+            print(f"{match['rank']:8.2f}  {match['title'] or match['source_guid']}")
+            print(f"          {match['url'] or ''}  [{match['domain'] or '?'} | {match['topic'] or '?'} | "
+                  f"{(match['date_retrieved'] or '')[:10]}]")
+            print(f"          {' '.join(match['snippet'].split())}\n")
+    else:
+        index.flush_size = max(1, args.batch_size)
+        index.clear()
+        indexed = index.rebuild_from_markdown(args.markdown_path or config["output_markdown"]["path"])
+        content_store = content_store_from_config(config)
+        if content_store is not None:
+            indexed += index.rebuild_from_content_store(content_store)
+            content_store.close()
+        index.optimize()
+        logger.info(f"Full-text index rebuilt with {indexed} articles.")
+    index.close()
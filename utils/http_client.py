@@ -0,0 +1,160 @@
+# http_client.py
+import time
+import random
+import threading
+import requests
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.logger import logger
+
+# Only advertise brotli when a decoder is installed, otherwise urllib3 can't decode it
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; ScrapeScout/1.0)"
+
+_session = None
+_metered_session = None
+_timeout = (5, 20)
+_retry_policy = {"max_retries": 3, "backoff_factor": 0.5, "backoff_max": 30}
+_session_lock = threading.Lock()
+
+def build_session(http_config=None):
+    """
+    Builds a requests Session with per-host keep-alive connection pools,
+    compression, and retries (exponential backoff with jitter, honouring
+    Retry-After) on connection errors and 429/5xx responses.
+    """
+    http_config = http_config or {}
+
+    retry = Retry(
+        total=http_config.get("max_retries", 3),
+        connect=http_config.get("max_retries", 3),
+        read=http_config.get("read_retries", http_config.get("max_retries", 3)),
+        status=http_config.get("status_retries", http_config.get("max_retries", 3)),
+        backoff_factor=http_config.get("backoff_factor", 0.5),
+        backoff_max=http_config.get("backoff_max", 30),
+        backoff_jitter=http_config.get("backoff_jitter", 0.5),
+        status_forcelist=http_config.get("retry_statuses", [429, 500, 502, 503, 504]),
+        allowed_methods=frozenset(["GET", "HEAD", "POST"]),
+        respect_retry_after_header=http_config.get("respect_retry_after", True),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=http_config.get("pool_hosts", 100),
+        pool_maxsize=http_config.get("pool_size_per_host", 10),
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": http_config.get("user_agent", DEFAULT_USER_AGENT),
+        "Accept-Encoding": ACCEPT_ENCODING,
+        "Connection": "keep-alive"
+    })
+    return session
+
+def build_metered_session(http_config=None):
+    """
+    Builds a session for APIs that bill or count every request: only failed
+    connections are retried transparently. Status codes and read timeouts are
+    left to the caller, which can take a rate limiter token before each retry.
+    """
+    http_config = dict(http_config or {})
+    http_config.update({"status_retries": 0, "read_retries": 0, "retry_statuses": [], "respect_retry_after": False})
+    return build_session(http_config)
+
+def configure_http_client(config):
+    """
+    (Re)builds the shared sessions from config["http_client"]. Call once at startup;
+    without it get_session() falls back to the defaults.
+    """
+    global _session, _metered_session, _timeout, _retry_policy
+    http_config = config.get("http_client", {}) if config else {}
+    with _session_lock:
+        for session in (_session, _metered_session):
+            if session is not None:
+                session.close()
+        _session = build_session(http_config)
+        _metered_session = build_metered_session(http_config)
+        _timeout = (
+            http_config.get("connect_timeout", 5),
+            http_config.get("read_timeout", 20)
+        )
+        _retry_policy = {
+            "max_retries": http_config.get("max_retries", 3),
+            "backoff_factor": http_config.get("backoff_factor", 0.5),
+            "backoff_max": http_config.get("backoff_max", 30)
+        }
+    logger.debug(f"HTTP client configured (timeouts {_timeout}, Accept-Encoding: {ACCEPT_ENCODING}).")
+
+def get_session():
+    """
+    Returns the process-wide pooled session, creating it with defaults if needed.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+def get_metered_session():
+    """
+    Returns the process-wide session without status or read retries (see build_metered_session).
+    """
+    global _metered_session
+    with _session_lock:
+        if _metered_session is None:
+            _metered_session = build_metered_session()
+        return _metered_session
+
+def max_retries():
+    return int(_retry_policy["max_retries"])
+
+def retry_delay(response, attempt):
+    """
+    Seconds to wait before retry number attempt + 1 of a metered request: the
+    response's Retry-After if it has one, else exponential backoff with jitter.
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(_retry_policy["backoff_max"], max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                return min(_retry_policy["backoff_max"],
+                           max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    delay = min(_retry_policy["backoff_max"], _retry_policy["backoff_factor"] * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)
+
+def get(url, **kwargs):
+    kwargs.setdefault("timeout", _timeout)
+    return get_session().get(url, **kwargs)
+
+def get_metered(url, **kwargs):
+    kwargs.setdefault("timeout", _timeout)
+    return get_metered_session().get(url, **kwargs)
+
+def post(url, **kwargs):
+    kwargs.setdefault("timeout", _timeout)
+    return get_session().post(url, **kwargs)
+
+def close_http_client():
+    global _session, _metered_session
+    with _session_lock:
+        for session in (_session, _metered_session):
+            if session is not None:
+                session.close()
+        _session = _metered_session = None
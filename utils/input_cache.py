@@ -0,0 +1,149 @@
+# input_cache.py
+"""
+Compiled cache of the parsed topics and domains spreadsheets.
+
+Parsing .xlsx files through pandas/openpyxl dominates the startup of small
+runs, so the parsed lists are kept in a JSON file next to the database. An
+entry is reused while its spreadsheet has the same size and mtime, or, if
+only the mtime changed (a copy or a touch), the same SHA-256. pandas is only
+imported when a spreadsheet actually has to be parsed.
+"""
+import os
+import json
+import hashlib
+import threading
+from utils.logger import logger
+from utils.config import config_flag
+
+CACHE_VERSION = 1
+
+_lock = threading.Lock()
+
+def _sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def _native(value):
+    # numpy scalars (and pandas' NaN) as plain JSON-friendly values
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+def _read_topics(path, topic_config):
+    import pandas as pd
+    topics_df = pd.read_excel(path, sheet_name=topic_config["sheet_name"])
+    return [_native(topic) for topic in topics_df[topic_config["column_name"]].dropna().tolist()]
+
+def _read_domains(path, domain_config):
+    import pandas as pd
+    columns = domain_config["columns"]
+    domains_df = pd.read_excel(path, sheet_name=domain_config["sheet_name"])
+    return [
+        [_native(row[columns["domain"]]), _native(row[columns["max_articles"]])]
+        for row in domains_df.to_dict("records")
+    ]
+
+class InputCache:
+    """
+    JSON file of parsed spreadsheets, keyed by path and the parse settings.
+
+    :param path: Cache file location; None keeps nothing on disk (always parse).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                return data.get("entries", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable input cache {self.path}: {e}")
+        return {}
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "entries": self._entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write input cache {self.path}: {e}")
+
+    def load(self, excel_path, settings, parse):
+        """
+        Returns parse(excel_path) for the spreadsheet, from the cache when the
+        file and settings (sheet and column names) are unchanged.
+        """
+        stat = os.stat(excel_path)
+        key = json.dumps([os.path.abspath(excel_path), settings], sort_keys=True)
+        with _lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    self.hits += 1
+                    return entry["data"]
+                if entry["size"] == stat.st_size and entry["sha256"] == _sha256(excel_path):
+                    entry["mtime_ns"] = stat.st_mtime_ns
+                    if self.path:
+                        self._save()
+                    self.hits += 1
+                    return entry["data"]
+
+            self.misses += 1
+            data = parse(excel_path)
+            if self.path:
+                self._entries[key] = {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "sha256": _sha256(excel_path),
+                    "data": data
+                }
+                self._save()
+            return data
+
+def input_cache_from_config(config):
+    cache_config = config.get("input_cache", {})
+    enabled = config_flag(cache_config, "enabled", "yes")
+    default_path = os.path.join(config["db_storage"]["path"], "input_cache.json")
+    return InputCache(cache_config.get("path", default_path) if enabled else None)
+
+def load_search_inputs(config, cache=None):
+    """
+    Returns (topics, domains): the topic names, and [domain, max_articles] pairs
+    from the topics and domains spreadsheets.
+    """
+    cache = cache or input_cache_from_config(config)
+
+    topic_config = config.get("topics", {})
+    topics_excel = os.path.join(topic_config["location"], topic_config["excel_file_name"])
+    topics = cache.load(
+        topics_excel,
+        {"sheet": topic_config["sheet_name"], "column": topic_config["column_name"]},
+        lambda path: _read_topics(path, topic_config)
+    )
+
+    domain_config = config.get("domains", {})
+    domains_excel = os.path.join(domain_config["location"], domain_config["excel_file_name"])
+    domains = cache.load(
+        domains_excel,
+        {"sheet": domain_config["sheet_name"], "columns": domain_config["columns"]},
+        lambda path: _read_domains(path, domain_config)
+    )
+
+    logger.debug(f"Search inputs: {len(topics)} topics, {len(domains)} domains "
+                 f"({cache.hits} parsed from cache, {cache.misses} from Excel).")
+    return topics, domains
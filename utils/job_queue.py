@@ -0,0 +1,235 @@
+# job_queue.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from utils.logger import logger
+
+class JobQueue:
+    """
+    Durable job queue kept in a table of the article database, shared by any
+    number of worker processes (or machines sharing the file).
+
+    Workers lease one job at a time inside a BEGIN IMMEDIATE transaction, so two
+    workers can never lease the same job. A lease lasts lease_seconds and is
+    extended by heartbeat(); a job whose worker died is leased again once its
+    lease expires. complete() and fail() only act on a job still leased by the
+    caller, so a worker that lost its lease cannot overwrite the new owner's
+    outcome. Failed jobs are retried with exponential backoff up to max_attempts.
+
+    Jobs carry an optional dedupe_key: enqueueing a key that is already queued or
+    leased is a no-op. An optional group_key (e.g. a domain) lets lease() cap how
+    many jobs of one group run at once across all workers.
+    """
+
+    def __init__(self, db_path, db_name, lease_seconds=300, max_attempts=3, retry_backoff=30):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Lock()
+
+        os.makedirs(db_path, exist_ok=True)
+        # Other processes hold write locks briefly; wait for them instead of failing
+        self.conn = sqlite3.connect(
+            os.path.join(db_path, db_name), timeout=60, check_same_thread=False, isolation_level=None
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT,
+            dedupe_key TEXT,
+            group_key TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires REAL,
+            last_error TEXT,
+            created_at TEXT,
+            finished_at TEXT
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (status, kind, available_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_group ON jobs (group_key, status)")
+        # Only one unfinished job per dedupe_key; finished ones may be enqueued again later
+        self.conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key)
+        WHERE status IN ('queued', 'leased')
+        """)
+
+    def enqueue_many(self, kind, jobs):
+        """
+        Enqueues jobs given as (payload, dedupe_key, group_key) tuples in one transaction.
+        Returns how many were actually added.
+        """
+        now = datetime.now().isoformat()
+        rows = [(kind, json.dumps(payload), dedupe_key, group_key, now) for payload, dedupe_key, group_key in jobs]
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany("""
+                INSERT OR IGNORE INTO jobs (kind, payload, dedupe_key, group_key, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """, rows)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return self.conn.total_changes - before
+
+    def enqueue(self, kind, payload, dedupe_key=None, group_key=None):
+        return self.enqueue_many(kind, [(payload, dedupe_key, group_key)]) == 1
+
+    def lease(self, worker_id, kinds, max_per_group=None):
+        """
+        Leases the oldest available job of one of the given kinds.
+        Returns a dict (id, kind, payload, attempts) or None if nothing is available.
+        """
+        now = time.time()
+        placeholders = ", ".join("?" for _ in kinds)
+        group_clause = ""
+        params = [*kinds, now, now]
+        if max_per_group:
+            group_clause = """
+              AND (group_key IS NULL OR (
+                  SELECT COUNT(*) FROM jobs AS running
+                  WHERE running.group_key = jobs.group_key
+                    AND running.status = 'leased' AND running.lease_expires > ?
+              ) < ?)
+            """
+            params += [now, max_per_group]
+
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose workers keep dying are given up on rather than retried forever
+                self.conn.execute("""
+                UPDATE jobs SET status = 'failed', lease_owner = NULL, last_error = 'Lease expired'
+                WHERE status = 'leased' AND lease_expires <= ? AND attempts >= ?
+                """, (now, self.max_attempts))
+                row = self.conn.execute(f"""
+                SELECT id, kind, payload, attempts FROM jobs
+                WHERE kind IN ({placeholders})
+                  AND ((status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires <= ?))
+                  {group_clause}
+                ORDER BY available_at, id
+                LIMIT 1
+                """, params).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                self.conn.execute("""
+                UPDATE jobs
+                SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE id = ?
+                """, (worker_id, now + self.lease_seconds, row[0]))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        job_id, kind, payload, attempts = row
+        return {"id": job_id, "kind": kind, "payload": json.loads(payload), "attempts": attempts + 1}
+
+    def heartbeat(self, worker_id):
+        """
+        Extends the lease of every job currently held by worker_id.
+        """
+        with self._lock:
+            self.conn.execute("""
+            UPDATE jobs SET lease_expires = ?
+            WHERE lease_owner = ? AND status = 'leased'
+            """, (time.time() + self.lease_seconds, worker_id))
+
+    def start_heartbeat(self, worker_id, interval=None):
+        """
+        Starts a daemon thread calling heartbeat() every interval seconds
+        (a third of the lease by default). Returns an Event that stops it.
+        """
+        stop = threading.Event()
+        interval = interval or max(1.0, self.lease_seconds / 3)
+
+        def beat():
+            while not stop.wait(interval):
+                try:
+                    self.heartbeat(worker_id)
+                except sqlite3.Error as e:
+                    logger.warning(f"Job queue heartbeat failed for {worker_id}: {e}")
+
+        threading.Thread(target=beat, name=f"heartbeat-{worker_id}", daemon=True).start()
+        return stop
+
+    def complete(self, job, worker_id):
+        """
+        Marks a leased job done. Returns False if the lease had been lost.
+        """
+        with self._lock:
+            cursor = self.conn.execute("""
+            UPDATE jobs SET status = 'done', lease_expires = NULL, last_error = NULL, finished_at = ?
+            WHERE id = ? AND lease_owner = ? AND status = 'leased'
+            """, (datetime.now().isoformat(), job["id"], worker_id))
+        if cursor.rowcount == 0:
+            logger.warning(f"Job {job['id']} was no longer leased by {worker_id} when it finished.")
+        return cursor.rowcount == 1
+
+    def fail(self, job, worker_id, error):
+        """
+        Requeues a leased job with exponential backoff, or marks it failed once
+        it has been attempted max_attempts times.
+        """
+        if job["attempts"] >= self.max_attempts:
+            status, available_at = "failed", 0
+        else:
+            status, available_at = "queued", time.time() + self.retry_backoff * 2 ** (job["attempts"] - 1)
+        with self._lock:
+            self.conn.execute("""
+            UPDATE jobs
+            SET status = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL, last_error = ?,
+                finished_at = CASE WHEN ? = 'failed' THEN ? END
+            WHERE id = ? AND lease_owner = ? AND status = 'leased'
+            """, (status, available_at, error, status, datetime.now().isoformat(), job["id"], worker_id))
+
+    def release(self, job, worker_id, delay=0):
+        """
+        Puts a leased job back in the queue without counting the attempt, for
+        jobs that could not run for reasons outside their control (e.g. quota).
+        """
+        with self._lock:
+            self.conn.execute("""
+            UPDATE jobs
+            SET status = 'queued', available_at = ?, lease_owner = NULL, lease_expires = NULL,
+                attempts = MAX(attempts - 1, 0)
+            WHERE id = ? AND lease_owner = ? AND status = 'leased'
+            """, (time.time() + delay, job["id"], worker_id))
+
+    def counts(self):
+        """
+        Returns {kind: {status: count}}.
+        """
+        counts = {}
+        with self._lock:
+            for kind, status, count in self.conn.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status"):
+                counts.setdefault(kind, {})[status] = count
+        return counts
+
+    def unfinished(self, kinds=None, statuses=("queued", "leased")):
+        """
+        Number of jobs still queued or leased, of the given kinds (default: any).
+        """
+        query = f"SELECT COUNT(*) FROM jobs WHERE status IN ({', '.join('?' for _ in statuses)})"
+        params = list(statuses)
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params += list(kinds)
+        with self._lock:
+            return self.conn.execute(query, params).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -2,28 +2,46 @@
 from loguru import logger
 import sys
 import os
+from utils.config import config_flag
 
 # This logger can be imported and used throughout the project.
+# configure_logging(config) applies the `logging` section of config.yaml.
 
-# Ensure logs directory exists
-os.makedirs("logs", exist_ok=True)
+CONSOLE_FORMAT = "<green>{time}</green> <level>{message}</level>"
+FILE_FORMAT = "{time} {level} {message}"
 
-# Remove the default handler to configure from scratch
-logger.remove()
+def configure_logging(config=None):
+    """
+    (Re)creates the console and file sinks from config["logging"].
+
+    Both sinks are enqueued: records are handed to a background thread, so
+    worker threads never block on console or disk I/O. Expensive DEBUG
+    messages should use logger.opt(lazy=True) so they are only formatted
+    when a sink actually wants them.
+    """
+    log_config = (config or {}).get("logging", {})
+    enqueue = config_flag(log_config, "enqueue", "yes")
+    file_path = log_config.get("file_path", "logs/applog")
+
+    # Remove the existing handlers to configure from scratch
+    logger.remove()
 
-# Add a console logger at DEBUG
-logger.add(sys.stdout, level="DEBUG", format="<green>{time}</green> <level>{message}</level>")
-
-# Add a file logger at DEBUG (change path/level as you need)
-logger.add(
-    "logs/applog",       # Could also do "logs/applog.log" if you prefer a .log extension
-    level="DEBUG",       # Capture DEBUG and above
-    format="{time} {level} {message}",
-    rotation="10 MB",    # optional: rotate file
-    retention="10 days", # optional: keep logs for 10 days
-    compression="zip"    # optional: compress rotated logs
-)
-
-logger.debug("This is a DEBUG log, will be captured in the file and console.")
-logger.info("This is an INFO log, also captured.")
-logger.warning("This is a WARNING log.")
\ No newline at end of file
+    logger.add(sys.stdout, level=log_config.get("level", "INFO"), format=CONSOLE_FORMAT, enqueue=enqueue)
+
+    if file_path:
+        # Ensure logs directory exists
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        logger.add(
+            file_path,
+            level=log_config.get("file_level", "DEBUG"),
+            format=FILE_FORMAT,
+            rotation=log_config.get("rotation", "10 MB"),
+            retention=log_config.get("retention", "10 days"),
+            compression="zip",
+            enqueue=enqueue
+        )
+
+# Until configure_logging(config) runs, log to the console only: importing this
+# module creates no directories, files or background threads
+logger.remove()
+logger.add(sys.stdout, level="INFO", format=CONSOLE_FORMAT)
@@ -0,0 +1,273 @@
+# metrics.py
+"""
+Process-wide counters and timers for a run, with a JSON run report and
+Prometheus text-format output (written to a file and/or served over HTTP).
+
+    metrics.increment("search_requests", engine="google", status=200)
+    with metrics.timer("scrape_seconds", engine="custom", domain="example.com"):
+        ...
+
+Every call is thread-safe and cheap enough for the hot path. Timers keep a
+bounded random sample of their observations for the p50/p95/p99 figures.
+"""
+import os
+import json
+import time
+import random
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from utils.logger import logger
+
+PREFIX = "scrapescout_"
+SAMPLE_SIZE = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+_lock = threading.Lock()
+_counters = {}
+_timers = {}
+_started = time.time()
+_server = None
+
+class _Timer:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(seconds)
+        else:
+            # Reservoir sampling keeps every observation equally likely to be in the sample
+            slot = random.randrange(self.count)
+            if slot < SAMPLE_SIZE:
+                self.samples[slot] = seconds
+
+def _key(name, labels):
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+def increment(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        series = _timers.get(key)
+        if series is None:
+            series = _timers[key] = _Timer()
+        series.add(seconds)
+
+@contextmanager
+def timer(name, **labels):
+    """
+    Times the block and records it under name. Labels may be added or changed
+    inside the block through the yielded dict (e.g. the outcome status).
+    """
+    start = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def reset():
+    global _started
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+        _started = time.time()
+
+def _quantiles(samples):
+    if not samples:
+        return {}
+    values = sorted(samples)
+    return {f"p{int(q * 100)}": round(values[min(len(values) - 1, int(q * len(values)))], 6) for q in QUANTILES}
+
+def snapshot():
+    """
+    Returns every counter and timer as plain dicts: per metric name, the total
+    across all label sets plus one entry per label set.
+    """
+    with _lock:
+        counters = list(_counters.items())
+        timers = [(key, series.count, series.total, series.max, list(series.samples)) for key, series in _timers.items()]
+
+    counter_report = {}
+    for (name, labels), value in sorted(counters):
+        entry = counter_report.setdefault(name, {"total": 0, "series": []})
+        entry["total"] += value
+        entry["series"].append({"labels": dict(labels), "value": value})
+
+    timer_report = {}
+    merged_samples = {}
+    for (name, labels), count, total, longest, samples in sorted(timers, key=lambda item: item[0]):
+        entry = timer_report.setdefault(name, {"count": 0, "sum_seconds": 0.0, "max_seconds": 0.0, "series": []})
+        entry["count"] += count
+        entry["sum_seconds"] += total
+        entry["max_seconds"] = max(entry["max_seconds"], longest)
+        merged_samples.setdefault(name, []).extend(samples)
+        entry["series"].append(dict(
+            {"labels": dict(labels), "count": count, "sum_seconds": round(total, 6), "max_seconds": round(longest, 6)},
+            **_quantiles(samples)
+        ))
+    for name, entry in timer_report.items():
+        entry["sum_seconds"] = round(entry["sum_seconds"], 6)
+        entry["max_seconds"] = round(entry["max_seconds"], 6)
+        entry.update(_quantiles(merged_samples[name]))
+
+    return {"counters": counter_report, "timers": timer_report}
+
+def write_report(path, **run_info):
+    """
+    Writes the JSON run report: start/finish times, any run_info passed in, and
+    the snapshot of every metric. Replaces the file atomically.
+    """
+    finished = time.time()
+    report = {
+        "started_at": datetime.fromtimestamp(_started).isoformat(timespec="seconds"),
+        "finished_at": datetime.fromtimestamp(finished).isoformat(timespec="seconds"),
+        "duration_seconds": round(finished - _started, 3),
+        **run_info,
+        **snapshot()
+    }
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        logger.info(f"Run report written to {path}")
+    except Exception as e:
+        logger.exception(f"Error writing run report to {path}: {e}")
+    return report
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(pairs, escaped)) + "}"
+
+def prometheus_text():
+    """
+    Renders every metric in the Prometheus text exposition format: counters as
+    <name>_total and timers as summaries with p50/p95/p99 quantiles.
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        timers = sorted(((key, series.count, series.total, list(series.samples)) for key, series in _timers.items()),
+                        key=lambda item: item[0])
+
+    lines = []
+    declared = set()
+    for (name, labels), value in counters:
+        metric = f"{PREFIX}{name}_total"
+        if metric not in declared:
+            lines.append(f"# TYPE {metric} counter")
+            declared.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+    for (name, labels), count, total, samples in timers:
+        metric = f"{PREFIX}{name}"
+        if metric not in declared:
+            lines.append(f"# TYPE {metric} summary")
+            declared.add(metric)
+        values = sorted(samples)
+        for q in QUANTILES:
+            if values:
+                lines.append(f"{metric}{_format_labels(labels, quantile=q)} {values[min(len(values) - 1, int(q * len(values)))]}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus_file(path):
+    """
+    Writes prometheus_text() to path atomically, e.g. for node_exporter's textfile collector.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.exception(f"Error writing Prometheus metrics to {path}: {e}")
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_prometheus_server(port, host="0.0.0.0"):
+    """
+    Serves live metrics at http://<host>:<port>/metrics from a daemon thread.
+    """
+    global _server
+    if _server is not None:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Could not start the metrics endpoint on port {port}: {e}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    logger.info(f"Serving metrics at http://{host}:{_server.server_address[1]}/metrics")
+    return _server
+
+def stop_prometheus_server():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+
+def configure_metrics(config):
+    """
+    Starts the Prometheus endpoint if metrics.prometheus_port is set.
+    """
+    port = int((config or {}).get("metrics", {}).get("prometheus_port", 0) or 0)
+    if port:
+        start_prometheus_server(port)
+
+def finish_run(config, **run_info):
+    """
+    Writes the run report and Prometheus file configured under `metrics`, then
+    stops the endpoint. With a worker_id in run_info, the id is added to both
+    file names so workers sharing a disk don't overwrite each other's reports.
+    Returns the report dict (None if no report_path is configured).
+    """
+    metrics_config = (config or {}).get("metrics", {})
+    worker_id = run_info.get("worker_id")
+
+    def output_path(path):
+        if not path or not worker_id:
+            return path
+        root, ext = os.path.splitext(path)
+        return f"{root}-{worker_id}{ext}"
+
+    report_path = output_path(metrics_config.get("report_path", ""))
+    report = write_report(report_path, **run_info) if report_path else None
+    prometheus_file = output_path(metrics_config.get("prometheus_file", ""))
+    if prometheus_file:
+        write_prometheus_file(prometheus_file)
+    stop_prometheus_server()
+    return report
@@ -0,0 +1,132 @@
+# pdf_downloader.py
+import os
+import hashlib
+import threading
+from urllib.parse import urlsplit
+from utils import http_client, metrics
+from utils.logger import logger
+
+PDF_MAGIC = b"%PDF-"
+
+# Content types servers use for PDFs that aren't labelled application/pdf
+AMBIGUOUS_CONTENT_TYPES = ("application/octet-stream", "application/x-download", "application/force-download", "binary/octet-stream", "")
+
+# Caps simultaneous PDF downloads across all scrape workers; set by configure_pdf_downloads()
+_download_slots = threading.BoundedSemaphore(4)
+_max_bytes = 100 * 1024 * 1024
+_chunk_size = 64 * 1024
+
+def configure_pdf_downloads(config):
+    """
+    Applies config["pdf_settings"]: max_concurrent_downloads, max_size_mb, chunk_size_kb.
+    """
+    global _download_slots, _max_bytes, _chunk_size
+    pdf_settings = config.get("pdf_settings", {})
+    _download_slots = threading.BoundedSemaphore(max(1, int(pdf_settings.get("max_concurrent_downloads", 4))))
+    _max_bytes = int(float(pdf_settings.get("max_size_mb", 100)) * 1024 * 1024)
+    _chunk_size = int(pdf_settings.get("chunk_size_kb", 64)) * 1024
+
+def is_pdf_url(url):
+    return urlsplit(url or "").path.lower().endswith(".pdf")
+
+def content_type_of(response):
+    return (response.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+
+def is_pdf_content(content_type, first_bytes=b""):
+    """
+    True if a response is a PDF, judged by its Content-Type or, for generic
+    binary types, by the %PDF- magic bytes at the start of the body.
+    """
+    if content_type == "application/pdf":
+        return True
+    if content_type in AMBIGUOUS_CONTENT_TYPES:
+        return first_bytes.lstrip()[:len(PDF_MAGIC)] == PDF_MAGIC
+    return False
+
+def download_pdf(url, dest_path):
+    """
+    Streams a PDF to dest_path via a `.part` temp file and an atomic rename.
+
+    A `.part` file left by an interrupted download is resumed with an HTTP Range
+    request when the server supports it. Downloads larger than the configured
+    max size are abandoned, and responses that turn out not to be PDFs rejected.
+
+    :return: dict with "status" ("ok" or "failed"), and "content_bytes",
+             "content_sha256", "content_path" or "error".
+    """
+    part_path = dest_path + ".part"
+    sha256 = hashlib.sha256()
+    resume_from = 0
+
+    if os.path.exists(part_path):
+        resume_from = os.path.getsize(part_path)
+        with open(part_path, "rb") as f:
+            for block in iter(lambda: f.read(_chunk_size), b""):
+                sha256.update(block)
+
+    # Byte ranges refer to the encoded body, so ask for it unencoded
+    headers = {"Accept-Encoding": "identity"}
+    if resume_from:
+        headers["Range"] = f"bytes={resume_from}-"
+
+    with _download_slots:
+        try:
+            response = http_client.get(url, headers=headers, stream=True)
+            with response:
+                if response.status_code == 416 and resume_from:
+                    # The partial file already holds the whole document
+                    pass
+                elif not response.ok:
+                    logger.warning(f"Failed to download PDF from {url}, status {response.status_code}")
+                    return {"status": "failed", "error": f"HTTP {response.status_code}"}
+                else:
+                    content_length = response.headers.get("Content-Length")
+                    if response.status_code == 206:
+                        if not response.headers.get("Content-Range", "").startswith(f"bytes {resume_from}-"):
+                            os.remove(part_path)
+                            return {"status": "failed", "error": "Unexpected Content-Range on resume"}
+                        logger.debug(f"Resuming PDF download at byte {resume_from}: {url}")
+                        mode = "ab"
+                    else:
+                        # Server ignored the Range header; start over
+                        mode = "wb"
+                        resume_from = 0
+                        sha256 = hashlib.sha256()
+
+                    if content_length and resume_from + int(content_length) > _max_bytes:
+                        return {"status": "failed", "error": f"PDF larger than {_max_bytes} bytes"}
+
+                    written = resume_from
+                    checked_magic = resume_from > 0
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=_chunk_size):
+                            if not chunk:
+                                continue
+                            if not checked_magic:
+                                if not is_pdf_content(content_type_of(response), chunk):
+                                    f.close()
+                                    os.remove(part_path)
+                                    return {"status": "failed", "error": "Response is not a PDF"}
+                                checked_magic = True
+                            written += len(chunk)
+                            if written > _max_bytes:
+                                f.close()
+                                os.remove(part_path)
+                                return {"status": "failed", "error": f"PDF larger than {_max_bytes} bytes"}
+                            sha256.update(chunk)
+                            f.write(chunk)
+                            metrics.increment("bytes_downloaded", len(chunk), source="pdf")
+
+            os.replace(part_path, dest_path)
+            size = os.path.getsize(dest_path)
+            logger.info(f"PDF file downloaded: {dest_path} ({size} bytes)")
+            return {
+                "status": "ok",
+                "content_bytes": size,
+                "content_sha256": sha256.hexdigest(),
+                "content_path": dest_path
+            }
+        except Exception as e:
+            # Keep the .part file so the next attempt can resume it
+            logger.exception(f"Error downloading PDF from {url}: {e}")
+            return {"status": "failed", "error": str(e)}
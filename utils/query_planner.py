@@ -0,0 +1,86 @@
+# query_planner.py
+import threading
+from urllib.parse import urlsplit
+
+class QueryPlanner:
+    """
+    Groups a topic's domains into combined search queries of the form
+    `topic (site:a.com OR site:b.com ...)`, so sparse domains cost one query
+    per batch instead of one each.
+
+    Domains found to be dense (they crowd a combined result page) are
+    remembered and searched on their own, with pagination, for every later
+    topic as well. Safe to share between threads.
+
+    :param max_domains_per_query: Sites per combined query (Google honours ~32 query words).
+    :param max_query_chars: Upper bound on the length of a combined query.
+    """
+
+    def __init__(self, max_domains_per_query=10, max_query_chars=1024):
+        self.max_domains_per_query = max(1, int(max_domains_per_query))
+        self.max_query_chars = int(max_query_chars)
+        self._dense = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build_query(topic, domains):
+        sites = " OR ".join(f"site:{domain}" for domain, _ in domains)
+        return f"{topic} ({sites})"
+
+    def is_dense(self, domain):
+        with self._lock:
+            return domain in self._dense
+
+    def mark_dense(self, domain):
+        with self._lock:
+            self._dense.add(domain)
+
+    def plan(self, topic, domains):
+        """
+        Splits [(domain, max_articles), ...] for one topic into (topic, batch)
+        search jobs: domains known to be dense get a batch of their own, the
+        rest are grouped within the query limits.
+        """
+        jobs = []
+        batch = []
+        for domain, max_articles in domains:
+            if self.is_dense(domain):
+                jobs.append((topic, [(domain, max_articles)]))
+                continue
+            candidate = batch + [(domain, max_articles)]
+            if batch and (len(candidate) > self.max_domains_per_query
+                          or len(self.build_query(topic, candidate)) > self.max_query_chars):
+                jobs.append((topic, batch))
+                candidate = [(domain, max_articles)]
+            batch = candidate
+        if batch:
+            jobs.append((topic, batch))
+        return jobs
+
+def _normalize(domain):
+    domain = domain.strip().lower()
+    if "://" in domain:
+        domain = domain.split("://", 1)[1]
+    domain = domain.rstrip("/")
+    return domain[4:] if domain.startswith("www.") else domain
+
+def domain_for_url(url, domains):
+    """
+    Returns which of domains the URL belongs to (the most specific match, so
+    example.com/news wins over example.com), or None.
+    """
+    parts = urlsplit(url or "")
+    host = (parts.hostname or "").lower()
+    host = host[4:] if host.startswith("www.") else host
+
+    best = None
+    for domain in domains:
+        normalized = _normalize(domain)
+        site_host, _, site_path = normalized.partition("/")
+        if host != site_host and not host.endswith("." + site_host):
+            continue
+        if site_path and not parts.path.lstrip("/").startswith(site_path):
+            continue
+        if best is None or len(normalized) > len(_normalize(best)):
+            best = domain
+    return best
@@ -0,0 +1,149 @@
+# rate_limiter.py
+import time
+import sqlite3
+import threading
+from datetime import date
+from utils.logger import logger
+
+class QuotaExhausted(Exception):
+    """
+    Raised by callers that could not finish because the daily cap was reached.
+    """
+
+class RateLimiter:
+    """
+    Thread-safe token bucket that enforces a per-minute rate and a per-day cap.
+
+    Tokens refill continuously at max_per_minute / 60 per second and the bucket
+    holds at most `burst` tokens, so with the default burst of 1 consecutive
+    requests are spaced exactly 60 / max_per_minute seconds apart no matter how
+    long each request takes. Slots are reserved under a lock and waited for
+    outside it, so any number of threads can share one limiter.
+
+    :param max_per_minute: Queries per minute. 0 or less disables the rate limit.
+    :param max_per_day: Total queries allowed for this limiter. None disables the cap.
+    :param burst: Number of queries that may be issued back-to-back.
+    """
+
+    def __init__(self, max_per_minute, max_per_day=None, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 60.0 / max_per_minute if max_per_minute and max_per_minute > 0 else 0.0
+        self.max_per_day = max_per_day
+        self.burst = max(1, int(burst))
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next_free = None  # theoretical arrival time of the next token
+        self.used_today = 0
+
+    @property
+    def exhausted(self):
+        return self.max_per_day is not None and self.used_today >= self.max_per_day
+
+    def _reserve(self):
+        """
+        Reserves a slot and returns how many seconds the caller must wait for it,
+        or None if the daily cap has been reached.
+        """
+        with self._lock:
+            if self.exhausted:
+                return None
+            self.used_today += 1
+
+            if self.interval <= 0:
+                return 0.0
+
+            now = self._clock()
+            if self._next_free is None or self._next_free < now:
+                self._next_free = now
+            allowed_at = self._next_free - (self.burst - 1) * self.interval
+            self._next_free += self.interval
+            return max(0.0, allowed_at - now)
+
+    def acquire(self):
+        """
+        Blocks until the caller may issue one query.
+        Returns False (without blocking) if the daily cap has been reached.
+        """
+        wait = self._reserve()
+        if wait is None:
+            logger.debug("Rate limiter: daily query cap reached.")
+            return False
+        if wait > 0:
+            self._sleep(wait)
+        return True
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose state lives in a SQLite table, so every process using the
+    same database file draws from one per-minute rate and one daily budget.
+
+    The daily count resets at local midnight rather than per run, matching how
+    search APIs meter their quota. Reservations are made in a BEGIN IMMEDIATE
+    transaction, so concurrent processes never hand out the same slot.
+
+    :param name: Limiter name; limiters with different names are independent.
+    """
+
+    def __init__(self, db_full_path, name, max_per_minute, max_per_day=None, burst=1, clock=time.time, sleep=time.sleep):
+        super().__init__(max_per_minute, max_per_day, burst, clock, sleep)
+        self.name = name
+        self.conn = sqlite3.connect(db_full_path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            name TEXT PRIMARY KEY,
+            next_free REAL,
+            day TEXT,
+            used INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        self.conn.execute("INSERT OR IGNORE INTO rate_limits (name, next_free, day, used) VALUES (?, NULL, ?, 0)",
+                          (name, date.today().isoformat()))
+
+    @property
+    def used_today(self):
+        with self._lock:
+            row = self.conn.execute("SELECT day, used FROM rate_limits WHERE name = ?", (self.name,)).fetchone()
+        return row[1] if row and row[0] == date.today().isoformat() else 0
+
+    @used_today.setter
+    def used_today(self, value):
+        # Counted in the database; the base class initialiser's assignment is ignored
+        pass
+
+    def _reserve(self):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                next_free, day, used = self.conn.execute(
+                    "SELECT next_free, day, used FROM rate_limits WHERE name = ?", (self.name,)
+                ).fetchone()
+                today = date.today().isoformat()
+                if day != today:
+                    day, used = today, 0
+                if self.max_per_day is not None and used >= self.max_per_day:
+                    self.conn.execute("COMMIT")
+                    return None
+
+                wait = 0.0
+                if self.interval > 0:
+                    now = self._clock()
+                    if next_free is None or next_free < now:
+                        next_free = now
+                    allowed_at = next_free - (self.burst - 1) * self.interval
+                    next_free += self.interval
+                    wait = max(0.0, allowed_at - now)
+
+                self.conn.execute(
+                    "UPDATE rate_limits SET next_free = ?, day = ?, used = ? WHERE name = ?",
+                    (next_free, day, used + 1, self.name)
+                )
+                self.conn.execute("COMMIT")
+                return wait
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -1,71 +1,195 @@
-import requests
+from utils import http_client, metrics
 import time
+import threading
 from utils.logger import logger
-from markdownify import markdownify
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
+from utils.config import config_flag
+from utils.domain_health import GONE_STATUSES
+from utils.content_extraction import html_to_markdown
+from utils.pdf_downloader import AMBIGUOUS_CONTENT_TYPES, content_type_of, is_pdf_content
 
-def scrape_article(url, max_scroll_attempts=3, scroll_pause=2, api_config=None):
+# One browser pool per process, created on first use from the `browser_pool` config
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+def get_browser_pool(config=None):
+    """
+    Returns the shared WebDriverPool, creating it from config["browser_pool"] on first use.
+    """
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            # Selenium is only loaded once a page actually needs a browser
+            from utils.browser_pool import WebDriverPool
+            pool_config = (config or {}).get("browser_pool", {})
+            _browser_pool = WebDriverPool(
+                size=pool_config.get("size", 2),
+                max_pages_per_driver=pool_config.get("max_pages_per_driver", 50),
+                block_resources=config_flag(pool_config, "block_resources", "yes"),
+                page_load_timeout=pool_config.get("page_load_timeout", 30)
+            )
+        return _browser_pool
+
+def close_browser_pool():
     """
-    Loads a webpage in a headless browser, handles 'read more' or infinite scroll,
-    and returns the final HTML content.
+    Quits all pooled browsers. Call once scraping is finished.
+    """
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is not None:
+            _browser_pool.close()
+            _browser_pool = None
+
+def _wait_for_ready(driver, timeout):
+    from selenium.webdriver.support.ui import WebDriverWait
+    WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+
+def _wait_for_height_to_settle(driver, timeout, quiet_period=0.5, poll=0.1):
+    """
+    Returns the page height once it has stopped changing for quiet_period seconds
+    (or timeout elapses), instead of sleeping a fixed amount after every action.
+    """
+    deadline = time.monotonic() + timeout
+    last_height = driver.execute_script("return document.body.scrollHeight")
+    stable_since = time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(poll)
+        height = driver.execute_script("return document.body.scrollHeight")
+        if height != last_height:
+            last_height = height
+            stable_since = time.monotonic()
+        elif time.monotonic() - stable_since >= quiet_period:
+            break
+    return last_height
+
+def load_dynamic_content(url, config=None, max_scroll_attempts=3, settle_timeout=5):
+    """
+    Loads a webpage in a pooled headless browser, handles 'read more' or infinite
+    scroll, and returns the final HTML content.
 
     :param url: URL to scrape.
     :param max_scroll_attempts: Number of scroll cycles for infinite scroll.
-    :param scroll_pause: Seconds to wait after each scroll for content to load.
-    :return: Final HTML of the fully loaded page.
+    :param settle_timeout: Max seconds to wait for the page to settle after each action.
+    :return: Final HTML of the fully loaded page, or "" on failure.
     """
     logger.debug(f"Using Selenium for dynamic content for: {url}")
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    driver = None
 
     try:
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.get(url)
-        time.sleep(scroll_pause)  # Initial wait for page load
+        from selenium.webdriver.common.by import By
+        from selenium.common.exceptions import TimeoutException
+
+        with get_browser_pool(config).driver() as driver:
+            driver.get(url)
+            try:
+                _wait_for_ready(driver, settle_timeout)
+            except TimeoutException:
+                logger.debug(f"Page not fully ready after {settle_timeout}s, continuing: {url}")
 
-        # Attempt to click any 'read more' buttons that might reveal more text
-        try:
-            # Example: searching by CSS or text. Adjust as needed for site structure.
+            # Attempt to click any 'read more' buttons that might reveal more text
             read_more_buttons = driver.find_elements(By.XPATH, "//button[contains(., 'Read More')]")
             for btn in read_more_buttons:
-                btn.click()
-                time.sleep(scroll_pause)
-        except NoSuchElementException:
-            logger.debug("No 'read more' buttons found.")
-
-        # Attempt infinite scroll if the page uses lazy-loaded content
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        for _ in range(max_scroll_attempts):
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(scroll_pause)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
-
-        final_html = driver.page_source
-        return final_html
+                try:
+                    btn.click()
+                except Exception as e:
+                    logger.debug(f"Could not click 'read more' button: {e}")
+            if read_more_buttons:
+                _wait_for_height_to_settle(driver, settle_timeout)
+
+            # Attempt infinite scroll if the page uses lazy-loaded content
+            last_height = driver.execute_script("return document.body.scrollHeight")
+            for _ in range(max_scroll_attempts):
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                new_height = _wait_for_height_to_settle(driver, settle_timeout)
+                if new_height == last_height:
+                    break
+                last_height = new_height
+
+            return driver.page_source
 
     except Exception as e:
         logger.exception(f"Error handling dynamic content: {e}")
         return ""
-    finally:
-        if driver:
-            driver.quit()
-            
-def scrape_article(url):
+
+def to_markdown(html, config=None):
+    """
+    Converts scraped HTML to Markdown per config["content_extraction"]: by default
+    only the main article content is converted, falling back to the whole page.
+    """
+    extraction_config = (config or {}).get("content_extraction", {})
+    return html_to_markdown(
+        html,
+        extract_main=config_flag(extraction_config, "enabled", "yes"),
+        min_text_length=extraction_config.get("min_text_length", 200)
+    )
+
+def fetch_plain(article, config=None):
+    """
+    Fetches one article with a plain HTTP GET and converts it to Markdown.
+    Sends the stored ETag / Last-Modified validators so an unchanged page costs a 304.
+
+    :return: dict with "status" ("ok", "not_modified", "pdf" or "failed"), and
+             "content", "etag", "last_modified" or "error" as applicable. "pdf" means
+             the URL serves a PDF and should be handed to the PDF downloader. A non-OK
+             response is "failed" with its "http_status".
+    """
+    url = article["source_url"]
     logger.debug(f"Scraping article: {url}")
+
+    headers = {}
+    if article.get("etag"):
+        headers["If-None-Match"] = article["etag"]
+    if article.get("last_modified"):
+        headers["If-Modified-Since"] = article["last_modified"]
+
     try:
-        response = requests.get(url, timeout=10)
-        if response.ok:
-            return markdownify(response.text)
-        else:
-            logger.warning("Non-200 response. Attempting dynamic content load.")
-            return markdownify(scrape_article(url))
-    except Exception as e: 
+        # stream=True defers the body, so the response must be closed on every path
+        # for its connection to go back to the keep-alive pool
+        with http_client.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 304:
+                logger.debug(f"Article unchanged since last scrape: {url}")
+                return {"status": "not_modified"}
+            if response.ok:
+                # PDFs behind URLs like /download?id=... go to the PDF downloader, not the HTML converter
+                content_type = content_type_of(response)
+                if content_type == "application/pdf" or (
+                    content_type in AMBIGUOUS_CONTENT_TYPES and is_pdf_content(content_type, response.content[:1024])
+                ):
+                    logger.debug(f"Detected PDF content ({content_type or 'no content type'}): {url}")
+                    return {"status": "pdf"}
+                metrics.increment("bytes_downloaded", len(response.content), source="page")
+                return {
+                    "status": "ok",
+                    "content": to_markdown(response.text, config),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified")
+                }
+            return {"status": "failed", "error": f"HTTP {response.status_code}", "http_status": response.status_code}
+    except Exception as e:
         logger.exception(f"Error scraping article {url}: {e}")
-        return ""
\ No newline at end of file
+        return {"status": "failed", "error": str(e)}
+
+def fetch_rendered(article, config=None):
+    """
+    Loads one article in a pooled headless browser and converts it to Markdown.
+    """
+    html = load_dynamic_content(article["source_url"], config)
+    if html:
+        return {"status": "ok", "content": to_markdown(html, config)}
+    return {"status": "failed", "error": "Dynamic load failed"}
+
+def fetch_article(article, config=None):
+    """
+    Fetches one article with a plain HTTP GET (see fetch_plain), loading it in a
+    headless browser instead when the server answers with a non-OK status other
+    than 404/410.
+    """
+    result = fetch_plain(article, config)
+    status_code = result.get("http_status")
+    if status_code is None or status_code in GONE_STATUSES:
+        return result
+    logger.warning(f"Non-200 response ({status_code}) for {article['source_url']}. Attempting dynamic content load.")
+    rendered = fetch_rendered(article, config)
+    if rendered["status"] == "ok":
+        return rendered
+    return {"status": "failed", "error": f"HTTP {status_code}; dynamic load failed"}
@@ -1,62 +1,226 @@
-import requests
+import os
+import time
+import random
+import hashlib
+import threading
 from base64 import b64decode
-from markdownify import markdownify
+from email.utils import parsedate_to_datetime
+from utils import http_client, metrics
+from utils.concurrency import run_concurrently
 from utils.json_to_markdown import json_to_markdown
 from utils.logger import logger
 
-def scrape_article(url,api_config):
+# Zyte asks clients to back off and retry on these: 429 (over the account's rate or
+# concurrency limit), 503 (temporarily overloaded) and 520 (temporary download error)
+RETRYABLE_STATUSES = {429, 503, 520}
+
+def article_to_markdown(article):
     """
-    Scrapes article using Zyte API for dynamic content.
-    Fetches api_url and api_key from the provided engine_config dict.
+    Builds the Markdown document directly from the fields of Zyte's `article` result.
+    Falls back to a bullet dump of the JSON when there is no article body.
     """
-    # Access zyte's specific configuration
-    zyte_config = api_config.get('scrape_engines', {}).get('zyte', {})
+    body = article.get("articleBody")
+    if not body:
+        return json_to_markdown(article)
 
-    # Fetch zyte API variables
-    zyte_api_url = zyte_config.get('api_url')
-    zyte_api_key = zyte_config.get('api_key')
-    
-    logger.debug(f"Using Zyte for dynamic content: {url}")
-    
-    try:
+    lines = []
+    headline = article.get("headline")
+    if headline:
+        lines.append(f"# {headline}\n")
+
+    authors = ", ".join(a.get("name", "") for a in article.get("authors", []) if a.get("name"))
+    metadata = [
+        ("Author(s)", authors),
+        ("Published", article.get("datePublished")),
+        ("Modified", article.get("dateModified")),
+        ("Language", article.get("inLanguage")),
+        ("URL", article.get("canonicalUrl") or article.get("url"))
+    ]
+    for label, value in metadata:
+        if value:
+            lines.append(f"- **{label}**: {value}")
+    if len(lines) > 1 or (lines and not headline):
+        lines.append("")
+
+    description = article.get("description")
+    if description and not body.startswith(description):
+        lines.append(f"> {description}\n")
+
+    lines.append(body)
+    return "\n".join(lines)
+
+class ZyteClient:
+    """
+    Thread-safe Zyte API extraction client.
+
+    Keeps up to max_concurrent_requests requests in flight (the account's
+    concurrency limit) across all threads sharing it, and retries 429/503/520
+    responses and request errors (e.g. read timeouts) itself, up to max_retries,
+    with exponential backoff and jitter, honouring Retry-After.
+    Responses stay in memory; the raw page body is only requested, decoded and
+    written to disk when response_body_dir is set.
+    """
+
+    def __init__(self, api_url, api_key, max_concurrent_requests=20, max_retries=5,
+                 backoff_factor=1.0, backoff_max=60, response_body_dir=None, read_timeout=60,
+                 http_config=None):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.max_concurrent_requests = max(1, int(max_concurrent_requests))
+        self.max_retries = int(max_retries)
+        self.backoff_factor = float(backoff_factor)
+        self.backoff_max = float(backoff_max)
+        self.response_body_dir = response_body_dir
+        self._slots = threading.BoundedSemaphore(self.max_concurrent_requests)
+
+        # Our own metered session: urllib3 only retries connections that failed to
+        # open. Every retry of the (billed) extraction POST - 429/503/520 responses
+        # and read timeouts alike - goes through the loop in extract(), outside the
+        # concurrency slot and within max_retries
+        http_config = dict(http_config or {})
+        http_config["pool_size_per_host"] = max(http_config.get("pool_size_per_host", 10), self.max_concurrent_requests)
+        self.session = http_client.build_metered_session(http_config)
+        # Extraction can take far longer than a plain page fetch, so it has its own read timeout
+        self.timeout = (http_config.get("connect_timeout", 5), read_timeout)
+
+    @classmethod
+    def from_config(cls, config):
+        zyte_config = config.get("scrape_engines", {}).get("zyte", {})
+        return cls(
+            zyte_config.get("api_url"),
+            zyte_config.get("api_key"),
+            max_concurrent_requests=zyte_config.get("max_concurrent_requests", 20),
+            max_retries=zyte_config.get("max_retries", 5),
+            backoff_factor=zyte_config.get("backoff_factor", 1.0),
+            response_body_dir=zyte_config.get("response_body_dir"),
+            read_timeout=zyte_config.get("read_timeout", 60),
+            http_config=config.get("http_client", {})
+        )
+
+    def _retry_delay(self, response, attempt):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                try:
+                    return min(self.backoff_max, max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+                except (TypeError, ValueError):
+                    pass
+        delay = min(self.backoff_max, self.backoff_factor * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def extract(self, url, guid=None):
+        """
+        Requests article extraction for one URL.
+        Returns the parsed Zyte response dict, or None if it failed.
+        """
         payload = {
             "url": url,
-            "httpResponseBody": True,
             "article": True,
             "articleOptions": {"extractFrom": "httpResponseBody"},
         }
+        if self.response_body_dir:
+            payload["httpResponseBody"] = True
 
-        # Make the POST request, passing the api_key as the username in basic auth
-        api_response = requests.post(
-            zyte_api_url,
-            auth=(zyte_api_key, ""),  
-            json=payload,
-            timeout=20
-        )
-        api_response.raise_for_status()
-
-        resp_json = api_response.json()
-
-        # Decode the base64-encoded HTML if present
-        http_response_body_base64 = resp_json.get("httpResponseBody")
-        if http_response_body_base64:
-            http_response_body = b64decode(http_response_body_base64)
-            with open("http_response_body.html", "wb") as fp:
-                fp.write(http_response_body)
-            html_str = http_response_body.decode("utf-8", errors="replace")
-        else:
+        for attempt in range(self.max_retries + 1):
+            response = None
+            with self._slots:
+                try:
+                    # Zyte takes the api_key as the username in basic auth
+                    response = self.session.post(
+                        self.api_url,
+                        auth=(self.api_key, ""),
+                        json=payload,
+                        timeout=self.timeout
+                    )
+                except Exception as e:
+                    logger.warning(f"Zyte request error for {url}: {e}")
+
+            if response is not None:
+                metrics.increment("zyte_requests", status=response.status_code)
+            if response is not None and response.ok:
+                metrics.increment("bytes_downloaded", len(response.content), source="zyte")
+                resp_json = response.json()
+                if self.response_body_dir:
+                    self._save_response_body(resp_json, guid or hashlib.sha1(url.encode("utf-8")).hexdigest())
+                return resp_json
+
+            status = response.status_code if response is not None else None
+            if status is not None and status not in RETRYABLE_STATUSES:
+                logger.warning(f"Zyte extraction failed for {url} with status {status}: {response.text[:200]}")
+                return None
+            if attempt < self.max_retries:
+                delay = self._retry_delay(response, attempt)
+                logger.debug(f"Zyte returned {status} for {url}; retrying in {delay:.1f}s.")
+                time.sleep(delay)
+
+        logger.warning(f"Zyte extraction gave up on {url} after {self.max_retries + 1} attempts.")
+        return None
+
+    def extract_many(self, urls):
+        """
+        Extracts many URLs concurrently, up to the client's concurrency limit.
+        Yields (url, response dict or None) as each completes.
+        """
+        yield from run_concurrently(self.extract, urls, self.max_concurrent_requests)
+
+    def _save_response_body(self, resp_json, guid):
+        body_base64 = resp_json.get("httpResponseBody")
+        if not body_base64:
             logger.warning("No 'httpResponseBody' key in Zyte response.")
-            html_str = ""
+            return
+        try:
+            os.makedirs(self.response_body_dir, exist_ok=True)
+            with open(os.path.join(self.response_body_dir, f"{guid}.html"), "wb") as fp:
+                fp.write(b64decode(body_base64))
+        except Exception as e:
+            logger.exception(f"Error saving Zyte response body for {guid}: {e}")
+
+    def close(self):
+        self.session.close()
+
+# One client per process, created on first use from config["scrape_engines"]["zyte"]
+_zyte_client = None
+_zyte_client_lock = threading.Lock()
 
-        # Log article info if needed
-        article = resp_json.get("article", {})
-        logger.debug(f"Zyte article JSON Response: {article}")
+def get_zyte_client(config):
+    global _zyte_client
+    with _zyte_client_lock:
+        if _zyte_client is None:
+            _zyte_client = ZyteClient.from_config(config)
+        return _zyte_client
 
-        # Convert entire JSON to a structured Markdown:
-        md_output = json_to_markdown(article)  # or resp_json?
-        return md_output
+def close_zyte_client():
+    global _zyte_client
+    with _zyte_client_lock:
+        if _zyte_client is not None:
+            _zyte_client.close()
+            _zyte_client = None
+
+def scrape_article(url, api_config, guid=None):
+    """
+    Scrapes article using Zyte API for dynamic content and returns it as Markdown.
+    Fetches api_url and api_key from api_config["scrape_engines"]["zyte"].
+    """
+    logger.debug(f"Using Zyte for dynamic content: {url}")
+
+    try:
+        resp_json = get_zyte_client(api_config).extract(url, guid)
+        if resp_json is None:
+            return ""
+        return article_to_markdown(resp_json.get("article", {}))
 
     except Exception as e:
         logger.exception(f"Error scraping article with Zyte for {url}: {e}")
         return ""
 
+def fetch_article(article, api_config):
+    """
+    Scrapes one article through Zyte and reports the outcome in the same shape as
+    the custom engine: a dict with "status" ("ok" or "failed") and "content".
+    """
+    content = scrape_article(article["source_url"], api_config, article.get("source_guid"))
+    if not content:
+        return {"status": "failed", "error": "Empty Zyte response"}
+    return {"status": "ok", "content": content}
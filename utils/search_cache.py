@@ -0,0 +1,141 @@
+# search_cache.py
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from utils.logger import logger
+
+# Request parameters that identify a search response. Anything else (key, cx, safe...)
+# doesn't change what the engine returns for our purposes.
+CACHE_KEY_PARAMS = ("q", "siteSearch", "dateRestrict", "lr", "start", "num")
+
+class SearchCache:
+    """
+    Persistent on-disk cache of search API responses, stored in SQLite.
+
+    Entries are keyed by the engine name plus the identifying request parameters,
+    expire after ttl_hours, and the least recently used entries are evicted once
+    the cache holds more than max_entries responses.
+    """
+
+    def __init__(self, cache_path, ttl_hours=24, max_entries=50000):
+        self.cache_path = cache_path
+        self.ttl_seconds = float(ttl_hours) * 3600
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS search_cache (
+            cache_key TEXT PRIMARY KEY,
+            engine TEXT,
+            query TEXT,
+            response TEXT,
+            created_at REAL,
+            last_accessed REAL
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_last_accessed ON search_cache (last_accessed)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(engine, params):
+        """
+        Builds a stable cache key from the engine name and the identifying params.
+        """
+        key_parts = {"engine": engine}
+        for name in CACHE_KEY_PARAMS:
+            if params.get(name) not in (None, ""):
+                key_parts[name] = str(params[name])
+        raw = json.dumps(key_parts, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, engine, params):
+        """
+        Returns the cached response (parsed JSON) or None on a miss / expired entry.
+        """
+        cache_key = self.make_key(engine, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM search_cache WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE search_cache SET last_accessed = ? WHERE cache_key = ?",
+                (now, cache_key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(self, engine, params, response_json):
+        """
+        Stores a response and evicts the least recently used entries if over max_entries.
+        """
+        cache_key = self.make_key(engine, params)
+        now = time.time()
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "UPDATE search_cache SET response = ?, created_at = ?, last_accessed = ? WHERE cache_key = ?",
+                    (json.dumps(response_json), now, now, cache_key)
+                )
+                if cursor.rowcount == 0:
+                    self._conn.execute(
+                        "INSERT INTO search_cache (cache_key, engine, query, response, created_at, last_accessed) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (cache_key, engine, params.get("q"), json.dumps(response_json), now, now)
+                    )
+                    self._entries += 1
+
+                if self._entries > self.max_entries:
+                    self._evict()
+                self._conn.commit()
+        except Exception as e:
+            logger.exception(f"Error writing search response to cache: {e}")
+
+    def _evict(self):
+        """
+        Drops expired entries, then the least recently used ones down to max_entries.
+        Caller must hold the lock.
+        """
+        self._conn.execute(
+            "DELETE FROM search_cache WHERE created_at < ?",
+            (time.time() - self.ttl_seconds,)
+        )
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        overflow = self._entries - self.max_entries
+        if overflow > 0:
+            self._conn.execute("""
+            DELETE FROM search_cache WHERE cache_key IN (
+                SELECT cache_key FROM search_cache ORDER BY last_accessed LIMIT ?
+            )
+            """, (overflow,))
+            self._entries -= overflow
+        logger.debug(f"Search cache evicted down to {self._entries} entries.")
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        logger.info(f"Search cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate).")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
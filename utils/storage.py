@@ -1,23 +1,78 @@
 # storage.py
 import os
 import re
-import requests
-import pandas as pd
 import sqlite3
+import time
+import threading
+from datetime import datetime, timedelta
 from utils.logger import logger
+from utils import metrics
+from utils.dedup import canonicalize_url
+from utils.pdf_downloader import download_pdf
 
-def store_articles_in_db(db_path, db_name, articles):
+# Metadata columns exported to Excel/CSV/Parquet, in output column order
+EXPORT_COLUMNS = [
+    "source_guid",
+    "source_name",
+    "source_domain",
+    "search_engine_name",
+    "source_url",
+    "source_article_title",
+    "date_retrieved",
+    "search_query",
+    "suspected_duplicate"
+]
+
+# Metadata columns persisted in the `articles` table (article_content lives in Markdown/PDF only)
+ARTICLE_COLUMNS = list(EXPORT_COLUMNS)
+
+# Per-article scrape bookkeeping, added to older databases on open.
+# scrape_status is NULL (never scraped), "pending", "ok", "failed" or "deferred"
+# (skipped while its domain's circuit was open); scrape_attempts counts consecutive failures.
+SCRAPE_STATE_COLUMNS = {
+    "scrape_status": "TEXT",
+    "scrape_attempts": "INTEGER DEFAULT 0",
+    "last_error": "TEXT",
+    "etag": "TEXT",
+    "last_modified": "TEXT"
+}
+
+# What was stored for a scraped article: byte count, SHA-256 and file path
+CONTENT_COLUMNS = {
+    "content_bytes": "INTEGER",
+    "content_sha256": "TEXT",
+    "content_path": "TEXT"
+}
+
+# Canonical form of source_url (see dedup.canonicalize_url), indexed for duplicate lookups
+DEDUP_COLUMNS = {
+    "canonical_url": "TEXT"
+}
+
+class ArticleStore:
     """
-    Stores article metadata in a local SQLite database (excluding article_content).
+    Long-lived handle on the SQLite article database.
+
+    Holds a single connection in WAL mode, buffers writes and flushes them with
+    executemany inside one explicit transaction every flush_size articles.
+    Safe to share between threads.
     """
-    db_full_path = os.path.join(db_path, db_name)
-    logger.debug(f"Preparing to store {len(articles)} articles in database at {db_full_path}")
 
-    try:
-        conn = sqlite3.connect(db_full_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+    def __init__(self, db_path, db_name, flush_size=500):
+        self.db_full_path = os.path.join(db_path, db_name)
+        self.flush_size = max(1, int(flush_size))
+        self._buffer = []
+        self._lock = threading.RLock()
+
+        os.makedirs(db_path, exist_ok=True)
+        # Worker processes may share the file; wait out their write locks instead of failing
+        self.conn = sqlite3.connect(self.db_full_path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        self.conn.execute("""
         CREATE TABLE IF NOT EXISTS articles (
             source_guid TEXT PRIMARY KEY,
             source_name TEXT,
@@ -30,38 +85,240 @@ def store_articles_in_db(db_path, db_name, articles):
             suspected_duplicate TEXT
         )
         """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_source_url ON articles (source_url)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_source_domain ON articles (source_domain)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_date_retrieved ON articles (date_retrieved)")
+        self._ensure_columns("articles", SCRAPE_STATE_COLUMNS)
+        self._ensure_columns("articles", CONTENT_COLUMNS)
+        self._ensure_columns("articles", DEDUP_COLUMNS)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_scrape_status ON articles (scrape_status)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_content_sha256 ON articles (content_sha256)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_canonical_url ON articles (canonical_url)")
+        self._backfill_canonical_urls()
 
-        for article in articles:
-            cursor.execute("""
-            INSERT OR REPLACE INTO articles (
-                source_guid,
-                source_name,
-                source_domain,
-                search_engine_name,
-                source_url,
-                source_article_title,
-                date_retrieved,
-                search_query,
-                suspected_duplicate
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                article.get("source_guid"),
-                article.get("source_name"),
-                article.get("source_domain"),
-                article.get("search_engine_name"),
-                article.get("source_url"),
-                article.get("source_article_title"),
-                article.get("date_retrieved"),
-                article.get("search_query"),
-                article.get("suspected_duplicate")
-            ))
-
-        conn.commit()
-        logger.info(f"{len(articles)} articles successfully stored in the database at {db_full_path}.")
-    except Exception as e:
-        logger.exception(f"Error storing articles in database: {e}")
-    finally:
-        conn.close()
+    def _ensure_columns(self, table, columns):
+        """
+        Adds any of the given columns missing from an existing table.
+        """
+        existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+        for column, column_type in columns.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                logger.info(f"Added column {column} to {table} table.")
+
+    def _backfill_canonical_urls(self):
+        """
+        Fills canonical_url for rows stored before the column existed.
+        """
+        missing = self.conn.execute(
+            "SELECT COUNT(*) FROM articles WHERE canonical_url IS NULL AND source_url IS NOT NULL"
+        ).fetchone()[0]
+        if not missing:
+            return
+        self.conn.create_function("canonicalize_url", 1, canonicalize_url, deterministic=True)
+        self.conn.execute("BEGIN")
+        self.conn.execute(
+            "UPDATE articles SET canonical_url = canonicalize_url(source_url) "
+            "WHERE canonical_url IS NULL AND source_url IS NOT NULL"
+        )
+        self.conn.execute("COMMIT")
+        logger.info(f"Stored canonical URLs for {missing} existing articles.")
+
+    def add_articles(self, articles):
+        """
+        Queues article metadata for writing; flushes once flush_size articles are buffered.
+        """
+        with self._lock:
+            self._buffer.extend(
+                tuple(article.get(column) for column in ARTICLE_COLUMNS) + (canonicalize_url(article.get("source_url")),)
+                for article in articles
+            )
+            if len(self._buffer) >= self.flush_size:
+                self.flush()
+
+    def flush(self):
+        """
+        Writes all buffered articles in a single transaction. Articles already
+        stored (the same URL-derived GUID found again by another topic, run or
+        worker) are left as they are, scrape state and all.
+        """
+        with self._lock:
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+            columns = ARTICLE_COLUMNS + list(DEDUP_COLUMNS)
+            try:
+                start = time.perf_counter()
+                self.conn.execute("BEGIN")
+                self.conn.executemany(f"""
+                INSERT INTO articles ({", ".join(columns)}, scrape_status)
+                VALUES ({", ".join("?" for _ in columns)}, 'pending')
+                ON CONFLICT(source_guid) DO NOTHING
+                """, rows)
+                self.conn.execute("COMMIT")
+                metrics.observe("db_write_seconds", time.perf_counter() - start, operation="flush")
+                metrics.increment("db_rows_written", len(rows))
+                logger.debug(f"{len(rows)} articles flushed to the database at {self.db_full_path}.")
+            except Exception as e:
+                self.conn.execute("ROLLBACK")
+                logger.exception(f"Error storing articles in database: {e}")
+
+    def count_articles(self):
+        with self._lock:
+            self.flush()
+            return self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def has_canonical_url(self, canonical_url):
+        """
+        Whether any stored article has this canonical URL, whatever its GUID.
+        """
+        with self._lock:
+            self.flush()
+            row = self.conn.execute(
+                "SELECT 1 FROM articles WHERE canonical_url = ? LIMIT 1", (canonical_url,)
+            ).fetchone()
+            return row is not None
+
+    def get_article(self, source_guid):
+        """
+        Returns one article (metadata plus scrape state) as a dict, or None.
+        """
+        columns = ARTICLE_COLUMNS + list(SCRAPE_STATE_COLUMNS)
+        with self._lock:
+            self.flush()
+            row = self.conn.execute(
+                f"SELECT {', '.join(columns)} FROM articles WHERE source_guid = ?", (source_guid,)
+            ).fetchone()
+        return dict(zip(columns, row)) if row else None
+
+    def iter_source_urls(self, batch_size=10000):
+        """
+        Yields every stored source_url, reading the table in batches.
+        """
+        with self._lock:
+            self.flush()
+            cursor = self.conn.execute("SELECT source_url FROM articles")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for (source_url,) in rows:
+                    yield source_url
+
+    def iter_articles_to_scrape(self, refresh_after_days=None, max_attempts=3, batch_size=500, follow=None):
+        """
+        Yields the articles that still need scraping: never scraped, pending or
+        deferred, failed fewer than max_attempts times, or (if refresh_after_days is set) last
+        retrieved longer ago than that. Rows are read in rowid-keyed batches so
+        status updates made while iterating are safe.
+
+        With follow (a callable returning True while another thread may still be
+        adding articles), the iterator tails the table instead of stopping: it
+        yields None while no new rows are available and ends only once follow()
+        is False and every row added up to then has been yielded.
+        """
+        conditions = [
+            "(scrape_status IS NULL AND date_retrieved IS NULL)",
+            "scrape_status IN ('pending', 'deferred')",
+            "(scrape_status = 'failed' AND COALESCE(scrape_attempts, 0) < :max_attempts)"
+        ]
+        params = {"max_attempts": max_attempts, "batch_size": batch_size, "last_rowid": 0}
+        if refresh_after_days:
+            conditions.append("(COALESCE(scrape_status, 'ok') = 'ok' AND date_retrieved < :cutoff)")
+            params["cutoff"] = (datetime.now() - timedelta(days=float(refresh_after_days))).isoformat()
+
+        columns = ARTICLE_COLUMNS + list(SCRAPE_STATE_COLUMNS)
+        query = f"""
+            SELECT rowid, {", ".join(columns)}
+            FROM articles
+            WHERE rowid > :last_rowid AND ({" OR ".join(conditions)})
+            ORDER BY rowid
+            LIMIT :batch_size
+        """
+
+        while True:
+            # Checked before the query, so rows added before the producer stopped are still read
+            more_coming = follow is not None and follow()
+            with self._lock:
+                self.flush()
+                rows = self.conn.execute(query, params).fetchall()
+            if not rows:
+                if more_coming:
+                    yield None
+                    continue
+                break
+            params["last_rowid"] = rows[-1][0]
+            for row in rows:
+                yield dict(zip(columns, row[1:]))
+
+    def find_content_by_sha256(self, content_sha256, exclude_guid=None):
+        """
+        Returns the content_path of another article already stored with this
+        SHA-256, or None.
+        """
+        with self._lock:
+            self.flush()
+            row = self.conn.execute("""
+            SELECT content_path FROM articles
+            WHERE content_sha256 = ? AND source_guid != ? AND content_path IS NOT NULL
+            LIMIT 1
+            """, (content_sha256, exclude_guid or "")).fetchone()
+            return row[0] if row else None
+
+    def record_scrape_result(self, source_guid, status, etag=None, last_modified=None, error=None,
+                             content_bytes=None, content_sha256=None, content_path=None,
+                             suspected_duplicate=None):
+        """
+        Persists the outcome of one scrape immediately, so an interrupted run
+        resumes where it stopped. status is "ok", "not_modified", "failed" or
+        "deferred" (left for a later run without counting as an attempt).
+        """
+        now = datetime.now().isoformat()
+        with self._lock, metrics.timer("db_write_seconds", operation="scrape_result"):
+            self.flush()
+            if status == "failed":
+                self.conn.execute("""
+                UPDATE articles
+                SET scrape_status = 'failed',
+                    scrape_attempts = COALESCE(scrape_attempts, 0) + 1,
+                    last_error = ?
+                WHERE source_guid = ?
+                """, (error, source_guid))
+            elif status == "deferred":
+                self.conn.execute("""
+                UPDATE articles
+                SET scrape_status = 'deferred',
+                    last_error = ?
+                WHERE source_guid = ?
+                """, (error, source_guid))
+            else:
+                # A 304 keeps the previous validators unless new ones were sent
+                self.conn.execute("""
+                UPDATE articles
+                SET scrape_status = 'ok',
+                    scrape_attempts = 0,
+                    last_error = NULL,
+                    date_retrieved = ?,
+                    etag = COALESCE(?, etag),
+                    last_modified = COALESCE(?, last_modified),
+                    content_bytes = COALESCE(?, content_bytes),
+                    content_sha256 = COALESCE(?, content_sha256),
+                    content_path = COALESCE(?, content_path),
+                    suspected_duplicate = COALESCE(?, suspected_duplicate)
+                WHERE source_guid = ?
+                """, (now, etag, last_modified, content_bytes, content_sha256, content_path,
+                      suspected_duplicate, source_guid))
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 def store_articles_in_excel(excel_path, file_name, articles):
     """
@@ -70,7 +327,10 @@ def store_articles_in_excel(excel_path, file_name, articles):
     full_excel_path = os.path.join(excel_path, file_name)
     logger.debug(f"Preparing to store {len(articles)} articles in Excel at {full_excel_path}")
 
+    import pandas as pd
+
     try:
+        start = time.perf_counter()
         df = pd.DataFrame(articles)
 
         # Exclude article_content if present
@@ -84,14 +344,152 @@ def store_articles_in_excel(excel_path, file_name, articles):
             combined_df.to_excel(full_excel_path, index=False)
         else:
             df.to_excel(full_excel_path, index=False)
+        metrics.observe("export_seconds", time.perf_counter() - start, format="excel_per_batch")
         logger.info(f"{len(articles)} articles successfully stored/updated in Excel: {full_excel_path}")
     except Exception as e:
         logger.exception(f"Error saving articles to Excel: {e}")
 
+def _iter_export_rows(db_path, db_name, batch_size=5000):
+    """
+    Streams article metadata rows out of the SQLite `articles` table, one row per
+    source_url (the first stored wins, as with the Excel drop_duplicates), without
+    loading the whole table into memory.
+    """
+    db_full_path = os.path.join(db_path, db_name)
+    conn = sqlite3.connect(db_full_path)
+    try:
+        cursor = conn.cursor()
+        cursor.arraysize = batch_size
+        cursor.execute(f"""
+            SELECT {", ".join(EXPORT_COLUMNS)}
+            FROM articles
+            WHERE rowid IN (SELECT MIN(rowid) FROM articles GROUP BY source_url)
+            ORDER BY rowid
+        """)
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+def export_articles_to_excel(db_path, db_name, excel_path, file_name):
+    """
+    Writes the Excel output in a single pass by streaming rows from the `articles`
+    table into a write-only openpyxl workbook. Replaces the file atomically.
+    """
+    from openpyxl import Workbook
+
+    full_excel_path = os.path.join(excel_path, file_name)
+    tmp_path = full_excel_path + ".tmp"
+    logger.debug(f"Exporting articles from database to Excel at {full_excel_path}")
+
+    try:
+        start = time.perf_counter()
+        os.makedirs(excel_path, exist_ok=True)
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(EXPORT_COLUMNS)
+        row_count = 0
+        for row in _iter_export_rows(db_path, db_name):
+            sheet.append(row)
+            row_count += 1
+        workbook.save(tmp_path)
+        os.replace(tmp_path, full_excel_path)
+        metrics.observe("export_seconds", time.perf_counter() - start, format="excel")
+        logger.info(f"{row_count} articles exported to Excel: {full_excel_path}")
+    except Exception as e:
+        logger.exception(f"Error exporting articles to Excel: {e}")
+
+def export_articles_to_csv(db_path, db_name, csv_path, file_name):
+    """
+    Streams the `articles` table to a CSV file. Replaces the file atomically.
+    """
+    import csv
+
+    full_csv_path = os.path.join(csv_path, file_name)
+    tmp_path = full_csv_path + ".tmp"
+    logger.debug(f"Exporting articles from database to CSV at {full_csv_path}")
+
+    try:
+        start = time.perf_counter()
+        os.makedirs(csv_path, exist_ok=True)
+        row_count = 0
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in _iter_export_rows(db_path, db_name):
+                writer.writerow(row)
+                row_count += 1
+        os.replace(tmp_path, full_csv_path)
+        metrics.observe("export_seconds", time.perf_counter() - start, format="csv")
+        logger.info(f"{row_count} articles exported to CSV: {full_csv_path}")
+    except Exception as e:
+        logger.exception(f"Error exporting articles to CSV: {e}")
+
+def export_articles_to_parquet(db_path, db_name, parquet_path, file_name, batch_size=50000):
+    """
+    Streams the `articles` table to a Parquet file in row groups of batch_size.
+    Requires pyarrow. Replaces the file atomically.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        logger.warning("pyarrow is not installed; skipping Parquet export.")
+        return
+
+    full_parquet_path = os.path.join(parquet_path, file_name)
+    tmp_path = full_parquet_path + ".tmp"
+    logger.debug(f"Exporting articles from database to Parquet at {full_parquet_path}")
+
+    try:
+        start = time.perf_counter()
+        os.makedirs(parquet_path, exist_ok=True)
+        schema = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS])
+        row_count = 0
+        batch = []
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for row in _iter_export_rows(db_path, db_name):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    writer.write_table(pa.Table.from_pylist([dict(zip(EXPORT_COLUMNS, r)) for r in batch], schema=schema))
+                    row_count += len(batch)
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist([dict(zip(EXPORT_COLUMNS, r)) for r in batch], schema=schema))
+                row_count += len(batch)
+        os.replace(tmp_path, full_parquet_path)
+        metrics.observe("export_seconds", time.perf_counter() - start, format="parquet")
+        logger.info(f"{row_count} articles exported to Parquet: {full_parquet_path}")
+    except Exception as e:
+        logger.exception(f"Error exporting articles to Parquet: {e}")
+
+def export_articles(db_path, db_name, excel_config):
+    """
+    Regenerates every configured output file (Excel plus optional CSV/Parquet)
+    from the SQLite database, using the `output_excel` config section.
+    """
+    excel_path = excel_config["path"]
+    excel_file = excel_config["file_name"]
+    export_articles_to_excel(db_path, db_name, excel_path, excel_file)
+
+    base_name = os.path.splitext(excel_file)[0]
+    for export_format in excel_config.get("extra_formats", []) or []:
+        export_format = str(export_format).lower()
+        if export_format == "csv":
+            export_articles_to_csv(db_path, db_name, excel_path, f"{base_name}.csv")
+        elif export_format == "parquet":
+            export_articles_to_parquet(db_path, db_name, excel_path, f"{base_name}.parquet")
+        else:
+            logger.warning(f"Unknown export format '{export_format}' in output_excel.extra_formats.")
+
 def store_article_markdown(base_path, article, topic_name, short_title_limit):
     """
     Stores the article content in a Markdown file under:
       base_path/<cleaned_topic_name>/<guid>-<short_title>.md
+    Returns True if the file was written.
     """
     try:
         # Clean the topic name to avoid invalid filesystem characters
@@ -102,7 +500,7 @@ def store_article_markdown(base_path, article, topic_name, short_title_limit):
         topic_folder = os.path.join(base_path, cleaned_topic_name)
         os.makedirs(topic_folder, exist_ok=True)
 
-        title = article.get("source_article_title", "")
+        title = article.get("source_article_title") or ""
         short_title = title[:short_title_limit]
         short_title = re.sub(r"[^\w\s-]", "", short_title).strip().replace(" ", "_") or "untitled"
 
@@ -113,16 +511,19 @@ def store_article_markdown(base_path, article, topic_name, short_title_limit):
             f.write(article.get("article_content", ""))
 
         logger.info(f"Markdown file created at: {full_path}")
+        return True
 
     except Exception as e:
         logger.exception(
             f"Error creating Markdown file for article GUID {article.get('source_guid')}: {e}"
         )
+        return False
 
 def store_article_pdf(base_path, article, topic_name, short_title_limit):
     """
     Downloads and stores a PDF file under:
       base_path/<cleaned_topic_name>/<guid>-<short_title>.pdf
+    Returns the pdf_downloader.download_pdf result dict (status, byte count, SHA-256, path).
     """
     try:
         # Clean the topic name
@@ -133,69 +534,61 @@ def store_article_pdf(base_path, article, topic_name, short_title_limit):
         topic_folder = os.path.join(base_path, cleaned_topic_name)
         os.makedirs(topic_folder, exist_ok=True)
 
-        title = article.get("source_article_title", "")
+        title = article.get("source_article_title") or ""
         short_title = title[:short_title_limit]
         short_title = re.sub(r"[^\w\s-]", "", short_title).strip().replace(" ", "_") or "untitled"
 
         file_name = f"{article['source_guid']}-{short_title}.pdf"
         full_path = os.path.join(topic_folder, file_name)
 
-        # Download the PDF
-        pdf_url = article.get("source_url", "")
-        response = requests.get(pdf_url, timeout=15, stream=True)
-        if response.ok:
-            with open(full_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            logger.info(f"PDF file downloaded: {full_path}")
-        else:
-            logger.warning(f"Failed to download PDF from {pdf_url}, status {response.status_code}")
+        # Download the PDF (resumable, size-capped, atomic)
+        return download_pdf(article.get("source_url", ""), full_path)
 
     except Exception as e:
         logger.exception(
             f"Error downloading PDF for article GUID {article.get('source_guid')}: {e}"
         )
+        return {"status": "failed", "error": str(e)}
 
-def load_articles_from_db(db_path, db_name):
+def pack_article_markdown(content_store, article, topic_name):
     """
-    Loads articles previously stored in the local SQLite database.
-    Returns a list of dictionaries, each representing an article's metadata.
+    Stores the article content in the packed content store instead of a file.
+    Returns the scrape result fields for the article (content size and hash, and
+    suspected_duplicate when identical or near-identical content is already stored).
     """
-    db_full_path = os.path.join(db_path, db_name)
-    articles = []
-
-    if not os.path.exists(db_full_path):
-        logger.warning(f"Database not found at {db_full_path}. Returning empty list.")
-        return articles
-
     try:
-        conn = sqlite3.connect(db_full_path)
-        cursor = conn.cursor()
-        # Pull everything except the content, which we are storing in Markdown/PDF only
-        query = """
-            SELECT 
-                source_guid,
-                source_name,
-                source_domain,
-                search_engine_name,
-                source_url,
-                source_article_title,
-                date_retrieved,
-                search_query,
-                suspected_duplicate
-            FROM articles
-        """
-        rows = cursor.execute(query).fetchall()
-        col_names = [desc[0] for desc in cursor.description]
-        
-        # Convert rows to list of dict
-        for row in rows:
-            record = dict(zip(col_names, row))
-            articles.append(record)
+        stored = content_store.put(article, topic_name, article.get("article_content", ""), kind="md")
+        return {
+            "status": "ok",
+            "content_bytes": stored["raw_bytes"],
+            "content_sha256": stored["sha256"],
+            "suspected_duplicate": "yes" if stored["duplicate_of"] else "no"
+        }
     except Exception as e:
-        logger.exception(f"Error loading articles from DB: {e}")
-    finally:
-        conn.close()
+        logger.exception(f"Error packing Markdown for article GUID {article.get('source_guid')}: {e}")
+        return {"status": "failed", "error": str(e)}
+
+def pack_article_pdf(content_store, staging_path, article, topic_name):
+    """
+    Downloads a PDF into staging_path (keeping it resumable), then moves it into
+    the packed content store. Returns the scrape result fields for the article.
+    """
+    try:
+        os.makedirs(staging_path, exist_ok=True)
+        full_path = os.path.join(staging_path, f"{article['source_guid']}.pdf")
+        result = download_pdf(article.get("source_url", ""), full_path)
+        if result["status"] != "ok":
+            return result
 
-    return articles
+        with open(full_path, "rb") as f:
+            stored = content_store.put(article, topic_name, f.read(), kind="pdf")
+        os.remove(full_path)
+        return {
+            "status": "ok",
+            "content_bytes": stored["raw_bytes"],
+            "content_sha256": stored["sha256"],
+            "suspected_duplicate": "yes" if stored["duplicate_of"] else "no"
+        }
+    except Exception as e:
+        logger.exception(f"Error packing PDF for article GUID {article.get('source_guid')}: {e}")
+        return {"status": "failed", "error": str(e)}